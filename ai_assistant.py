@@ -1,28 +1,93 @@
-import requests
 import json
 import time
 import logging
 import os
-import PyPDF2
-from lxml import etree
-import io
-from mevzuat_scraper import MevzuatScraper
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from mevzuat_scraper import get_scraper
+from pdf_extractor import PdfExtractor, DEFAULT_MAX_PAGES
+from xml_extractor import extract_xml_text
+from chunking import iter_chunks, estimate_tokens
+from extraction import iter_content_units
+from rate_limit import get_rate_limiter, get_circuit_breaker, is_retryable, retry_delay, CircuitOpenError
+from http_pool import get_session
+from answer_cache import get_default_cache, make_key
+from extraction_store import get_extraction_store
+from metrics import span, timed_iter, inc, observe, SIZE_BUCKETS
+from madde_index import get_madde_index
+from context_packer import pack, format_item
+from singleflight import get_group
+
+# GIB_ASYNC_PROVIDERS=1: parça analizleri gibi çoklu model çağrıları iş parçacığı yerine async istemciyle (HTTP/2)
+# yapılır. Tek çekirdekte iş parçacığı havuzundan yavaş ölçüldüğü için varsayılan kapalıdır (bench_async_providers.py)
+ASYNC_PROVIDERS = os.getenv('GIB_ASYNC_PROVIDERS', '0') == '1'
+# Prompt şablonu, soru ve kanun maddeleri için chunk_tokens/context_tokens dışında ayrılan pay
+PROMPT_OVERHEAD_TOKENS = 1000
+
+
+def fit_token_budget(config):
+    # Dakikalık token kotası olan sağlayıcılarda chunk_concurrency parça isteği ve reduce isteği aynı
+    # dakikaya sığmalı; parça başına ayrılan (prompt + max_output_tokens) kotanın tamamını tüketmemeli
+    tokens_per_minute = config.get("tokens_per_minute")
+    if not tokens_per_minute:
+        return config
+    budget = tokens_per_minute // (config.get("chunk_concurrency", 2) + 1) - config["max_output_tokens"] - PROMPT_OVERHEAD_TOKENS
+    config["chunk_tokens"] = min(config.get("chunk_tokens", 3000), budget)
+    # En büyük tek istek: reduce promptu (chunk_tokens) + mevzuat bağlamı + şablon + yanıt
+    largest = config["chunk_tokens"] + config.get("context_tokens", 1500) + PROMPT_OVERHEAD_TOKENS + config["max_output_tokens"]
+    if config["chunk_tokens"] <= 0 or largest > tokens_per_minute:
+        raise ValueError(f"{config['model']} için tek istek ({largest} token) dakikalık kotayı ({tokens_per_minute}) aşıyor")
+    return config
+
+class StreamingResponse:
+    def __init__(self, tokens, error=None, content=None, mevzuat=None, timed_out_sources=None):
+        self._tokens = tokens
+        self._parts = []
+        self.error = error
+        self.content = content
+        self.mevzuat = mevzuat if mevzuat is not None else []
+        self.timed_out_sources = timed_out_sources or []
+        self.completed = False
+    
+    def __iter__(self):
+        try:
+            for token in self._tokens:
+                self._parts.append(token)
+                yield token
+        except Exception as e:
+            # Yarıda kopan akış tamamlanmış sayılmaz; hata okuyucuya iletilir
+            self.error = str(e)
+            raise
+        self.completed = True
+    
+    @property
+    def text(self):
+        return "".join(self._parts)
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    filename='ai_assistant.log'
-)
 
 class AIAssistant:
-    def __init__(self, model_provider="huggingface", api_token=None):
+    def __init__(self, model_provider="huggingface", api_token=None, answer_cache=None, use_cache=True, mevzuat_scraper=None,
+                 extraction_store=None):
         self.model_provider = model_provider
         self.api_token = api_token
-        self.mevzuat_scraper = MevzuatScraper()
+        self.mevzuat_scraper = mevzuat_scraper if mevzuat_scraper is not None else get_scraper()
+        self.madde_index = get_madde_index()
+        self.session = get_session()
+        self.answer_cache = answer_cache if answer_cache is not None else (get_default_cache() if use_cache else None)
+        # Aynı dosya tekrar yüklendiğinde PDF/XML çıkarma atlanır
+        self.extraction_store = extraction_store if extraction_store is not None else (get_extraction_store() if use_cache else None)
         
         self.model_configs = {
             "huggingface": {
                 "api_url": "https://api-inference.huggingface.co/models/mistralai/Mistral-7B-Instruct-v0.2",
+                "model": "mistralai/Mistral-7B-Instruct-v0.2",
+                "chunk_tokens": 3000,
+                "chunk_concurrency": 2,
+                "context_tokens": 1200,
+                "max_output_tokens": 2048,
+                "requests_per_minute": 60,
+                "tokens_per_minute": None,
                 "headers": {
                     "Authorization": f"Bearer {self.api_token}",
                     "Content-Type": "application/json"
@@ -30,6 +95,13 @@ class AIAssistant:
             },
             "anthropic": {
                 "api_url": "https://api.anthropic.com/v1/messages",
+                "model": "claude-2",
+                "chunk_tokens": 8000,
+                "chunk_concurrency": 4,
+                "context_tokens": 8000,
+                "max_output_tokens": 1024,
+                "requests_per_minute": 50,
+                "tokens_per_minute": 40000,
                 "headers": {
                     "x-api-key": self.api_token,
                     "anthropic-version": "2023-06-01",
@@ -38,6 +110,13 @@ class AIAssistant:
             },
             "openai": {
                 "api_url": "https://api.openai.com/v1/chat/completions",
+                "model": "gpt-3.5-turbo",
+                "chunk_tokens": 2500,
+                "chunk_concurrency": 4,
+                "context_tokens": 1500,
+                "max_output_tokens": 1024,
+                "requests_per_minute": 500,
+                "tokens_per_minute": 90000,
                 "headers": {
                     "Authorization": f"Bearer {self.api_token}",
                     "Content-Type": "application/json"
@@ -45,127 +124,374 @@ class AIAssistant:
             }
         }
         
+        for config in self.model_configs.values():
+            fit_token_budget(config)
         self.current_config = self.model_configs.get(model_provider, self.model_configs["huggingface"])
+        # Sınırlayıcı ve devre kesici aynı sağlayıcıyı aynı API anahtarıyla kullanan asistanlar arasında paylaşılır
+        self.rate_limiter = get_rate_limiter(
+            model_provider,
+            requests_per_minute=self.current_config.get("requests_per_minute"),
+            tokens_per_minute=self.current_config.get("tokens_per_minute"),
+            api_token=api_token
+        )
+        self.circuit_breaker = get_circuit_breaker(model_provider, api_token=api_token)
+        # Aynı anda gelen aynı (normalize edilmiş) istekler tek model çağrısını paylaşır
+        self.answer_flight = get_group("answer")
+        self.use_async = ASYNC_PROVIDERS
+        self._async_client = None
         logging.info(f"AI asistan {model_provider} ile başlatıldı!")
 
-    def _make_api_request(self, prompt, max_retries=3):
+    def _build_payload(self, prompt, stream=False):
+        if self.model_provider == "huggingface":
+            payload = {
+                "inputs": prompt,
+                "parameters": {
+                    "max_new_tokens": self.current_config["max_output_tokens"],
+                    "temperature": 0.1,
+                    "top_k": 10,
+                    "top_p": 0.95,
+                    "repetition_penalty": 1.2,
+                    "do_sample": True,
+                    "return_full_text": False
+                }
+            }
+        elif self.model_provider == "anthropic":
+            payload = {
+                "model": self.current_config["model"],
+                "messages": [
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ],
+                "max_tokens": self.current_config["max_output_tokens"]
+            }
+        else:  # openai
+            payload = {
+                "model": self.current_config["model"],
+                "messages": [
+                    {
+                        "role": "system",
+                        "content": "Sen bir GİB (Gelir İdaresi Başkanlığı) uzmanısın. Türk vergi mevzuatı ve beyanname süreçleri hakkında detaylı bilgi sahibisin."
+                    },
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ],
+                "max_tokens": self.current_config["max_output_tokens"],
+                "temperature": 0.7
+            }
+        if stream:
+            payload["stream"] = True
+        return payload
+    
+    def _parse_response(self, result):
+        if self.model_provider == "huggingface":
+            if isinstance(result, list) and len(result) > 0:
+                return [{"generated_text": result[0].get("generated_text", "")}]
+            return [{"generated_text": result.get("generated_text", "")}]
+        elif self.model_provider == "anthropic":
+            content = result.get("content", "")
+            if isinstance(content, list):
+                content = "".join(block.get("text", "") for block in content if block.get("type") == "text")
+            return [{"generated_text": content}]
+        else:  # openai
+            return [{"generated_text": result["choices"][0]["message"]["content"]}]
+    
+    def _parse_stream_event(self, event):
+        if self.model_provider == "huggingface":
+            token = event.get("token") or {}
+            if "error" in event:
+                raise RuntimeError(event["error"])
+            return "" if token.get("special") else token.get("text", "")
+        elif self.model_provider == "anthropic":
+            if event.get("type") == "error":
+                raise RuntimeError(event.get("error", {}).get("message", "Anthropic stream hatası"))
+            if event.get("type") == "content_block_delta":
+                return event.get("delta", {}).get("text", "")
+            return ""
+        else:  # openai
+            choices = event.get("choices") or [{}]
+            return choices[0].get("delta", {}).get("content") or ""
+    
+    def _reserve_request(self, prompt, usage=None):
+        # Beklenmesi gereken süreyi döndürür; senkron ve async istemciler kendi yöntemleriyle bekler
+        # usage: verilirse her denemede ayrılan prompt token'ı eklenir (analiz başına toplam için)
+        if not self.circuit_breaker.allow_request():
+            raise CircuitOpenError(f"{self.model_provider} geçici olarak devre dışı (devre kesici açık)")
+        prompt_tokens = estimate_tokens(prompt)
+        if usage is not None:
+            usage.append(prompt_tokens)
+        return self.rate_limiter.reserve(prompt_tokens + self.current_config["max_output_tokens"])
+    
+    def _before_request(self, prompt, usage=None):
+        wait = self._reserve_request(prompt, usage)
+        if wait > 0:
+            time.sleep(wait)
+    
+    def _retry_delay(self, error, attempt, max_retries):
+        # Tekrar denenmeyecekse None döner
+        if isinstance(error, CircuitOpenError):
+            return None
+        if not is_retryable(error):
+            # Sağlayıcı yanıt verdi; kalıcı istemci hatası devre kesiciyi etkilemez
+            self.circuit_breaker.record_success()
+            return None
+        self.circuit_breaker.record_failure()
+        if attempt == max_retries - 1 or self.circuit_breaker.state == self.circuit_breaker.OPEN:
+            return None
+        delay = retry_delay(attempt, error)
+        if getattr(getattr(error, "response", None), "status_code", None) == 429:
+            self.rate_limiter.pause(delay)
+        return delay
+    
+    def _make_api_request(self, prompt, max_retries=3, usage=None):
+        payload = self._build_payload(prompt)
         for attempt in range(max_retries):
             try:
+                self._before_request(prompt, usage)
                 logging.info(f"API isteği yapılıyor (deneme {attempt + 1}/{max_retries})")
                 
-                if self.model_provider == "huggingface":
-                    payload = {
-                        "inputs": prompt,
-                        "parameters": {
-                            "max_new_tokens": 2048,
-                            "temperature": 0.1,
-                            "top_k": 10,
-                            "top_p": 0.95,
-                            "repetition_penalty": 1.2,
-                            "do_sample": True,
-                            "return_full_text": False
-                        }
-                    }
-                elif self.model_provider == "anthropic":
-                    payload = {
-                        "model": "claude-2",
-                        "messages": [
-                            {
-                                "role": "user",
-                                "content": prompt
-                            }
-                        ],
-                        "max_tokens": 1024
-                    }
-                    response = requests.post(
+                with span("provider.request", provider=self.model_provider):
+                    response = self.session.post(
                         self.current_config["api_url"],
                         headers=self.current_config["headers"],
                         json=payload,
                         timeout=30
                     )
                     response.raise_for_status()
-                    result = response.json()
-                    return [{"generated_text": result.get("content", "")}]
-                else:  # openai
-                    payload = {
-                        "model": "gpt-3.5-turbo",
-                        "messages": [
-                            {
-                                "role": "system",
-                                "content": "Sen bir GİB (Gelir İdaresi Başkanlığı) uzmanısın. Türk vergi mevzuatı ve beyanname süreçleri hakkında detaylı bilgi sahibisin."
-                            },
-                            {
-                                "role": "user",
-                                "content": prompt
-                            }
-                        ],
-                        "max_tokens": 1024,
-                        "temperature": 0.7
-                    }
+                self.circuit_breaker.record_success()
+                result = self._parse_response(response.json())
+                self._settle_request(prompt, result[0]["generated_text"])
+                return result
+
+            except Exception as e:
+                delay = self._retry_delay(e, attempt, max_retries)
+                if delay is None:
+                    inc("gib_provider_failures_total", provider=self.model_provider)
+                    logging.error(f"API hatası: {str(e)}")
+                    return None
+                inc("gib_retries_total", provider=self.model_provider)
+                logging.warning(f"API hatası, {delay:.1f} sn sonra tekrar denenecek: {str(e)}")
+                time.sleep(delay)
+    
+    @property
+    def async_client(self):
+        if self._async_client is None:
+            # httpx ve olay döngüsü yalnızca ilk toplu/parçalı istekte yüklenir
+            from async_providers import AsyncProviderClient
+            self._async_client = AsyncProviderClient(self)
+        return self._async_client
+    
+    def make_api_requests(self, prompts, concurrency=None):
+        # Çok sayıda istemi aynı anda gönderir; sonuçlar _make_api_request ile aynı biçimde ve aynı sırada döner
+        if self.use_async:
+            return self.async_client.request_many(prompts, concurrency)
+        with ThreadPoolExecutor(max_workers=concurrency or len(prompts) or 1) as executor:
+            return list(executor.map(self._make_api_request, prompts))
+    
+    def _stream_api_request(self, prompt, max_retries=3, on_complete=None, cancel_event=None):
+        payload = self._build_payload(prompt, stream=True)
+        for attempt in range(max_retries):
+            tokens = []
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            try:
+                self._before_request(prompt)
+                logging.info(f"Akışlı API isteği yapılıyor (deneme {attempt + 1}/{max_retries})")
+                start = time.perf_counter()
                 
-                response = requests.post(
+                with self.session.post(
                     self.current_config["api_url"],
                     headers=self.current_config["headers"],
                     json=payload,
-                    timeout=30
-                )
-                response.raise_for_status()
-                
-                if self.model_provider == "huggingface":
-                    result = response.json()
-                    if isinstance(result, list) and len(result) > 0:
-                        return [{"generated_text": result[0].get("generated_text", "")}]
-                    else:
-                        return [{"generated_text": result[0]}]
-                elif self.model_provider == "openai":
-                    result = response.json()
-                    return [{"generated_text": result["choices"][0]["message"]["content"]}]
-
+                    timeout=30,
+                    stream=True
+                ) as response:
+                    response.raise_for_status()
+                    self.circuit_breaker.record_success()
+                    response.encoding = 'utf-8'
+                    for line in response.iter_lines(decode_unicode=True):
+                        # Server-sent events: yalnızca "data:" satırları içerik taşır
+                        if not line or not line.startswith("data:"):
+                            continue
+                        data = line[5:].strip()
+                        if data == "[DONE]":
+                            break
+                        if cancel_event is not None and cancel_event.is_set():
+                            # Yarışı kaybeden istek: bağlantı kapatılır, yanıt önbelleğe yazılmaz
+                            logging.info(f"{self.model_provider} akışı iptal edildi")
+                            return
+                        token = self._parse_stream_event(json.loads(data))
+                        if token:
+                            if not tokens:
+                                observe("gib_stage_duration_seconds", time.perf_counter() - start,
+                                        stage="provider.first_token", provider=self.model_provider)
+                            tokens.append(token)
+                            yield token
+                observe("gib_stage_duration_seconds", time.perf_counter() - start,
+                        stage="provider.stream", provider=self.model_provider)
+                self._settle_request(prompt, "".join(tokens))
+                break
+            
             except Exception as e:
-                if attempt == max_retries - 1:
-                    logging.error(f"API hatası: {str(e)}")
-                    return None
-                time.sleep(2 ** attempt)
+                # İlk token gönderildikten sonra tekrar denemek yanıtı çoğaltır
+                delay = None if tokens else self._retry_delay(e, attempt, max_retries)
+                if delay is None:
+                    inc("gib_provider_failures_total", provider=self.model_provider)
+                    logging.error(f"Akış API hatası: {str(e)}")
+                    raise
+                inc("gib_retries_total", provider=self.model_provider)
+                logging.warning(f"Akış API hatası, {delay:.1f} sn sonra tekrar denenecek: {str(e)}")
+                if cancel_event is not None:
+                    cancel_event.wait(delay)
+                else:
+                    time.sleep(delay)
+        
+        if on_complete is not None and tokens:
+            try:
+                on_complete("".join(tokens))
+            except Exception as e:
+                logging.error(f"Akış tamamlama hatası: {str(e)}")
     
-    def get_answer(self, question, search_gib=False, search_mevbank=False):
+    def _settle_request(self, prompt, text):
+        # Ayrılan max_output_tokens'ın kullanılmayan kısmı kotaya geri verilir; kısa parça yanıtları
+        # sonraki parçaların beklemesini uzatmaz
+        self._record_sizes(prompt, text)
+        self.rate_limiter.refund(self.current_config["max_output_tokens"] - estimate_tokens(text or ""))
+    
+    def _record_sizes(self, prompt, text):
+        observe("gib_prompt_chars", len(prompt), SIZE_BUCKETS, provider=self.model_provider)
+        observe("gib_response_chars", len(text or ""), SIZE_BUCKETS, provider=self.model_provider)
+    
+    def _cache_key(self, prompt, context):
+        return make_key(self.model_provider, self.current_config["model"], prompt, context)
+    
+    def _cache_get(self, key):
         try:
-            mevzuat_bilgileri = []
-            if search_gib or search_mevbank:
-                mevzuat_bilgileri = self.mevzuat_scraper.search(
-                    question,
+            cached = self.answer_cache.get(key)
+            inc("gib_answer_cache_requests_total", result="miss" if cached is None else "hit")
+            return cached
+        except Exception as e:
+            logging.error(f"Önbellek okuma hatası: {str(e)}")
+            return None
+    
+    def _cache_put(self, key, result):
+        try:
+            self.answer_cache.put(key, self.model_provider, self.current_config["model"], result)
+        except Exception as e:
+            logging.error(f"Önbellek yazma hatası: {str(e)}")
+    
+    def _cached_api_request(self, prompt, context=''):
+        if self.answer_cache is None:
+            return self._make_api_request(prompt)
+        
+        key = self._cache_key(prompt, context)
+        cached = self._cache_get(key)
+        if cached is not None:
+            logging.info("Yanıt önbellekten döndürüldü")
+            return cached
+        
+        result = self._make_api_request(prompt)
+        if result and result[0].get('generated_text'):
+            self._cache_put(key, result)
+        return result
+    
+    def _cached_stream_request(self, prompt, context='', cancel_event=None):
+        if self.answer_cache is None:
+            yield from self._stream_api_request(prompt, cancel_event=cancel_event)
+            return
+        
+        key = self._cache_key(prompt, context)
+        cached = self._cache_get(key)
+        if cached is not None:
+            logging.info("Yanıt önbellekten döndürüldü")
+            yield cached[0].get('generated_text', '')
+            return
+        
+        # Akış sonunda tam yanıt önbelleğe yazılır
+        yield from self._stream_api_request(
+            prompt,
+            on_complete=lambda text: self._cache_put(key, [{"generated_text": text}]),
+            cancel_event=cancel_event
+        )
+    
+    def _cited_articles(self, *texts):
+        try:
+            return self.madde_index.cited_text(*texts)
+        except Exception as e:
+            logging.error(f"Madde indeksi hatası: {str(e)}")
+            return ""
+    
+    def _search_mevzuat(self, search_text, search_gib, search_mevbank):
+        if search_gib or search_mevbank:
+            with span("assistant.search"):
+                return self.mevzuat_scraper.search(
+                    search_text,
                     search_gib=search_gib,
                     search_mevbank=search_mevbank
                 )
-            
-            system_prompt = """Sen deneyimli bir Gelir İdaresi Başkanlığı (GİB) uzmanısın.
-            
-            Yanıtlarını şu formatta vermelisin:
-            1. Her cevabı yeni bir satırda başlat
-            2. Sadece sorulan sorunun cevabını ver
-            3. Türkçe yanıt ver
-            4. Maddeler halinde açıkla
-            5. Varsa rakamları ve tarihleri belirt
-            6. İlgili kanun maddelerini parantez içinde belirt"""
-            
+        return []
+    
+    def _pack_mevzuat(self, query, mevzuat_bilgileri):
+        # Sonuçlar soruya benzerliğe göre sıralanır, kopyalar atılır ve sağlayıcının bağlam bütçesine sığdırılır
+        if not mevzuat_bilgileri:
+            return ""
+        with span("context.pack", provider=self.model_provider):
+            packed = pack(query, mevzuat_bilgileri, self.current_config.get("context_tokens", 1500))
+        inc("gib_context_snippets_total", len(packed), outcome="packed")
+        inc("gib_context_snippets_total", len(mevzuat_bilgileri) - len(packed), outcome="dropped")
+        return "\n".join(format_item(bilgi) for bilgi in packed)
+    
+    def _prepare_answer(self, question, search_gib=False, search_mevbank=False, mevzuat_bilgileri=None):
+        if mevzuat_bilgileri is None:
+            mevzuat_bilgileri = self._search_mevzuat(question, search_gib, search_mevbank)
+        
+        system_prompt = """Sen deneyimli bir Gelir İdaresi Başkanlığı (GİB) uzmanısın.
+        
+        Yanıtlarını şu formatta vermelisin:
+        1. Her cevabı yeni bir satırda başlat
+        2. Sadece sorulan sorunun cevabını ver
+        3. Türkçe yanıt ver
+        4. Maddeler halinde açıkla
+        5. Varsa rakamları ve tarihleri belirt
+        6. İlgili kanun maddelerini parantez içinde belirt"""
+        
+        with span("answer.prompt"):
             # Mevzuat bilgilerini prompt'a ekle
             prompt = system_prompt + "\n\nSoru: " + question
-            if mevzuat_bilgileri:
-                prompt += "\n\nİlgili Mevzuat Bilgileri:\n" + "\n".join([
-                    f"- {bilgi['baslik']}: {bilgi['icerik']}" 
-                    for bilgi in mevzuat_bilgileri
-                ])
+            mevzuat_metni = self._pack_mevzuat(question, mevzuat_bilgileri)
+            if mevzuat_metni:
+                prompt += "\n\nİlgili Mevzuat Bilgileri:\n" + mevzuat_metni
+            
+            # Soruda ya da bulunan mevzuatta atıf yapılan maddelerin yalnızca kendisi eklenir
+            madde_metni = self._cited_articles(question, mevzuat_metni)
+            if madde_metni:
+                prompt += "\n\nİlgili Kanun Maddeleri:\n" + madde_metni
+                mevzuat_metni += "\n" + madde_metni
             
-            if self.model_provider == "huggingface":
-                prompt = f"<s>[INST] {prompt}\n\nYanıtı maddeler halinde ve her maddeyi yeni satırda olacak şekilde ver: [/INST]</s>"
-            elif self.model_provider == "openai":
+            if self.model_provider == "openai":
                 prompt = question
             else:
-                prompt = prompt
-            
-            result = self._make_api_request(prompt)
+                prompt = self._format_prompt(prompt, "Yanıtı maddeler halinde ve her maddeyi yeni satırda olacak şekilde ver")
+        
+        return prompt, mevzuat_metni, mevzuat_bilgileri
+    
+    def get_answer(self, question, search_gib=False, search_mevbank=False):
+        try:
+            with span("answer.total", provider=self.model_provider):
+                prompt, mevzuat_metni, mevzuat_bilgileri = self._prepare_answer(question, search_gib, search_mevbank)
+                
+                result = self.answer_flight.do(
+                    self._cache_key(prompt, mevzuat_metni), self._cached_api_request, prompt, mevzuat_metni
+                )
             
             if isinstance(result, list) and len(result) > 0:
+                # Sonuç birleştirilen çağrılar arasında paylaşıldığından kopyası üzerinde çalışılır
+                result = [dict(result[0])] + result[1:]
                 result[0]['mevzuat'] = mevzuat_bilgileri
+                result[0]['timed_out_sources'] = getattr(mevzuat_bilgileri, 'timed_out', [])
             
             return result
             
@@ -173,79 +499,308 @@ class AIAssistant:
             logging.error(f"get_answer hatası: {str(e)}")
             raise
     
-    def analyze_file(self, file_content, file_type, question=None, search_gib=False, search_mevbank=False):
+    def stream_answer(self, question, search_gib=False, search_mevbank=False, cancel_event=None):
+        # cancel_event: okuma durur; aynı yanıtı bekleyen başka okuyucu yoksa model isteği de kapatılır
         try:
-            if file_type == "pdf":
-                content = self._extract_pdf_content(file_content)
-            elif file_type == "xml":
-                content = self._extract_xml_content(file_content)
-            else:
-                return {"error": "Desteklenmeyen dosya formatı"}
+            prompt, mevzuat_metni, mevzuat_bilgileri = self._prepare_answer(question, search_gib, search_mevbank)
+            return StreamingResponse(
+                self.answer_flight.stream(
+                    self._cache_key(prompt, mevzuat_metni), self._cached_stream_request, prompt, mevzuat_metni,
+                    cancel_event=cancel_event
+                ),
+                mevzuat=mevzuat_bilgileri,
+                timed_out_sources=getattr(mevzuat_bilgileri, 'timed_out', [])
+            )
             
-            mevzuat_bilgileri = []
-            if search_gib or search_mevbank:
-                search_text = question if question else content[:1000]  # Soru yoksa içeriğin ilk kısmını kullan
-                mevzuat_bilgileri = self.mevzuat_scraper.search(
-                    search_text,
-                    search_gib=search_gib,
-                    search_mevbank=search_mevbank
-                )
-            
-            system_prompt = """Sen deneyimli bir Gelir İdaresi Başkanlığı (GİB) uzmanısın.
-            
-            Dosya analizini şu formatta yapmalısın:
-            1. Her tespiti yeni bir satırda başlat
-            2. Sadece dosya içeriği ile ilgili analiz yap
-            3. Türkçe yanıt ver
-            4. Maddeler halinde açıkla
-            5. Varsa rakamları ve tarihleri belirt
-            6. İlgili kanun maddelerini parantez içinde belirt"""
-            
-            # Mevzuat bilgilerini prompt'a ekle
-            prompt = system_prompt + "\n\nDosya İçeriği:\n" + content
+        except Exception as e:
+            logging.error(f"stream_answer hatası: {str(e)}")
+            raise
+    
+    def _format_prompt(self, prompt, instruction):
+        if self.model_provider == "huggingface":
+            return f"<s>[INST] {prompt}\n\n{instruction}: [/INST]</s>"
+        return prompt
+    
+    def _iter_content_units(self, file_content, file_type, extract=None):
+        # extract: iter_content_units ile aynı imzada çıkarıcı (ör. süreç havuzunda çalışan jobs.py çıkarıcısı)
+        extract = extract or iter_content_units
+        store = self.extraction_store
+        key = None
+        if store is not None:
+            key = store.key(file_content, file_type, variant=DEFAULT_MAX_PAGES if file_type == "pdf" else '')
+            stored = self._store_get(key)
+            if stored is not None:
+                logging.info(f"{file_type.upper()} içeriği çıkarma deposundan okundu ({stored.unit_count} birim)")
+                yield from stored.units()
+                return
+        
+        units = []
+        fields = {}
+        try:
+            for unit in timed_iter("analysis.extract", extract(file_content, file_type, fields=fields), file_type=file_type):
+                if key is not None:
+                    units.append(unit)
+                yield unit
+        except Exception as e:
+            logging.error(f"{file_type.upper()} okuma hatası: {str(e)}")
+            raise
+        # Yalnızca sonuna kadar okunan belgeler saklanır
+        if key is not None:
+            self._store_put(key, file_type, units, len(file_content), fields)
+    
+    def _store_get(self, key):
+        try:
+            stored = self.extraction_store.get(key)
+            inc("gib_extraction_store_requests_total", result="miss" if stored is None else "hit")
+            if stored is not None:
+                inc("gib_extraction_store_bytes_saved_total", stored.source_bytes)
+            return stored
+        except Exception as e:
+            logging.error(f"Çıkarma deposu okuma hatası: {str(e)}")
+            return None
+    
+    def _store_put(self, key, file_type, units, source_bytes, fields):
+        try:
+            self.extraction_store.put(key, file_type, units, source_bytes, fields)
+        except Exception as e:
+            logging.error(f"Çıkarma deposu yazma hatası: {str(e)}")
+    
+    def _map_chunks(self, chunks, question=None, progress=None, usage=None):
+        # Parçalar oluştukça gönderilir; çıkarma bitmeden analiz başlar
+        concurrency = self.current_config.get("chunk_concurrency", 2)
+        system_prompt = """Sen deneyimli bir Gelir İdaresi Başkanlığı (GİB) uzmanısın.
+        Aşağıdaki metin daha büyük bir belgenin bir parçasıdır.
+        Bu parçadaki vergisel açıdan önemli tespitleri, rakamları ve tarihleri sayfa numaralarıyla birlikte maddeler halinde çıkar.
+        Türkçe yanıt ver."""
+        
+        def chunk_prompt(index, chunk):
+            prompt = system_prompt + f"\n\nParça {index + 1}:\n" + chunk
             if question:
-                prompt += f"\n\nSoru: {question}"
-            if mevzuat_bilgileri:
-                prompt += "\n\nİlgili Mevzuat Bilgileri:\n" + "\n".join([
-                    f"- {bilgi['baslik']}: {bilgi['icerik']}" 
-                    for bilgi in mevzuat_bilgileri
-                ])
+                prompt += f"\n\nKullanıcının sorusu: {question}"
+            return self._format_prompt(prompt, "Tespitleri maddeler halinde ver")
+        
+        def partial(future):
+            result = future.result()
+            if progress is not None:
+                progress.advance('chunks_done')
+            return result[0]['generated_text'].strip() if result else None
+        
+        contents = []
+        partials = {}
+        # Async istemcide istekler olay döngüsünde bekler, iş parçacığı havuzu oluşturulmaz
+        executor = None if self.use_async else ThreadPoolExecutor(max_workers=concurrency)
+        if executor is None:
+            submit = lambda prompt: self.async_client.submit(prompt, usage)
+            # Async'te gönderilen her istek hemen uçuşa çıkar; pencere chunk_concurrency ile sınırlanır
+            window = concurrency
+        else:
+            submit = lambda prompt: executor.submit(self._make_api_request, prompt, usage=usage)
+            window = concurrency * 2
+        pending = {}
+        
+        def drain(limit):
+            # İlerleme izlenen işlerde bekleme kısa aralıklarla kesilip iptal denetlenir
+            while len(pending) > limit:
+                done, _ = wait(pending, timeout=None if progress is None else 0.2, return_when=FIRST_COMPLETED)
+                if progress is not None:
+                    progress.check_cancelled()
+                for future in done:
+                    partials[pending.pop(future)] = partial(future)
+        
+        try:
+            for index, chunk in enumerate(chunks):
+                contents.append(chunk)
+                pending[submit(chunk_prompt(index, chunk))] = index
+                if progress is not None:
+                    progress.advance('chunks_total')
+                # Bekleyen iş sayısını sınırla ki bellekte sınırsız parça birikmesin
+                drain(window - 1)
+            drain(0)
+        except BaseException:
+            # İptal (jobs.JobCancelled) veya hata: kuyruktaki parça istekleri gönderilmez, uçuştakiler beklenmez
+            for future in pending:
+                future.cancel()
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+                executor = None
+            raise
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        
+        failed = sum(1 for partial in partials.values() if partial is None)
+        if failed:
+            logging.warning(f"{failed}/{len(partials)} parça analiz edilemedi")
+        findings = [f"Parça {index + 1}:\n{partials[index]}" for index in sorted(partials) if partials[index]]
+        logging.info(f"{len(contents)} parça {concurrency} paralel istekle analiz edildi")
+        return findings, "\n".join(contents)
+    
+    def _reduce_findings(self, findings, question=None, usage=None):
+        # Bulgular tek istemde sığmıyorsa gruplar halinde ara birleştirme yapılır
+        chunk_tokens = self.current_config.get("chunk_tokens", 3000)
+        while len(findings) > 1 and estimate_tokens("\n\n".join(findings)) > chunk_tokens:
+            groups = list(iter_chunks(findings, chunk_tokens, separator="\n\n"))
+            if len(groups) >= len(findings):
+                break
+            merged, _ = self._map_chunks(groups, question, usage=usage)
+            if not merged:
+                break
+            findings = merged
+        return "\n\n".join(findings)
+    
+    def _prepare_analysis(self, file_content, file_type, question=None, search_gib=False, search_mevbank=False,
+                          extract=None, progress=None, usage=None):
+        if file_type not in ("pdf", "xml"):
+            return None
+        return self._prepare_units_analysis(
+            self._iter_content_units(file_content, file_type, extract), question, search_gib, search_mevbank, progress, usage
+        )
+    
+    def _prepare_units_analysis(self, units, question=None, search_gib=False, search_mevbank=False, progress=None,
+                                usage=None):
+        chunk_tokens = self.current_config.get("chunk_tokens", 3000)
+        chunks = iter_chunks(units, chunk_tokens)
+        first_chunk = next(chunks, "")
+        second_chunk = next(chunks, None)
+        
+        with ThreadPoolExecutor(max_workers=1) as search_executor:
+            search_text = question if question else first_chunk[:1000]  # Soru yoksa içeriğin ilk kısmını kullan
+            search_future = search_executor.submit(self._search_mevzuat, search_text, search_gib, search_mevbank)
             
-            if self.model_provider == "huggingface":
-                prompt = f"<s>[INST] {prompt}\n\nAnalizi maddeler halinde ve her maddeyi yeni satırda olacak şekilde ver: [/INST]</s>"
-            elif self.model_provider == "openai":
-                prompt = f"Dosya İçeriği:\n{content}\n\nSoru: {question}"
+            if second_chunk is None:
+                content = first_chunk
+                findings = None
             else:
-                prompt = prompt
-            
-            result = self._make_api_request(prompt)
-            
-            return {
-                "success": True,
-                "content": content,
-                "analysis": result[0]['generated_text'] if result else "",
-                "mevzuat": mevzuat_bilgileri
-            }
+                with span("analysis.map", provider=self.model_provider):
+                    findings, content = self._map_chunks(itertools.chain([first_chunk, second_chunk], chunks), question, progress, usage)
+            mevzuat_bilgileri = search_future.result()
+        
+        system_prompt = """Sen deneyimli bir Gelir İdaresi Başkanlığı (GİB) uzmanısın.
+        
+        Dosya analizini şu formatta yapmalısın:
+        1. Her tespiti yeni bir satırda başlat
+        2. Sadece dosya içeriği ile ilgili analiz yap
+        3. Türkçe yanıt ver
+        4. Maddeler halinde açıkla
+        5. Varsa rakamları ve tarihleri belirt
+        6. İlgili kanun maddelerini parantez içinde belirt"""
+        
+        if findings is None:
+            prompt = system_prompt + "\n\nDosya İçeriği:\n" + content
+        else:
+            with span("analysis.reduce", provider=self.model_provider):
+                reduced = self._reduce_findings(findings, question, usage)
+            # Reduce adımı: parça bulgularını tek bir analizde birleştir
+            prompt = system_prompt + "\n\nDosya büyük olduğu için parçalar halinde incelendi. Parça bulguları:\n" + \
+                reduced + \
+                "\n\nBu bulguları tekrarlardan arındırarak tek bir bütünlüklü analizde birleştir."
+        
+        # Mevzuat bilgilerini prompt'a ekle
+        if question:
+            prompt += f"\n\nSoru: {question}"
+        mevzuat_metni = self._pack_mevzuat(search_text, mevzuat_bilgileri)
+        if mevzuat_metni:
+            prompt += "\n\nİlgili Mevzuat Bilgileri:\n" + mevzuat_metni
+        madde_metni = self._cited_articles(question, content, mevzuat_metni)
+        if madde_metni:
+            prompt += "\n\nİlgili Kanun Maddeleri:\n" + madde_metni
+        
+        if self.model_provider == "openai" and findings is None:
+            prompt = f"Dosya İçeriği:\n{content}\n\nSoru: {question}"
+        else:
+            prompt = self._format_prompt(prompt, "Analizi maddeler halinde ve her maddeyi yeni satırda olacak şekilde ver")
+        
+        return prompt, content, mevzuat_bilgileri
+    
+    def _run_analysis(self, prepared, usage=None):
+        prompt, content, mevzuat_bilgileri = prepared
+        usage = usage if usage is not None else []
+        
+        result = self._make_api_request(prompt, usage=usage)
+        
+        return {
+            "success": True,
+            "content": content,
+            "analysis": result[0]['generated_text'] if result else "",
+            "mevzuat": mevzuat_bilgileri,
+            "timed_out_sources": getattr(mevzuat_bilgileri, 'timed_out', []),
+            # Parça, ara birleştirme ve son istek dahil modele gönderilen prompt token'ları
+            "prompt_tokens": sum(usage)
+        }
+    
+    def analyze_file(self, file_content, file_type, question=None, search_gib=False, search_mevbank=False):
+        try:
+            with span("analysis.total", provider=self.model_provider):
+                usage = []
+                prepared = self._prepare_analysis(file_content, file_type, question, search_gib, search_mevbank,
+                                                  usage=usage)
+                if prepared is None:
+                    return {"error": "Desteklenmeyen dosya formatı"}
+                return self._run_analysis(prepared, usage)
             
         except Exception as e:
             logging.error(f"analyze_file hatası: {str(e)}")
             return {"success": False, "error": str(e)}
     
+    def analyze_units(self, units, question=None, search_gib=False, search_mevbank=False):
+        # Önceden çıkarılmış içerik (sayfa/öğe listesi) için analiz; toplu işlemede kullanılır
+        try:
+            usage = []
+            prepared = self._prepare_units_analysis(units, question, search_gib, search_mevbank, usage=usage)
+            return self._run_analysis(prepared, usage)
+            
+        except Exception as e:
+            logging.error(f"analyze_units hatası: {str(e)}")
+            return {"success": False, "error": str(e)}
+    
+    def stream_analysis(self, file_content, file_type, question=None, search_gib=False, search_mevbank=False,
+                        cancel_event=None):
+        try:
+            prepared = self._prepare_analysis(file_content, file_type, question, search_gib, search_mevbank)
+            if prepared is None:
+                return StreamingResponse(iter(()), error="Desteklenmeyen dosya formatı")
+            prompt, content, mevzuat_bilgileri = prepared
+            
+            return StreamingResponse(
+                self._stream_api_request(prompt, cancel_event=cancel_event),
+                content=content,
+                mevzuat=mevzuat_bilgileri,
+                timed_out_sources=getattr(mevzuat_bilgileri, 'timed_out', [])
+            )
+            
+        except Exception as e:
+            logging.error(f"stream_analysis hatası: {str(e)}")
+            return StreamingResponse(iter(()), error=str(e))
+    
     def _extract_pdf_content(self, file_content):
         try:
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            return text.strip()
+            with span("extract.pdf"):
+                return PdfExtractor().extract_text(file_content)
         except Exception as e:
             logging.error(f"PDF okuma hatası: {str(e)}")
             raise
     
     def _extract_xml_content(self, file_content):
         try:
-            root = etree.fromstring(file_content)
-            return etree.tostring(root, pretty_print=True, encoding='unicode')
+            with span("extract.xml"):
+                return extract_xml_text(file_content)
         except Exception as e:
             logging.error(f"XML okuma hatası: {str(e)}")
             raise
+
+
+_assistants = {}
+_assistants_lock = threading.Lock()
+
+
+def get_assistant(model_provider="huggingface", api_token=None):
+    # Sağlayıcı ve token başına süreç genelinde tek asistan; Streamlit her etkileşimde betiği
+    # yeniden çalıştırsa da yapılandırma, scraper ve indeks bağlantıları yeniden kurulmaz
+    key = (model_provider, api_token)
+    assistant = _assistants.get(key)
+    if assistant is None:
+        with _assistants_lock:
+            assistant = _assistants.get(key)
+            if assistant is None:
+                assistant = _assistants[key] = AIAssistant(model_provider=model_provider, api_token=api_token)
+    return assistant
@@ -0,0 +1,157 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from mevzuat_index import turkish_casefold
+
+DEFAULT_CACHE_PATH = os.getenv('GIB_ANSWER_CACHE_PATH', 'answer_cache.db')
+DEFAULT_TTL = int(os.getenv('GIB_ANSWER_CACHE_TTL', str(7 * 24 * 3600)))
+DEFAULT_MAX_ENTRIES = int(os.getenv('GIB_ANSWER_CACHE_MAX_ENTRIES', '5000'))
+DEFAULT_MAX_BYTES = int(os.getenv('GIB_ANSWER_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_prompt(text):
+    text = _WHITESPACE_RE.sub(' ', turkish_casefold(text or '')).strip()
+    return text.rstrip(' ?.!')
+
+
+def make_key(provider, model, prompt, context=''):
+    raw = '\x1f'.join([provider or '', model or '', normalize_prompt(prompt), normalize_prompt(context)])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class AnswerCache:
+    def __init__(self, path=None, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path or DEFAULT_CACHE_PATH
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._create_schema()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _create_schema(self):
+        conn = self._connection()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS answers (
+                key TEXT PRIMARY KEY,
+                provider TEXT NOT NULL,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS answers_last_access ON answers (last_access);
+            CREATE TABLE IF NOT EXISTS stats (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO stats (name, value) VALUES ('hits', 0), ('misses', 0), ('evictions', 0);
+        """)
+        conn.commit()
+
+    def _bump(self, conn, name, amount=1):
+        conn.execute('UPDATE stats SET value = value + ? WHERE name = ?', (amount, name))
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute('SELECT response, created_at FROM answers WHERE key = ?', (key,)).fetchone()
+            if row and (not self.ttl or now - row[1] <= self.ttl):
+                conn.execute('UPDATE answers SET last_access = ?, hits = hits + 1 WHERE key = ?', (now, key))
+                self._bump(conn, 'hits')
+                conn.commit()
+                return json.loads(row[0])
+            if row:
+                conn.execute('DELETE FROM answers WHERE key = ?', (key,))
+            self._bump(conn, 'misses')
+            conn.commit()
+        return None
+
+    def put(self, key, provider, model, response):
+        data = json.dumps(response, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                'INSERT OR REPLACE INTO answers (key, provider, model, response, size, created_at, last_access) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (key, provider, model, data, len(data.encode('utf-8')), now, now)
+            )
+            self._evict(conn, now)
+            conn.commit()
+
+    def _evict(self, conn, now):
+        evicted = 0
+        if self.ttl:
+            evicted += conn.execute('DELETE FROM answers WHERE created_at < ?', (now - self.ttl,)).rowcount
+        count, total = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM answers').fetchone()
+        # En uzun süredir kullanılmayan kayıtlardan başlayarak sınırların altına in
+        while count > self.max_entries or total > self.max_bytes:
+            rows = conn.execute(
+                'SELECT key, size FROM answers ORDER BY last_access LIMIT ?', (max(1, count // 10),)
+            ).fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                conn.execute('DELETE FROM answers WHERE key = ?', (key,))
+                count -= 1
+                total -= size
+                evicted += 1
+                if count <= self.max_entries and total <= self.max_bytes:
+                    break
+        if evicted:
+            self._bump(conn, 'evictions', evicted)
+            logging.info(f"Yanıt önbelleğinden {evicted} kayıt çıkarıldı")
+
+    def stats(self):
+        conn = self._connection()
+        values = dict(conn.execute('SELECT name, value FROM stats'))
+        count, total = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM answers').fetchone()
+        lookups = values['hits'] + values['misses']
+        return {
+            'entries': count,
+            'bytes': total,
+            'hits': values['hits'],
+            'misses': values['misses'],
+            'evictions': values['evictions'],
+            'hit_rate': round(values['hits'] / lookups, 4) if lookups else 0.0
+        }
+
+    def clear(self):
+        with self._lock:
+            conn = self._connection()
+            conn.execute('DELETE FROM answers')
+            conn.execute('UPDATE stats SET value = 0')
+            conn.commit()
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache():
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = AnswerCache()
+    return _default_cache
@@ -0,0 +1,109 @@
+import os
+import json
+import logging
+from http_pool import get_session
+from ai_assistant import StreamingResponse
+
+# Tanımlıysa Streamlit arayüzü modelleri kendisi çağırmaz, bu adresteki API sunucusunu kullanır
+API_URL = os.getenv('GIB_API_URL', '')
+API_TIMEOUT = float(os.getenv('GIB_API_TIMEOUT', '300'))
+
+
+class ApiClientError(Exception):
+    pass
+
+
+class ApiClient:
+    # AIAssistant ile aynı arayüz; istekler api_server.py'ye gider
+    def __init__(self, base_url, model_provider="huggingface", api_token=None):
+        self.base_url = base_url.rstrip('/')
+        self.model_provider = model_provider
+        self.api_token = api_token
+        self.session = get_session()
+
+    def _post(self, path, stream=False, **kwargs):
+        headers = kwargs.pop('headers', {})
+        if self.api_token:
+            headers['Authorization'] = f"Bearer {self.api_token}"
+        response = self.session.post(f"{self.base_url}{path}", headers=headers, timeout=API_TIMEOUT, stream=stream, **kwargs)
+        if response.status_code != 200:
+            try:
+                message = response.json().get('error', response.text)
+            except ValueError:
+                message = response.text
+            response.close()
+            raise ApiClientError(f"API hatası ({response.status_code}): {message}")
+        return response
+
+    def _answer_body(self, question, search_gib, search_mevbank):
+        return {
+            'question': question,
+            'provider': self.model_provider,
+            'search_gib': search_gib,
+            'search_mevbank': search_mevbank,
+        }
+
+    def _analysis_request(self, file_content, file_type, question, search_gib, search_mevbank):
+        params = {'provider': self.model_provider, 'file_type': file_type,
+                  'search_gib': int(search_gib), 'search_mevbank': int(search_mevbank)}
+        if question:
+            params['question'] = question
+        return {'params': params, 'data': file_content,
+                'headers': {'Content-Type': 'application/pdf' if file_type == 'pdf' else 'application/xml'}}
+
+    def _stream(self, path, cancel_event=None, **kwargs):
+        response = self._post(path, stream=True, **kwargs)
+        response.encoding = 'utf-8'
+        lines = response.iter_lines(decode_unicode=True)
+        # İlk satır içerik ve mevzuat bilgisini taşır; ardından token satırları gelir
+        head = json.loads(next(lines, '') or '{}')
+        if head.get('error'):
+            response.close()
+            return StreamingResponse(iter(()), error=head['error'])
+
+        def tokens():
+            with response:
+                for line in lines:
+                    if cancel_event is not None and cancel_event.is_set():
+                        # Bağlantı kapatılır; sunucu akışı ve model isteğini bırakır
+                        return
+                    if not line:
+                        continue
+                    event = json.loads(line)
+                    if 'token' in event:
+                        yield event['token']
+                    elif event.get('error'):
+                        logging.error(f"API akış hatası: {event['error']}")
+                        raise ApiClientError(event['error'])
+                    elif event.get('done'):
+                        return
+                # 'done' satırı gelmeden kapanan bağlantı kesik yanıttır
+                raise ApiClientError("API akışı yarıda kesildi")
+
+        return StreamingResponse(
+            tokens(),
+            content=head.get('content'),
+            mevzuat=head.get('mevzuat'),
+            timed_out_sources=head.get('timed_out_sources')
+        )
+
+    def get_answer(self, question, search_gib=False, search_mevbank=False):
+        result = self._post('/v1/answer', json=self._answer_body(question, search_gib, search_mevbank)).json()
+        return [{'generated_text': result['answer'], 'mevzuat': result['mevzuat'],
+                 'timed_out_sources': result['timed_out_sources']}]
+
+    def stream_answer(self, question, search_gib=False, search_mevbank=False, cancel_event=None):
+        return self._stream('/v1/answer/stream', cancel_event, json=self._answer_body(question, search_gib, search_mevbank))
+
+    def analyze_file(self, file_content, file_type, question=None, search_gib=False, search_mevbank=False):
+        try:
+            return self._post('/v1/analyze', **self._analysis_request(file_content, file_type, question, search_gib, search_mevbank)).json()
+        except ApiClientError as e:
+            return {"success": False, "error": str(e)}
+
+    def stream_analysis(self, file_content, file_type, question=None, search_gib=False, search_mevbank=False,
+                        cancel_event=None):
+        try:
+            return self._stream('/v1/analyze/stream', cancel_event, **self._analysis_request(file_content, file_type, question, search_gib, search_mevbank))
+        except ApiClientError as e:
+            return StreamingResponse(iter(()), error=str(e))
@@ -0,0 +1,432 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import argparse
+import threading
+from urllib.parse import urlsplit, parse_qs
+from concurrent.futures import ThreadPoolExecutor
+from ai_assistant import get_assistant
+from provider_router import ProviderRouter
+from rate_limit import CircuitOpenError
+from extraction_store import get_extraction_store
+from metrics import span, inc, observe, get_metrics
+import singleflight
+
+API_HOST = os.getenv('GIB_API_HOST', '127.0.0.1')
+API_PORT = int(os.getenv('GIB_API_PORT', '8080'))
+# Aynı anda çalışan model/arama işi sayısı ve kuyrukta bekleyebilecek en fazla istek
+API_WORKERS = int(os.getenv('GIB_API_WORKERS', '8'))
+API_QUEUE_SIZE = int(os.getenv('GIB_API_QUEUE_SIZE', '64'))
+MAX_BODY_BYTES = int(os.getenv('GIB_API_MAX_BODY_BYTES', str(25 * 1024 * 1024)))
+READ_TIMEOUT = float(os.getenv('GIB_API_READ_TIMEOUT', '30'))
+RETRY_AFTER = 1
+
+PROVIDERS = ('huggingface', 'anthropic', 'openai')
+TOKEN_ENV = {
+    'huggingface': 'HUGGING_FACE_TOKEN',
+    'anthropic': 'ANTHROPIC_API_KEY',
+    'openai': 'OPENAI_API_KEY',
+}
+FILE_TYPES = {
+    'application/pdf': 'pdf',
+    'application/xml': 'xml',
+    'text/xml': 'xml',
+}
+REASONS = {
+    200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 408: 'Request Timeout',
+    411: 'Length Required', 413: 'Payload Too Large', 415: 'Unsupported Media Type', 500: 'Internal Server Error',
+    502: 'Bad Gateway', 503: 'Service Unavailable',
+}
+
+
+class ApiError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class Request:
+    def __init__(self, method, target, headers, body):
+        parts = urlsplit(target)
+        self.method = method
+        self.path = parts.path.rstrip('/') or '/'
+        self.query = {name: values[-1] for name, values in parse_qs(parts.query).items()}
+        self.headers = headers
+        self.body = body
+
+    @property
+    def keep_alive(self):
+        return self.headers.get('connection', '').lower() != 'close'
+
+    def json(self):
+        if not self.body:
+            return {}
+        try:
+            data = json.loads(self.body)
+        except ValueError:
+            raise ApiError(400, "Geçersiz JSON")
+        if not isinstance(data, dict):
+            raise ApiError(400, "JSON nesnesi bekleniyor")
+        return data
+
+
+def _flag(value):
+    if isinstance(value, str):
+        return value.lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
+
+
+class ApiServer:
+    def __init__(self, host=API_HOST, port=API_PORT, workers=API_WORKERS, queue_size=API_QUEUE_SIZE,
+                 assistant_factory=None):
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.queue_size = queue_size
+        # Asistanlar (ve paylaştıkları scraper, indeks, önbellek) istekler arasında yeniden kullanılır
+        self.assistant_factory = assistant_factory or get_assistant
+        self._assistants = {}
+        self._assistants_lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='api-worker')
+        self.queue = None
+        self.server = None
+        self.loop = None
+        self._worker_tasks = []
+        self._ready = threading.Event()
+        self.routes = {
+            ('GET', '/health'): self.health,
+            ('GET', '/metrics'): self.metrics,
+            ('POST', '/v1/answer'): self.answer,
+            ('POST', '/v1/answer/stream'): self.answer_stream,
+            ('POST', '/v1/analyze'): self.analyze,
+            ('POST', '/v1/analyze/stream'): self.analyze_stream,
+        }
+
+    def router(self):
+        # provider=auto: ortamda token'ı olan tüm sağlayıcılar arasında yedek istekli yönlendirme
+        with self._assistants_lock:
+            if 'auto' not in self._assistants:
+                try:
+                    self._assistants['auto'] = ProviderRouter({provider: os.getenv(env, '') for provider, env in TOKEN_ENV.items()})
+                except ValueError as e:
+                    raise ApiError(400, str(e))
+            return self._assistants['auto']
+
+    def assistant(self, provider, token):
+        if provider == 'auto':
+            return self.router()
+        if provider not in PROVIDERS:
+            raise ApiError(400, f"Bilinmeyen sağlayıcı: {provider}")
+        token = token or os.getenv(TOKEN_ENV[provider], '')
+        if not token:
+            raise ApiError(400, f"{provider} için API token'ı eksik")
+        key = (provider, token)
+        with self._assistants_lock:
+            if key not in self._assistants:
+                self._assistants[key] = self.assistant_factory(provider, token)
+            return self._assistants[key]
+
+    def _request_assistant(self, request, params):
+        token = params.get('api_token')
+        authorization = request.headers.get('authorization', '')
+        if not token and authorization.lower().startswith('bearer '):
+            token = authorization[7:].strip()
+        return self.assistant(params.get('provider') or 'huggingface', token)
+
+    # --- İş kuyruğu ---
+
+    async def submit(self, func, *args):
+        # Kuyruk doluysa istek bekletilmeden reddedilir; istemci Retry-After sonra tekrar dener
+        future = self.loop.create_future()
+        try:
+            self.queue.put_nowait((func, args, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            inc("gib_api_rejected_total")
+            raise ApiError(503, "Sunucu meşgul, lütfen tekrar deneyin", {'Retry-After': str(RETRY_AFTER)})
+        return await future
+
+    async def _worker(self):
+        while True:
+            func, args, future, queued_at = await self.queue.get()
+            observe("gib_api_queue_wait_seconds", time.perf_counter() - queued_at)
+            try:
+                if not future.cancelled():
+                    result = await self.loop.run_in_executor(self.executor, func, *args)
+                    if not future.cancelled():
+                        future.set_result(result)
+            except Exception as e:
+                if not future.cancelled():
+                    future.set_exception(e)
+            finally:
+                self.queue.task_done()
+
+    # --- Uç noktalar ---
+
+    async def health(self, request):
+        return 200, {
+            'status': 'ok',
+            'queued': self.queue.qsize(),
+            'queue_size': self.queue_size,
+            'workers': self.workers,
+            'assistants': len(self._assistants),
+            'singleflight': singleflight.stats(),
+            'extraction_store': get_extraction_store().stats(),
+        }
+
+    async def metrics(self, request):
+        if request.query.get('format') == 'json':
+            return 200, get_metrics().snapshot()
+        return 200, get_metrics().to_prometheus().encode('utf-8'), 'text/plain; version=0.0.4; charset=utf-8'
+
+    def _answer_params(self, request):
+        params = request.json()
+        question = (params.get('question') or '').strip()
+        if not question:
+            raise ApiError(400, "question alanı zorunludur")
+        return self._request_assistant(request, params), question, _flag(params.get('search_gib')), _flag(params.get('search_mevbank'))
+
+    async def answer(self, request):
+        assistant, question, search_gib, search_mevbank = self._answer_params(request)
+        result = await self.submit(assistant.get_answer, question, search_gib, search_mevbank)
+        if not result:
+            raise ApiError(502, "Yanıt alınamadı")
+        return 200, {
+            'answer': result[0].get('generated_text', ''),
+            'mevzuat': result[0].get('mevzuat', []),
+            'timed_out_sources': result[0].get('timed_out_sources', []),
+        }
+
+    async def answer_stream(self, request):
+        assistant, question, search_gib, search_mevbank = self._answer_params(request)
+        return await self._stream(assistant.stream_answer, question, search_gib, search_mevbank)
+
+    def _analysis_params(self, request):
+        content_type = request.headers.get('content-type', '').split(';')[0].strip().lower()
+        if content_type == 'application/json':
+            raise ApiError(415, "Dosya ham gövde olarak gönderilmeli (application/pdf veya application/xml)")
+        # Dosya gövdede, seçenekler sorgu parametrelerinde gelir
+        params = request.query
+        file_type = params.get('file_type') or FILE_TYPES.get(content_type)
+        if file_type not in ('pdf', 'xml'):
+            raise ApiError(415, "Desteklenmeyen dosya formatı")
+        if not request.body:
+            raise ApiError(400, "Dosya içeriği boş")
+        return (
+            self._request_assistant(request, params), request.body, file_type, params.get('question') or None,
+            _flag(params.get('search_gib')), _flag(params.get('search_mevbank'))
+        )
+
+    async def analyze(self, request):
+        assistant, *args = self._analysis_params(request)
+        result = await self.submit(assistant.analyze_file, *args)
+        if result.get('error'):
+            return 502 if 'success' in result else 415, {'error': result['error']}
+        return 200, result
+
+    async def analyze_stream(self, request):
+        assistant, *args = self._analysis_params(request)
+        return await self._stream(assistant.stream_analysis, *args)
+
+    async def _stream(self, func, *args):
+        # Akış, işçi iş parçacığında tüketilir; her satır olay döngüsüne iletilir (NDJSON)
+        events = asyncio.Queue()
+        cancelled = threading.Event()
+
+        def emit(event):
+            self.loop.call_soon_threadsafe(events.put_nowait, event)
+
+        def run():
+            try:
+                stream = func(*args)
+                if stream.error:
+                    emit({'error': stream.error})
+                    return
+                emit({'content': stream.content, 'mevzuat': stream.mevzuat, 'timed_out_sources': stream.timed_out_sources})
+                for token in stream:
+                    if cancelled.is_set():
+                        break
+                    emit({'token': token})
+                if not stream.completed and not cancelled.is_set():
+                    # Sağlayıcı akışı yarıda kesildi; kesik yanıt tamamlanmış gibi bildirilmez
+                    emit({'error': stream.error or "Yanıt yarıda kesildi"})
+                    return
+                emit({'done': True, 'completed': stream.completed})
+            except Exception as e:
+                emit({'error': str(e)})
+            finally:
+                emit(None)
+
+        # İş kuyruğa alınamazsa (503) akış başlamadan hata döner
+        task = asyncio.ensure_future(self.submit(run))
+        getter = asyncio.ensure_future(events.get())
+        await asyncio.wait({task, getter}, return_when=asyncio.FIRST_COMPLETED)
+        if not getter.done() and task.exception() is not None:
+            getter.cancel()
+            task.result()
+        return 200, _StreamBody(await getter, events, cancelled, task)
+
+    # --- HTTP/1.1 ---
+
+    async def _read_request(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, _ = line.decode('latin-1').split()
+        except ValueError:
+            raise ApiError(400, "Geçersiz istek satırı")
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            raise ApiError(411, "Content-Length gerekli")
+        length = int(headers.get('content-length') or 0)
+        if length > MAX_BODY_BYTES:
+            raise ApiError(413, "İstek gövdesi çok büyük")
+        body = await reader.readexactly(length) if length else b''
+        return Request(method.upper(), target, headers, body)
+
+    def _head(self, status, content_type, headers, keep_alive, length=None):
+        lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}", f"Content-Type: {content_type}"]
+        lines.append(f"Content-Length: {length}" if length is not None else "Transfer-Encoding: chunked")
+        lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+        lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+        return ("\r\n".join(lines) + "\r\n\r\n").encode('latin-1')
+
+    async def _respond(self, writer, status, body, content_type=None, headers=None, keep_alive=True):
+        if isinstance(body, _StreamBody):
+            writer.write(self._head(status, 'application/x-ndjson; charset=utf-8', headers, keep_alive))
+            try:
+                async for line in body:
+                    writer.write(b"%x\r\n%s\r\n" % (len(line), line))
+                    await writer.drain()
+                writer.write(b"0\r\n\r\n")
+                await writer.drain()
+            except (ConnectionError, asyncio.CancelledError):
+                body.cancel()
+                raise
+            return
+        if not isinstance(body, bytes):
+            body = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            content_type = 'application/json; charset=utf-8'
+        writer.write(self._head(status, content_type, headers, keep_alive, len(body)) + body)
+        await writer.drain()
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), READ_TIMEOUT)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+                    break
+                except ApiError as e:
+                    await self._respond(writer, e.status, {'error': str(e)}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                await self._dispatch(request, writer)
+                if not request.keep_alive:
+                    break
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, request, writer):
+        handler = self.routes.get((request.method, request.path))
+        route = request.path if handler else 'unknown'
+        start = time.perf_counter()
+        headers = {}
+        try:
+            with span("api.request", route=route):
+                if handler is None:
+                    allowed = [method for method, path in self.routes if path == request.path]
+                    raise ApiError(405 if allowed else 404, "Uç nokta bulunamadı")
+                status, body, *content_type = await handler(request)
+        except ApiError as e:
+            status, body, content_type, headers = e.status, {'error': str(e)}, [], e.headers
+        except CircuitOpenError as e:
+            status, body, content_type, headers = 503, {'error': str(e)}, [], {'Retry-After': str(RETRY_AFTER)}
+        except Exception as e:
+            logging.error(f"API isteği başarısız ({request.path}): {str(e)}")
+            status, body, content_type = 500, {'error': str(e)}, []
+        inc("gib_api_requests_total", route=route, status=str(status))
+        await self._respond(writer, status, body, content_type[0] if content_type else None, headers, request.keep_alive)
+        logging.info(f"{request.method} {request.path} {status} {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    # --- Yaşam döngüsü ---
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self._worker_tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        logging.info(f"API sunucusu http://{self.host}:{self.port} adresinde başlatıldı "
+                     f"({self.workers} işçi, kuyruk {self.queue_size})")
+        self._ready.set()
+
+    async def serve_forever(self):
+        await self.start()
+        async with self.server:
+            try:
+                await self.server.serve_forever()
+            except asyncio.CancelledError:
+                # stop() ile sunucu kapatıldı
+                pass
+
+    def start_in_thread(self):
+        threading.Thread(target=lambda: asyncio.run(self.serve_forever()), name='api-server', daemon=True).start()
+        self._ready.wait()
+        return f"http://{self.host}:{self.port}"
+
+    def stop(self):
+        if self.loop is not None and self.server is not None:
+            self.loop.call_soon_threadsafe(self.server.close)
+        self.executor.shutdown(wait=False)
+
+
+class _StreamBody:
+    def __init__(self, first, events, cancelled, task):
+        self.first = first
+        self.events = events
+        self.cancelled = cancelled
+        self.task = task
+
+    def cancel(self):
+        # İstemci bağlantıyı kapattıysa işçi akışı bırakır
+        self.cancelled.set()
+
+    async def __aiter__(self):
+        event = self.first
+        while event is not None:
+            yield (json.dumps(event, ensure_ascii=False) + "\n").encode('utf-8')
+            event = await self.events.get()
+        await self.task
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GİB AI Asistan HTTP API sunucusu")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--workers", type=int, default=API_WORKERS)
+    parser.add_argument("--queue-size", type=int, default=API_QUEUE_SIZE)
+    args = parser.parse_args()
+    server = ApiServer(args.host, args.port, args.workers, args.queue_size)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    from metrics import configure_logging
+    configure_logging(filename=None, console=True)
+    main()
@@ -1,14 +1,34 @@
 import streamlit as st
 import os
-from ai_assistant import AIAssistant
+import time
+import uuid
+from ai_assistant import get_assistant
+from api_client import ApiClient, API_URL
+from provider_router import ProviderRouter
+from http_pool import pool_stats
+from answer_cache import get_default_cache
+from extraction_store import get_extraction_store
+from jobs import get_job_manager, JobLimitError, DONE, FAILED, CANCELLED
+import singleflight
+from metrics import configure_logging, start_http_exporter, get_metrics
 import logging
 
-# Logging ayarları
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    filename='app.log'
-)
+# Logging ayarları (kuyruk tabanlı, tüm modüller için tek yapılandırma)
+configure_logging('app.log')
+start_http_exporter()
+
+def create_assistant(model_provider, api_token):
+    # GIB_API_URL tanımlıysa arayüz yalnızca API sunucusunun istemcisidir
+    if API_URL:
+        return ApiClient(API_URL, model_provider=model_provider, api_token=api_token)
+    if st.session_state.use_router:
+        # Seçili model birincil, token'ı girilmiş diğer sağlayıcılar yedek
+        providers = ["huggingface", "anthropic", "openai"]
+        providers.sort(key=lambda provider: provider != model_provider)
+        tokens = {provider: st.session_state[f"{provider}_token"] for provider in providers}
+        return ProviderRouter(tokens, providers=providers)
+    # Asistanlar süreç genelinde saklanır; her "Yanıtla"/"Analiz Et" tıklamasında yeniden kurulmaz
+    return get_assistant(model_provider, api_token)
 
 def initialize_session_state():
     if 'huggingface_token' not in st.session_state:
@@ -19,8 +39,13 @@ def initialize_session_state():
         st.session_state.openai_token = os.getenv('OPENAI_API_KEY', '')
     if 'selected_model' not in st.session_state:
         st.session_state.selected_model = 'huggingface'
+    if 'use_router' not in st.session_state:
+        st.session_state.use_router = False
     if 'api_tokens_expanded' not in st.session_state:
         st.session_state.api_tokens_expanded = True
+    # İş sahibi kimliği: kullanıcı başına eşzamanlı iş sınırı bu oturum kimliğiyle uygulanır
+    if 'user_id' not in st.session_state:
+        st.session_state.user_id = uuid.uuid4().hex
 
 def save_token(token_name, token_value):
     if token_name in st.session_state:
@@ -29,6 +54,82 @@ def save_token(token_name, token_value):
         return True
     return False
 
+# Süren işler için sayfa bu aralıkla yeniden çizilir (sn)
+JOB_POLL_SECONDS = 0.5
+
+JOB_STAGES = {
+    "queued": "Sırada bekliyor",
+    "searching": "Mevzuat aranıyor",
+    "extracting": "Dosya okunuyor",
+    "analyzing": "Analiz ediliyor",
+    "generating": "Yanıt yazılıyor"
+}
+
+
+def submit_job(session_key, submit, *args, **kwargs):
+    try:
+        job = submit(st.session_state.user_id, *args, **kwargs)
+        st.session_state[session_key] = job.id
+    except JobLimitError as e:
+        st.warning(f"{str(e)}. Önceki işlerin bitmesini bekleyin ya da iptal edin.")
+
+
+def show_mevzuat(snapshot):
+    if snapshot['timed_out_sources']:
+        st.info(f"Zaman aşımına uğrayan kaynaklar: {', '.join(snapshot['timed_out_sources'])}")
+    if snapshot['mevzuat']:
+        with st.expander("İlgili Mevzuat Bilgileri", expanded=True):
+            for bilgi in snapshot['mevzuat']:
+                st.markdown(f"**[{bilgi['title']}]({bilgi['link']})**")
+                st.write(bilgi['content'])
+                st.markdown("---")
+
+
+def render_job(session_key, error_message):
+    # Her çalıştırmada işin tek bir anlık görüntüsü çizilir; iş sürüyorsa döndürülür ve sayfa main sonunda yenilenir
+    manager = get_job_manager()
+    job = manager.get(st.session_state.get(session_key))
+    if job is None:
+        return None
+    if not job.done and st.button("İptal", key=f"{session_key}_cancel"):
+        manager.cancel(job.id)
+    
+    snapshot = job.snapshot()
+    progress = snapshot['progress']
+    if snapshot['state'] not in (DONE, FAILED, CANCELLED):
+        parts = [JOB_STAGES.get(progress['stage'], progress['stage'])]
+        if job.cancel_event.is_set():
+            parts = ["İptal ediliyor"]
+        if progress['units']:
+            parts.append(f"{progress['units']} sayfa/öğe okundu")
+        if progress['chunks_total']:
+            parts.append(f"{progress['chunks_done']}/{progress['chunks_total']} bölüm analiz edildi")
+        st.caption(" · ".join(parts))
+        st.markdown(snapshot['text'] + "▌")
+        return job
+    
+    if snapshot['state'] == DONE:
+        if snapshot['content'] is not None:
+            with st.expander("Dosya İçeriği", expanded=False):
+                st.text(snapshot['content'])
+        st.markdown(snapshot['text'].strip())
+        show_mevzuat(snapshot)
+    elif snapshot['state'] == CANCELLED:
+        if snapshot['text']:
+            st.markdown(snapshot['text'])
+        st.info("İş iptal edildi.")
+    elif snapshot['state'] == FAILED:
+        st.error(f"{error_message}: {snapshot['error']}")
+    return None
+
+
+def wait_for_progress(jobs, timeout=JOB_POLL_SECONDS):
+    # Kısa ve sınırlı bekleme: işlerden biri biterse erken döner, betik iş süresince bekletilmez
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and not any(job.done for job in jobs):
+        jobs[0].wait(min(JOB_POLL_SECONDS / 5, deadline - time.monotonic()))
+
+
 def main():
     st.set_page_config(
         page_title="GİB AI Asistan",
@@ -95,6 +196,40 @@ def main():
         if model_option != st.session_state.selected_model:
             st.session_state.selected_model = model_option
             st.experimental_rerun()
+        
+        st.session_state.use_router = st.checkbox(
+            "Yavaş yanıtta diğer sağlayıcıya yedek istek gönder",
+            value=st.session_state.use_router,
+            help="Seçili model gecikirse token'ı girilmiş diğer sağlayıcılara da istek gönderilir, ilk yanıt veren kullanılır"
+        )
+        
+        with st.expander("Bağlantı İstatistikleri", expanded=False):
+            stats = pool_stats()
+            st.write(f"İstek: {stats['requests']}, yeni bağlantı: {stats['new_connections']}, "
+                     f"yeniden kullanılan: {stats['reused']} (%{stats['reuse_ratio'] * 100:.0f})")
+            cache_stats = get_default_cache().stats()
+            st.write(f"Yanıt önbelleği: {cache_stats['entries']} kayıt, "
+                     f"isabet oranı %{cache_stats['hit_rate'] * 100:.0f} "
+                     f"({cache_stats['hits']} isabet / {cache_stats['misses']} ıska)")
+            store_stats = get_extraction_store().stats()
+            st.write(f"Çıkarma deposu: {store_stats['entries']} belge, "
+                     f"{store_stats['hits']} isabet / {store_stats['misses']} ıska, "
+                     f"atlanan çıkarma {store_stats['bytes_saved'] / (1024 * 1024):.1f} MB")
+            job_stats = get_job_manager().stats()
+            st.write(f"Arka plan işleri: {job_stats['running']} çalışıyor, {job_stats['queued']} sırada, "
+                     f"{job_stats['done']} tamamlandı")
+            for name, flight in singleflight.stats().items():
+                st.write(f"Birleştirilen eş istekler ({name}): {flight['collapsed']} "
+                         f"/ {flight['executions'] + flight['collapsed']}")
+        
+        with st.expander("Performans Metrikleri", expanded=False):
+            metrics = get_metrics()
+            stages = metrics.stage_summary()
+            if stages:
+                st.table(stages)
+            else:
+                st.write("Henüz ölçüm yok")
+            st.download_button("Prometheus formatında indir", metrics.to_prometheus(), file_name="metrics.prom")
     
     # Token kontrolü ve uyarı mesajları
     token_warnings = {
@@ -124,30 +259,17 @@ def main():
         if st.button("Yanıtla", key="answer_button"):
             if question:
                 try:
-                    assistant = AIAssistant(
-                        model_provider=st.session_state.selected_model,
-                        api_token=selected_token
-                    )
-                    with st.spinner("Yanıt hazırlanıyor..."):
-                        result = assistant.get_answer(question, search_gib=search_gib, search_mevbank=search_mevbank)
-                        if result:
-                            answer = result[0].get('generated_text', '').strip()
-                            st.write(answer)
-                            
-                            # Mevzuat sonuçlarını göster
-                            if hasattr(result[0], 'mevzuat') and result[0]['mevzuat']:
-                                with st.expander("İlgili Mevzuat Bilgileri", expanded=True):
-                                    for bilgi in result[0]['mevzuat']:
-                                        st.markdown(f"**{bilgi['baslik']}**")
-                                        st.write(bilgi['icerik'])
-                                        st.markdown("---")
-                        else:
-                            st.error("Yanıt alınamadı. Lütfen tekrar deneyin.")
+                    assistant = create_assistant(st.session_state.selected_model, selected_token)
+                    submit_job("answer_job", get_job_manager().submit_answer, assistant, question,
+                               search_gib=search_gib, search_mevbank=search_mevbank)
                 except Exception as e:
                     logging.error(f"Hata: {str(e)}")
                     st.error(f"Bir hata oluştu: {str(e)}")
             else:
                 st.warning("Lütfen bir soru girin.")
+        
+        # Token'lar geldikçe yanıtı güncelle; sayfa yeniden çizilse de son iş gösterilir
+        running = [render_job("answer_job", "Bir hata oluştu")]
     
     with tabs[1]:
         st.subheader("Dosya Analizi")
@@ -170,38 +292,21 @@ def main():
             
             if st.button("Analiz Et", key="analyze_button"):
                 try:
-                    assistant = AIAssistant(
-                        model_provider=st.session_state.selected_model,
-                        api_token=selected_token
-                    )
-                    with st.spinner("Dosya analiz ediliyor..."):
-                        result = assistant.analyze_file(
-                            file_content, 
-                            file_type, 
-                            analysis_question,
-                            search_gib=search_gib,
-                            search_mevbank=search_mevbank
-                        )
-                        
-                        if result.get('success'):
-                            with st.expander("Dosya İçeriği", expanded=False):
-                                st.text(result['content'])
-                            
-                            st.subheader("Analiz Sonucu:")
-                            st.write(result['analysis'])
-                            
-                            # Mevzuat sonuçlarını göster
-                            if result.get('mevzuat'):
-                                with st.expander("İlgili Mevzuat Bilgileri", expanded=True):
-                                    for bilgi in result['mevzuat']:
-                                        st.markdown(f"**{bilgi['baslik']}**")
-                                        st.write(bilgi['icerik'])
-                                        st.markdown("---")
-                        else:
-                            st.error(f"Analiz sırasında bir hata oluştu: {result.get('error')}")
+                    assistant = create_assistant(st.session_state.selected_model, selected_token)
+                    submit_job("analysis_job", get_job_manager().submit_analysis, assistant, file_content, file_type,
+                               analysis_question, search_gib=search_gib, search_mevbank=search_mevbank)
                 except Exception as e:
                     logging.error(f"Dosya analizi hatası: {str(e)}")
                     st.error(f"Dosya analizi sırasında bir hata oluştu: {str(e)}")
+        
+        if st.session_state.get("analysis_job"):
+            st.subheader("Analiz Sonucu:")
+        running.append(render_job("analysis_job", "Analiz sırasında bir hata oluştu"))
+    
+    running = [job for job in running if job is not None]
+    if running:
+        wait_for_progress(running)
+        st.rerun()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,137 @@
+import os
+import asyncio
+import logging
+import threading
+import httpx
+from metrics import span, inc
+
+# Tek süreçte yüzlerce eşzamanlı model isteği: iş parçacığı yerine tek olay döngüsü, HTTP/2 ile bağlantı başına çoklu akış
+MAX_CONNECTIONS = int(os.getenv('GIB_ASYNC_MAX_CONNECTIONS', '100'))
+MAX_KEEPALIVE = int(os.getenv('GIB_ASYNC_MAX_KEEPALIVE', '20'))
+HTTP2 = os.getenv('GIB_HTTP2', '1') == '1'
+REQUEST_TIMEOUT = 30
+
+
+def _build_client():
+    return httpx.AsyncClient(
+        http2=HTTP2,
+        limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_KEEPALIVE),
+        timeout=httpx.Timeout(REQUEST_TIMEOUT, connect=10.0)
+    )
+
+
+class AsyncRunner:
+    # Arka planda çalışan tek olay döngüsü; senkron kod coroutine'leri buraya gönderip Future alır
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.client = None
+        self.slots = None
+        self._thread = threading.Thread(target=self._run, name='async-providers', daemon=True)
+        self._started = threading.Event()
+        self._thread.start()
+        self._started.wait()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.client = _build_client()
+        # httpcore havuz kuyruğu uzadıkça bağlantı atama maliyeti karesel artar; fazlası burada bekletilir
+        self.slots = asyncio.Semaphore(MAX_CONNECTIONS)
+        self._started.set()
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout=None):
+        return self.submit(coro).result(timeout)
+
+    def close(self):
+        if self.loop.is_running():
+            self.run(self.client.aclose())
+            self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_runner():
+    global _runner
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                _runner = AsyncRunner()
+                logging.info(f"Async model istemcisi başlatıldı (HTTP/2: {HTTP2}, en fazla {MAX_CONNECTIONS} bağlantı)")
+    return _runner
+
+
+class AsyncProviderClient:
+    # AIAssistant'ın payload/yanıt formatlarını, kota, devre kesici ve tekrar deneme kurallarını kullanır
+    def __init__(self, assistant, runner=None):
+        self.assistant = assistant
+        self.runner = runner or get_runner()
+
+    @property
+    def client(self):
+        return self.runner.client
+
+    async def _before_request(self, prompt, usage=None):
+        wait = self.assistant._reserve_request(prompt, usage)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def request(self, prompt, max_retries=3, usage=None):
+        assistant = self.assistant
+        provider = assistant.model_provider
+        payload = assistant._build_payload(prompt)
+        for attempt in range(max_retries):
+            try:
+                await self._before_request(prompt, usage)
+                logging.info(f"Async API isteği yapılıyor (deneme {attempt + 1}/{max_retries})")
+
+                async with self.runner.slots:
+                    with span("provider.request", provider=provider):
+                        response = await self.client.post(
+                            assistant.current_config["api_url"],
+                            headers=assistant.current_config["headers"],
+                            json=payload
+                        )
+                        response.raise_for_status()
+                assistant.circuit_breaker.record_success()
+                result = assistant._parse_response(response.json())
+                assistant._settle_request(prompt, result[0]["generated_text"])
+                return result
+
+            except Exception as e:
+                delay = assistant._retry_delay(e, attempt, max_retries)
+                if delay is None:
+                    inc("gib_provider_failures_total", provider=provider)
+                    logging.error(f"Async API hatası: {str(e)}")
+                    return None
+                inc("gib_retries_total", provider=provider)
+                logging.warning(f"Async API hatası, {delay:.1f} sn sonra tekrar denenecek: {str(e)}")
+                await asyncio.sleep(delay)
+        return None
+
+    async def gather(self, prompts, concurrency=None):
+        # Sıra korunur; concurrency verilirse aynı anda o kadar istek uçuşta olur
+        semaphore = asyncio.Semaphore(concurrency) if concurrency else None
+
+        async def one(prompt):
+            if semaphore is None:
+                return await self.request(prompt)
+            async with semaphore:
+                return await self.request(prompt)
+
+        return await asyncio.gather(*(one(prompt) for prompt in prompts))
+
+    # --- Senkron sarmalayıcılar ---
+
+    def submit(self, prompt, usage=None):
+        return self.runner.submit(self.request(prompt, usage=usage))
+
+    def request_sync(self, prompt, max_retries=3):
+        return self.runner.run(self.request(prompt, max_retries))
+
+    def request_many(self, prompts, concurrency=None):
+        return self.runner.run(self.gather(prompts, concurrency))
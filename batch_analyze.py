@@ -0,0 +1,208 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from extraction import detect_file_type, extract_units
+from chunking import estimate_tokens
+
+TOKEN_ENV_VARS = {
+    "huggingface": "HUGGING_FACE_TOKEN",
+    "anthropic": "ANTHROPIC_API_KEY",
+    "openai": "OPENAI_API_KEY",
+}
+
+
+def collect_jobs(source, question=None):
+    # Kaynak bir klasör ya da her satırında bir dosya yolu (veya {"path", "question"} JSON'u) olan manifest olabilir
+    jobs = []
+    if os.path.isdir(source):
+        for root, _, files in os.walk(source):
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                if detect_file_type(path):
+                    jobs.append({"path": path, "question": question})
+    else:
+        base = os.path.dirname(os.path.abspath(source))
+        with open(source, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                entry = json.loads(line) if line.startswith("{") else {"path": line}
+                path = entry["path"] if os.path.isabs(entry["path"]) else os.path.join(base, entry["path"])
+                jobs.append({"path": path, "question": entry.get("question", question)})
+    return sorted(jobs, key=lambda job: job["path"])
+
+
+def completed_paths(output_path):
+    # Çökme sonrası devam: çıktıda başarıyla tamamlanmış dosyalar atlanır
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # yarım yazılmış son satır
+            if record.get("success"):
+                done.add(record["path"])
+    return done
+
+
+def _extract_job(path):
+    start = time.perf_counter()
+    file_type = detect_file_type(path)
+    try:
+        units = extract_units(path, file_type)
+        return {"path": path, "file_type": file_type, "units": units, "extract_seconds": time.perf_counter() - start}
+    except Exception as e:
+        return {"path": path, "file_type": file_type, "error": f"Çıkarma hatası: {e}",
+                "extract_seconds": time.perf_counter() - start}
+
+
+class BatchAnalyzer:
+    def __init__(self, assistant, extract_workers=None, llm_concurrency=4, search_gib=False, search_mevbank=False,
+                 include_content=False):
+        self.assistant = assistant
+        self.extract_workers = extract_workers or os.cpu_count() or 1
+        self.llm_concurrency = llm_concurrency
+        self.search_gib = search_gib
+        self.search_mevbank = search_mevbank
+        self.include_content = include_content
+        self._write_lock = threading.Lock()
+
+    def _analyze_job(self, job, extracted):
+        start = time.perf_counter()
+        result = self.assistant.analyze_units(
+            extracted["units"],
+            job["question"],
+            search_gib=self.search_gib,
+            search_mevbank=self.search_mevbank
+        )
+        analysis = result.get("analysis", "")
+        record = {
+            "path": job["path"],
+            "file_type": extracted["file_type"],
+            "success": bool(result.get("success") and analysis),
+            "analysis": analysis,
+            "error": result.get("error") or ("" if analysis else "Boş analiz"),
+            "extract_seconds": round(extracted["extract_seconds"], 3),
+            "analysis_seconds": round(time.perf_counter() - start, 3),
+            # Uzak API istemcisi gönderilen prompt'u bildirmez; o durumda belge metni tahmini kullanılır
+            "prompt_tokens": result.get("prompt_tokens", estimate_tokens(result.get("content", ""))),
+            "completion_tokens": estimate_tokens(analysis),
+        }
+        if self.include_content:
+            record["content"] = result.get("content", "")
+        return record
+
+    def run(self, jobs, output_path, resume=True):
+        skipped = completed_paths(output_path) if resume else set()
+        pending_jobs = [job for job in jobs if job["path"] not in skipped]
+        if skipped:
+            logging.info(f"{len(jobs) - len(pending_jobs)} dosya daha önce tamamlanmış, atlanıyor")
+
+        stats = {"files": 0, "succeeded": 0, "failed": 0, "skipped": len(jobs) - len(pending_jobs), "tokens": 0}
+        start = time.perf_counter()
+        # Çıkarılmış içeriğin bellekte birikmemesi için aynı anda sınırlı sayıda dosya işlenir
+        window = self.extract_workers + self.llm_concurrency * 2
+        mode = "a" if resume else "w"
+
+        with open(output_path, mode, encoding="utf-8") as output, \
+                ProcessPoolExecutor(max_workers=self.extract_workers) as extract_pool, \
+                ThreadPoolExecutor(max_workers=self.llm_concurrency) as llm_pool:
+            queue = iter(pending_jobs)
+            in_flight = {}
+
+            def submit_next():
+                job = next(queue, None)
+                if job is not None:
+                    in_flight[extract_pool.submit(_extract_job, job["path"])] = ("extract", job)
+                return job is not None
+
+            for _ in range(window):
+                if not submit_next():
+                    break
+
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, job = in_flight.pop(future)
+                    if stage == "extract":
+                        extracted = future.result()
+                        if "error" in extracted:
+                            self._write(output, {"path": job["path"], "file_type": extracted["file_type"],
+                                                 "success": False, "error": extracted["error"]}, stats)
+                            submit_next()
+                        else:
+                            in_flight[llm_pool.submit(self._analyze_job, job, extracted)] = ("analyze", job)
+                        continue
+                    try:
+                        record = future.result()
+                    except Exception as e:
+                        record = {"path": job["path"], "success": False, "error": str(e)}
+                    self._write(output, record, stats)
+                    submit_next()
+
+        stats["elapsed_seconds"] = round(time.perf_counter() - start, 2)
+        minutes = stats["elapsed_seconds"] / 60 or 1e-9
+        stats["files_per_minute"] = round(stats["files"] / minutes, 2)
+        stats["tokens_per_minute"] = round(stats["tokens"] / minutes, 1)
+        return stats
+
+    def _write(self, output, record, stats):
+        with self._write_lock:
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            output.flush()
+            stats["files"] += 1
+            stats["succeeded" if record.get("success") else "failed"] += 1
+            stats["tokens"] += record.get("prompt_tokens", 0) + record.get("completion_tokens", 0)
+        logging.info(f"{record['path']}: {'tamamlandı' if record.get('success') else record.get('error')}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Klasör ya da manifest içindeki PDF/XML dosyalarını toplu analiz et")
+    parser.add_argument("source", help="Klasör veya manifest dosyası")
+    parser.add_argument("-o", "--output", default="batch_results.jsonl", help="JSONL çıktı dosyası")
+    parser.add_argument("--provider", default="huggingface", choices=sorted(TOKEN_ENV_VARS))
+    parser.add_argument("--token", help="API token (verilmezse ortam değişkeninden okunur)")
+    parser.add_argument("--question", help="Her dosya için sorulacak soru")
+    parser.add_argument("--workers", type=int, default=None, help="Çıkarma süreç sayısı")
+    parser.add_argument("--concurrency", type=int, default=4, help="Eşzamanlı model isteği sayısı")
+    parser.add_argument("--search-gib", action="store_true")
+    parser.add_argument("--search-mevbank", action="store_true")
+    parser.add_argument("--include-content", action="store_true", help="Çıkarılan içeriği de yaz")
+    parser.add_argument("--no-resume", action="store_true", help="Çıktıyı sıfırdan yaz")
+    args = parser.parse_args(argv)
+
+    from ai_assistant import AIAssistant
+
+    token = args.token or os.getenv(TOKEN_ENV_VARS[args.provider], "")
+    if not token:
+        parser.error(f"{TOKEN_ENV_VARS[args.provider]} tanımlı değil")
+
+    jobs = collect_jobs(args.source, args.question)
+    analyzer = BatchAnalyzer(
+        AIAssistant(model_provider=args.provider, api_token=token),
+        extract_workers=args.workers,
+        llm_concurrency=args.concurrency,
+        search_gib=args.search_gib,
+        search_mevbank=args.search_mevbank,
+        include_content=args.include_content
+    )
+    stats = analyzer.run(jobs, args.output, resume=not args.no_resume)
+    print(f"{stats['files']} dosya işlendi ({stats['succeeded']} başarılı, {stats['failed']} hatalı, "
+          f"{stats['skipped']} atlandı) - {stats['elapsed_seconds']} sn, "
+          f"{stats['files_per_minute']} dosya/dk, {stats['tokens_per_minute']} token/dk")
+    return 0 if stats["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    from metrics import configure_logging
+    configure_logging(filename=None, console=True)
+    sys.exit(main())
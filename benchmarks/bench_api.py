@@ -0,0 +1,126 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+import http.client
+from urllib.parse import urlsplit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from api_server import ApiServer
+from fake_servers import FakeServerConfig, PROVIDERS, start_in_process
+from run_benchmarks import make_assistant, percentile, QUESTION
+
+
+def client_loop(api_url, provider, deadline, results, stream):
+    # Her istemci tek keep-alive bağlantı kullanır; 503 alınca Retry-After kadar bekler
+    parts = urlsplit(api_url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+    body = json.dumps({'question': QUESTION, 'provider': provider})
+    path = '/v1/answer/stream' if stream else '/v1/answer'
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            conn.request('POST', path, body=body, headers={'Content-Type': 'application/json', 'Authorization': 'Bearer bench-token'})
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            status = 0
+        elapsed = time.perf_counter() - start
+        results.append((status, elapsed))
+        if status == 503:
+            time.sleep(float(response.getheader('Retry-After', '1')))
+
+
+def run(api_url, provider, clients, duration, stream):
+    results = []
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=client_loop, args=(api_url, provider, deadline, results, stream))
+               for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    ok = [elapsed for status, elapsed in results if status == 200]
+    return {
+        'clients': clients,
+        'ok': len(ok),
+        'rejected': sum(1 for status, _ in results if status == 503),
+        'errors': sum(1 for status, _ in results if status not in (200, 503)),
+        'rps': round(len(ok) / wall, 1),
+        'p50_ms': round(percentile(ok, 50) * 1000, 1),
+        'p95_ms': round(percentile(ok, 95) * 1000, 1),
+        'p99_ms': round(percentile(ok, 99) * 1000, 1),
+    }
+
+
+def check_stream_drop(provider):
+    # Sağlayıcı akışı yarıda koparsa son NDJSON satırı 'error' olmalı; kesik yanıt tamamlanmış bildirilmez
+    process, base_url = start_in_process(FakeServerConfig(llm_latency=0, token_delay=0, answer_tokens=10, drop_after=2))
+    server = ApiServer('127.0.0.1', 0, workers=1, queue_size=1,
+                       assistant_factory=lambda provider, token: make_assistant(provider, base_url))
+    parts = urlsplit(server.start_in_thread())
+    try:
+        conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+        conn.request('POST', '/v1/answer/stream', body=json.dumps({'question': QUESTION, 'provider': provider}),
+                     headers={'Content-Type': 'application/json', 'Authorization': 'Bearer bench-token'})
+        events = [json.loads(line) for line in conn.getresponse().read().decode('utf-8').splitlines() if line]
+    finally:
+        server.stop()
+        process.terminate()
+    tokens = sum(1 for event in events if 'token' in event)
+    ok = bool(events) and 'error' in events[-1] and not any(event.get('completed') for event in events)
+    print(f"Kopan akış ({provider}): {tokens} token, son satır {events[-1] if events else None} -> {'doğru' if ok else 'HATALI'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API sunucusu için sürekli yük testi (sahte model sunucusu ile)")
+    parser.add_argument("--provider", default="openai", choices=PROVIDERS)
+    parser.add_argument("--clients", default="1,8,32,128")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--queue-size", type=int, default=32)
+    parser.add_argument("--stream", action="store_true", help="Akışlı uç noktayı ölç")
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--token-delay", type=float, default=0.0005)
+    parser.add_argument("--json", help="Sonuçları JSON olarak bu dosyaya yaz")
+    parser.add_argument("--check-drop", action="store_true",
+                        help="Yük testi yerine yarıda kopan akışın hata olarak bildirildiğini denetle")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    if args.check_drop:
+        sys.exit(0 if all(check_stream_drop(provider) for provider in PROVIDERS) else 1)
+    process, base_url = start_in_process(FakeServerConfig(llm_latency=args.llm_latency, token_delay=args.token_delay))
+    server = ApiServer('127.0.0.1', 0, workers=args.workers, queue_size=args.queue_size,
+                       assistant_factory=lambda provider, token: make_assistant(provider, base_url))
+    api_url = server.start_in_thread()
+    rows = []
+    try:
+        print(f"{'istemci':>8} {'başarılı':>9} {'503':>6} {'hata':>5} {'istek/sn':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for clients in (int(c) for c in args.clients.split(",")):
+            row = run(api_url, args.provider, clients, args.duration, args.stream)
+            rows.append(row)
+            print(f"{row['clients']:>8} {row['ok']:>9} {row['rejected']:>6} {row['errors']:>5} {row['rps']:>9} "
+                  f"{row['p50_ms']:>8} {row['p95_ms']:>8} {row['p99_ms']:>8}")
+    finally:
+        server.stop()
+        process.terminate()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": rows}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
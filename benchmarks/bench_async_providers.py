@@ -0,0 +1,73 @@
+import os
+import sys
+import time
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from fake_servers import FakeServerConfig, PROVIDERS, start_in_process
+from run_benchmarks import make_assistant, peak_rss_mb
+
+
+class ThreadSampler:
+    # Ölçüm süresince en yüksek iş parçacığı sayısı
+    def __init__(self):
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(0.01):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def threaded(assistant, prompts):
+    with ThreadPoolExecutor(max_workers=len(prompts)) as executor:
+        return list(executor.map(assistant._make_api_request, prompts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Eşzamanlı model çağrıları: iş parçacığı havuzu ile async istemciyi karşılaştır")
+    parser.add_argument("--provider", default="openai", choices=PROVIDERS)
+    parser.add_argument("--calls", default="50,200,500")
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--modes", default="thread,async")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    process, base_url = start_in_process(FakeServerConfig(llm_latency=args.llm_latency, token_delay=0, answer_tokens=50))
+    assistant = make_assistant(args.provider, base_url)
+    runs = {
+        "thread": lambda prompts: threaded(assistant, prompts),
+        "async": lambda prompts: assistant.async_client.request_many(prompts),
+    }
+    try:
+        print(f"{'mod':<7} {'çağrı':>6} {'süre sn':>8} {'çağrı/sn':>9} {'başarılı':>9} {'en çok thread':>14} {'RSS MB':>7}")
+        for mode in args.modes.split(","):
+            for calls in (int(c) for c in args.calls.split(",")):
+                prompts = [f"Soru {i}: KDV iadesi" for i in range(calls)]
+                with ThreadSampler() as sampler:
+                    start = time.perf_counter()
+                    results = runs[mode](prompts)
+                    elapsed = time.perf_counter() - start
+                ok = sum(1 for result in results if result and result[0]["generated_text"])
+                print(f"{mode:<7} {calls:>6} {elapsed:8.2f} {calls / elapsed:9.1f} {ok:>9} {sampler.peak:>14} {peak_rss_mb()[0]:>7}")
+    finally:
+        process.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import os
+import sys
+import time
+import random
+import logging
+import argparse
+import statistics
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from chunking import estimate_tokens
+from context_packer import pack, format_item
+from fixtures import WORDS
+from fake_servers import FakeServerConfig, PROVIDERS, start_in_process
+from run_benchmarks import make_assistant
+
+# Sabit soru seti: her sorunun doğru kaynağı bilinir, diğer soruların kaynakları ve rastgele kesitler gürültüdür
+QUESTIONS = [
+    ("İhracat istisnası kapsamında KDV iadesi nasıl alınır?",
+     "KDV Genel Uygulama Tebliği ihracat istisnası iade",
+     "Mal ihracatında 3065 sayılı KDV Kanununun 11/1-a maddesi uyarınca istisna uygulanır; yüklenilen KDV, "
+     "gümrük beyannamesi ve satış faturası ile birlikte indirimli iade talep dilekçesi verilerek iade alınır."),
+    ("Kıdem tazminatı gelir vergisinden istisna mıdır?",
+     "GVK 25. madde tazminat ve yardımlara ilişkin istisna",
+     "İş Kanunu ve ilgili mevzuata göre ödenen kıdem tazminatları, kanunda belirtilen tavanı aşmayan kısmı için "
+     "Gelir Vergisi Kanununun 25 inci maddesi uyarınca gelir vergisinden istisnadır."),
+    ("Kurumlar vergisi beyannamesi ne zamana kadar verilir?",
+     "Kurumlar vergisi beyan süresi",
+     "Kurumlar vergisi beyannamesi, hesap döneminin kapandığı ayı izleyen dördüncü ayın birinci gününden "
+     "yirmi beşinci günü akşamına kadar elektronik ortamda verilir."),
+    ("Damga vergisi hangi kağıtlar için ödenir?",
+     "488 sayılı Damga Vergisi Kanunu kapsam",
+     "Damga vergisi, kanuna ekli (1) sayılı tabloda yazılı kağıtlar için alınır; sözleşmeler, taahhütnameler ve "
+     "makbuzlar gibi imzalanarak düzenlenen belgeler bu kapsamdadır."),
+    ("E-fatura kullanma zorunluluğu kimler için geçerlidir?",
+     "VUK Genel Tebliği e-fatura uygulaması",
+     "Brüt satış hasılatı tebliğde belirlenen haddi aşan mükellefler ile belirli sektörlerde faaliyet gösterenler "
+     "izleyen yılın başından itibaren e-fatura uygulamasına geçmek zorundadır."),
+    ("Kira gelirinde stopaj oranı nedir?",
+     "GVK 94. madde kira ödemelerinde tevkifat",
+     "Gayrimenkul sermaye iradı niteliğindeki kira ödemelerinden Gelir Vergisi Kanununun 94 üncü maddesi uyarınca "
+     "yüzde yirmi oranında gelir vergisi tevkifatı yapılır."),
+    ("Vergi ziyaı cezası nasıl hesaplanır?",
+     "VUK 344. madde vergi ziyaı cezası",
+     "Vergi ziyaına sebebiyet verilmesi halinde ziyaa uğratılan verginin bir katı tutarında vergi ziyaı cezası "
+     "kesilir; kaçakçılık fiilleri ile birlikte işlenmişse ceza üç kat olarak uygulanır."),
+    ("Motorlu taşıtlar vergisi ne zaman ödenir?",
+     "197 sayılı MTV Kanunu ödeme zamanı",
+     "Motorlu taşıtlar vergisi her yıl ocak ve temmuz aylarında olmak üzere iki eşit taksitte ödenir; taşıtın "
+     "kayıt ve tescili sırasında o döneme ait vergi peşin alınır."),
+]
+
+
+def make_results(n_noise, n_duplicates, seed=1):
+    rng = random.Random(seed)
+    items = [
+        {'title': title, 'link': f"https://mevzuat.example/{i}", 'content': content, 'date': '', 'source': 'bench'}
+        for i, (_, title, content) in enumerate(QUESTIONS)
+    ]
+    for i in range(n_duplicates):
+        # Aynı metnin başka kaynaktaki yeniden yayını
+        original = items[i % len(QUESTIONS)]
+        items.append(dict(original, link=original['link'] + f"?kopya={i}", content=original['content'] + " (güncel)"))
+    for i in range(n_noise):
+        items.append({
+            'title': " ".join(rng.choice(WORDS) for _ in range(5)),
+            'link': f"https://mevzuat.example/gurultu/{i}",
+            'content': " ".join(rng.choice(WORDS) for _ in range(70)),
+            'date': '', 'source': 'bench'
+        })
+    rng.shuffle(items)
+    return items
+
+
+def measure(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return result, statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mevzuat bağlamının sıralanıp bütçeye sığdırılmasını ölç")
+    parser.add_argument("--provider", default="huggingface", choices=PROVIDERS)
+    parser.add_argument("--noise", type=int, default=20)
+    parser.add_argument("--duplicates", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--prompt-token-delay", type=float, default=0.0002, help="Girdi token başına sahte sunucu gecikmesi")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    process, base_url = start_in_process(FakeServerConfig(
+        llm_latency=args.llm_latency, token_delay=0, answer_tokens=20, prompt_token_delay=args.prompt_token_delay
+    ))
+    assistant = make_assistant(args.provider, base_url)
+    budget = assistant.current_config["context_tokens"]
+    items = make_results(args.noise, args.duplicates)
+    rows = {"hepsi": [], "paketlenmiş": []}
+
+    try:
+        for question, title, _ in QUESTIONS:
+            naive = "\n".join(format_item(item) for item in items)
+            packed, pack_ms = measure(lambda: pack(question, items, budget), args.repeat)
+            packed_text = "\n".join(format_item(item) for item in packed)
+            for label, context, titles, extra_ms in (
+                ("hepsi", naive, [item['title'] for item in items], 0.0),
+                ("paketlenmiş", packed_text, [item['title'] for item in packed], pack_ms),
+            ):
+                prompt = f"Soru: {question}\n\nİlgili Mevzuat Bilgileri:\n{context}"
+                _, request_ms = measure(lambda: assistant._make_api_request(prompt), args.repeat)
+                rows[label].append({
+                    "tokens": estimate_tokens(prompt),
+                    "latency_ms": request_ms + extra_ms,
+                    "pack_ms": extra_ms,
+                    "hit": title in titles,
+                    "rank": titles.index(title) + 1 if title in titles else None,
+                })
+    finally:
+        process.terminate()
+
+    print(f"{len(QUESTIONS)} soru, soru başına {len(items)} sonuç, {args.provider} bağlam bütçesi {budget} token")
+    print(f"{'yöntem':<12} {'prompt token':>12} {'gecikme ms':>11} {'paketleme ms':>13} {'isabet':>7} {'ort. sıra':>10}")
+    for label, values in rows.items():
+        ranks = [row["rank"] for row in values if row["rank"]]
+        print(f"{label:<12} {statistics.mean(row['tokens'] for row in values):12.0f} "
+              f"{statistics.mean(row['latency_ms'] for row in values):11.1f} "
+              f"{statistics.mean(row['pack_ms'] for row in values):13.2f} "
+              f"{sum(row['hit'] for row in values) / len(values):7.0%} "
+              f"{statistics.mean(ranks) if ranks else 0:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
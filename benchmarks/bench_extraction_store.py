@@ -0,0 +1,64 @@
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from extraction_store import ExtractionStore
+from fixtures import FIXTURE_SIZES, make_pdf, make_invoice_xml
+from fake_servers import FakeServerConfig, PROVIDERS, start_in_process
+from run_benchmarks import make_assistant, percentile
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aynı dosyanın ilk ve tekrar yüklenmesinde analiz süresini karşılaştır")
+    parser.add_argument("--provider", default="openai", choices=PROVIDERS)
+    parser.add_argument("--sizes", default="medium,large")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    process, base_url = start_in_process(FakeServerConfig(llm_latency=args.llm_latency, token_delay=0, answer_tokens=50))
+    try:
+        with tempfile.TemporaryDirectory() as store_dir:
+            assistant = make_assistant(args.provider, base_url)
+            assistant.extraction_store = ExtractionStore(store_dir)
+            print(f"{'belge':<16} {'KB':>6} {'ilk yükleme ms':>15} {'tekrar p50 ms':>14} {'yalnız çıkarma ms':>18} {'depodan ms':>11}")
+            for size in args.sizes.split(","):
+                documents = (("pdf", make_pdf(FIXTURE_SIZES[size]["pdf_pages"])),
+                             ("xml", make_invoice_xml(FIXTURE_SIZES[size]["xml_lines"])))
+                for file_type, data in documents:
+                    start = time.perf_counter()
+                    assert assistant.analyze_file(data, file_type)["success"]
+                    first = time.perf_counter() - start
+                    repeats = []
+                    for _ in range(args.repeat):
+                        start = time.perf_counter()
+                        assistant.analyze_file(data, file_type)
+                        repeats.append(time.perf_counter() - start)
+
+                    # Model isteği hariç: çıkarma ile depodan okuma süreleri
+                    store, assistant.extraction_store = assistant.extraction_store, None
+                    start = time.perf_counter()
+                    sum(1 for _ in assistant._iter_content_units(data, file_type))
+                    extract = time.perf_counter() - start
+                    assistant.extraction_store = store
+                    start = time.perf_counter()
+                    sum(1 for _ in assistant._iter_content_units(data, file_type))
+                    stored = time.perf_counter() - start
+
+                    print(f"{file_type + '-' + size:<16} {len(data) // 1024:>6} {first * 1000:15.0f} "
+                          f"{percentile(repeats, 50) * 1000:14.0f} {extract * 1000:18.0f} {stored * 1000:11.1f}")
+            print("Depo istatistikleri:", assistant.extraction_store.stats())
+    finally:
+        process.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import os
+import sys
+import time
+import argparse
+import statistics
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from bs4 import BeautifulSoup
+from html_parsing import PARSERS
+from fixtures import make_search_html, make_content_html
+
+
+def full_tree_results(text, result_class):
+    # Eski yöntem: tüm sayfa html.parser ile ağaca çevrilip CSS seçici çalıştırılır
+    soup = BeautifulSoup(text, 'html.parser')
+    results = []
+    for result in soup.select(f'.{result_class}'):
+        title = result.select_one('.title')
+        link = result.select_one('a')
+        content = result.select_one('.content')
+        date = result.select_one('.date')
+        if title and link:
+            results.append({
+                'title': title.text.strip(),
+                'href': link['href'],
+                'content': content.text.strip() if content else '',
+                'date': date.text.strip() if date else ''
+            })
+    return results
+
+
+def full_tree_content(text):
+    soup = BeautifulSoup(text, 'html.parser')
+    content = soup.select_one('.content')
+    return (soup.title.text.strip() if soup.title else '', content.text.strip() if content else '')
+
+
+def measure(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def load_fixtures(paths, result_class):
+    if paths:
+        fixtures = []
+        for path in paths:
+            with open(path, encoding='utf-8', errors='replace') as f:
+                fixtures.append((os.path.basename(path), f.read()))
+        return fixtures
+    return [
+        (f"{n} sonuç", make_search_html(result_class, n, "vergi"))
+        for n in (10, 50, 200)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTML sonuç ayrıştırıcılarını karşılaştır")
+    parser.add_argument("html", nargs="*", help="Kaydedilmiş arama sayfaları (verilmezse sentetik sayfalar üretilir)")
+    parser.add_argument("--result-class", default="search-result")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    backends = {name: cls() for name, cls in PARSERS.items()}
+    fixtures = load_fixtures(args.html, args.result_class)
+    fixtures.append(("içerik sayfası", None))
+
+    for label, text in fixtures:
+        if text is None:
+            text = make_content_html(200)
+            expected = full_tree_content(text)
+            baseline = measure(lambda: full_tree_content(text), args.repeat)
+            runs = {name: (lambda p=p: p.page_content(text)) for name, p in backends.items()}
+        else:
+            expected = full_tree_results(text, args.result_class)
+            baseline = measure(lambda: full_tree_results(text, args.result_class), args.repeat)
+            runs = {name: (lambda p=p: p.search_results(text, args.result_class)) for name, p in backends.items()}
+
+        print(f"{label} ({len(text) // 1024} KB): html.parser tam ağaç {baseline:.2f} ms")
+        for name, run in runs.items():
+            same = run() == expected
+            elapsed = measure(run, args.repeat)
+            print(f"  {name:<5} {elapsed:8.2f} ms  {baseline / elapsed:5.1f}x  {'aynı sonuç' if same else 'FARKLI SONUÇ'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mevzuat_index import MevzuatIndex
+
+QUERIES = [
+    "KDV iadesi nasıl yapılır",
+    "stopaj oranı serbest meslek kazancı",
+    "e-fatura geçiş zorunluluğu",
+    "Vergi Usul Kanunu 359. madde vergi kaçakçılığı",
+    "İhracat istisnası belgeleri",
+    "kurumlar vergisi beyannamesi verilme süresi",
+    "tevkifat uygulaması yapı denetim hizmetleri",
+    "ÖTV matrahı ve İthalat",
+]
+
+VOCABULARY = (
+    "vergi kanun madde beyanname katma değer kdv iade istisna ihracat stopaj tevkifat "
+    "kurumlar gelir usul matrah oran fatura e-fatura e-defter mükellef tahakkuk ceza "
+    "kaçakçılık ithalat ötv damga harç tebliğ sirküler özelge yapı denetim hizmet serbest "
+    "meslek kazanç süre beyan ödeme gecikme faiz indirim amortisman envanter defter belge"
+).split()
+
+
+def build_synthetic_index(path, n_docs, seed=42):
+    rng = random.Random(seed)
+    # Gerçek metinlere benzer Zipf dağılımı için sık terimlere ek olarak nadir sözcükler üret
+    filler = ["".join(rng.choice("abcçdefgğhıijklmnoöprsştuüvyz") for _ in range(rng.randint(4, 10)))
+              for _ in range(20000)]
+    index = MevzuatIndex(path)
+    for i in range(n_docs):
+        title = " ".join(rng.choice(VOCABULARY) for _ in range(6)).title()
+        words = [rng.choice(VOCABULARY) for _ in range(rng.randint(5, 30))]
+        words += [filler[min(int(rng.paretovariate(1.0)) - 1, len(filler) - 1)] for _ in range(rng.randint(80, 400))]
+        rng.shuffle(words)
+        content = " ".join(words)
+        source = 'mevzuat.gov.tr' if i % 2 else 'resmigazete.gov.tr'
+        index.add_document(f"https://example.invalid/doc/{i}", title, content, source=source, commit=False)
+    index._connection().commit()
+    return index
+
+
+def time_queries(search, queries, repeat):
+    timings = []
+    for _ in range(repeat):
+        for query in queries:
+            start = time.perf_counter()
+            search(query)
+            timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(name, timings):
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"{name:<12} n={len(timings):<5} ort={statistics.mean(timings):9.2f} ms  "
+          f"p50={statistics.median(timings):9.2f} ms  p95={p95:9.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Yerel indeks ile canlı arama gecikme karşılaştırması")
+    parser.add_argument('--index', help="Mevcut indeks dosyası (verilmezse sentetik indeks oluşturulur)")
+    parser.add_argument('--docs', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--live', action='store_true', help="Canlı scraping yolunu da ölç (internet gerekir)")
+    args = parser.parse_args()
+
+    if args.index:
+        index = MevzuatIndex(args.index)
+    else:
+        path = os.path.join(tempfile.mkdtemp(), 'bench_index.db')
+        start = time.perf_counter()
+        index = build_synthetic_index(path, args.docs)
+        print(f"{args.docs} belgelik sentetik indeks {time.perf_counter() - start:.1f} sn'de oluşturuldu")
+
+    sources = ['mevzuat.gov.tr', 'resmigazete.gov.tr']
+    report('index', time_queries(lambda q: index.search(q, k=10, sources=sources), QUERIES, args.repeat))
+
+    if args.live:
+        from mevzuat_scraper import MevzuatScraper
+        scraper = MevzuatScraper(use_index=False)
+        report('live', time_queries(scraper.search_mevzuat, QUERIES, 1))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from xml_extractor import extract_xml_summary, format_summary
+from invoice_aggregate import InvoiceColumns, aggregate, format_invoice_prompt
+from chunking import estimate_tokens
+from fixtures import FIXTURE_SIZES, make_invoice_xml
+from fake_servers import FakeServerConfig, PROVIDERS, start_in_process
+from run_benchmarks import make_assistant
+
+
+def prompt_comparison(args):
+    process, base_url = start_in_process(FakeServerConfig(
+        llm_latency=args.llm_latency, token_delay=0, answer_tokens=50, prompt_token_delay=args.prompt_token_delay
+    ))
+    try:
+        assistant = make_assistant(args.provider, base_url)
+        print(f"{'fatura':<8} {'kalem':>6} {'ham token':>10} {'özet token':>11} {'ham ms':>8} {'özet ms':>8}")
+        for size in args.sizes.split(","):
+            n_lines = FIXTURE_SIZES[size]["xml_lines"]
+            summary = extract_xml_summary(make_invoice_xml(n_lines))
+            raw_units = format_summary(summary).split("\n")
+            compact_units = format_invoice_prompt(summary).split("\n")
+            timings = []
+            for units in (raw_units, compact_units):
+                start = time.perf_counter()
+                assert assistant.analyze_units(units)["success"]
+                timings.append(time.perf_counter() - start)
+            print(f"{size:<8} {n_lines:>6} {estimate_tokens(chr(10).join(raw_units)):>10} "
+                  f"{estimate_tokens(chr(10).join(compact_units)):>11} {timings[0] * 1000:8.0f} {timings[1] * 1000:8.0f}")
+    finally:
+        process.terminate()
+
+
+def month_batch(args):
+    # Bir aylık fatura klasörü: ayrıştırma süreç havuzunda, toplama tek vektörel geçişte
+    with tempfile.TemporaryDirectory() as folder:
+        paths = []
+        for seed in range(args.invoices):
+            path = os.path.join(folder, f"fatura_{seed:05d}.xml")
+            with open(path, "wb") as f:
+                f.write(make_invoice_xml(args.lines, seed=seed + 1))
+            paths.append(path)
+
+        start = time.perf_counter()
+        columns = InvoiceColumns.from_files(paths, args.workers)
+        parsed = time.perf_counter()
+        result = aggregate(columns)
+        aggregated = time.perf_counter()
+
+    print(f"\n{columns.count} fatura, {result['lines']} kalem: ayrıştırma {parsed - start:.2f} sn, "
+          f"vektörel toplama {(aggregated - parsed) * 1000:.1f} ms, tutarsızlık {result['issue_count']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="e-Fatura özet promptu ve aylık toplu kontrol ölçümü")
+    parser.add_argument("--provider", default="openai", choices=PROVIDERS)
+    parser.add_argument("--sizes", default="small,medium,large")
+    parser.add_argument("--llm-latency", type=float, default=0.1)
+    parser.add_argument("--prompt-token-delay", type=float, default=0.0002, help="Prompt token'ı başına ek gecikme (sn)")
+    parser.add_argument("--invoices", type=int, default=1000)
+    parser.add_argument("--lines", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    prompt_comparison(args)
+    month_batch(args)
+
+
+if __name__ == "__main__":
+    main()
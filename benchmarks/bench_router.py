@@ -0,0 +1,52 @@
+import os
+import sys
+import logging
+import argparse
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from provider_router import ProviderRouter
+from fake_servers import FakeServerConfig, start_in_process
+from run_benchmarks import make_assistant, percentile, run_load, QUESTION
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tek sağlayıcı ile yedek istekli yönlendirmenin kuyruk gecikmesini karşılaştır")
+    parser.add_argument("--primary", default="huggingface")
+    parser.add_argument("--secondary", default="openai")
+    parser.add_argument("--requests", type=int, default=60)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--slow-rate", type=float, default=0.1, help="Birincilde soğuk başlangıç yaşayan istek oranı")
+    parser.add_argument("--slow-latency", type=float, default=5.0)
+    parser.add_argument("--hedge-delay", type=float, default=1.0)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    slow_process, slow_url = start_in_process(FakeServerConfig(
+        llm_latency=args.llm_latency, token_delay=0.001, slow_rate=args.slow_rate, slow_latency=args.slow_latency
+    ))
+    fast_process, fast_url = start_in_process(FakeServerConfig(llm_latency=args.llm_latency * 1.5, token_delay=0.001))
+    assistants = {
+        args.primary: make_assistant(args.primary, slow_url),
+        args.secondary: make_assistant(args.secondary, fast_url),
+    }
+    router = ProviderRouter({}, providers=[args.primary, args.secondary], hedge_delay=args.hedge_delay, assistants=assistants)
+
+    try:
+        print(f"{'mod':<22} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'en kötü ms':>11} {'hata':>5}")
+        for label, target in ((f"yalnız {args.primary}", assistants[args.primary]), ("yönlendirme", router)):
+            latencies, _, errors = run_load(lambda: bool(target.get_answer(QUESTION)[0]['generated_text']),
+                                            args.requests, args.concurrency)
+            print(f"{label:<22} {percentile(latencies, 50) * 1000:8.0f} {percentile(latencies, 95) * 1000:8.0f} "
+                  f"{percentile(latencies, 99) * 1000:8.0f} {max(latencies) * 1000:11.0f} {errors:>5}")
+        print("Sağlayıcı istatistikleri:", router.stats())
+    finally:
+        slow_process.terminate()
+        fast_process.terminate()
+
+
+if __name__ == "__main__":
+    main()
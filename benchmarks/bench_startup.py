@@ -0,0 +1,94 @@
+import os
+import sys
+import json
+import logging
+import argparse
+import tempfile
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_servers import FakeServerConfig, PROVIDERS, start_in_process
+from run_benchmarks import percentile, QUESTION
+
+HEAVY_MODULES = ("PyPDF2", "lxml", "bs4", "httpx", "numpy")
+
+# Her ölçüm temiz bir Python sürecinde yapılır; içe aktarma önbelleği ölçüme karışmaz
+CHILD = r"""
+import sys, json, time
+sys.path.insert(0, sys.argv[1])
+provider, base_url, question = sys.argv[2], sys.argv[3], sys.argv[4]
+heavy = sys.argv[5].split(",")
+
+def loaded():
+    return [name for name in heavy if name in sys.modules]
+
+start = time.perf_counter()
+import ai_assistant
+import_ms = (time.perf_counter() - start) * 1000
+after_import = loaded()
+
+start = time.perf_counter()
+assistant = ai_assistant.get_assistant(provider, "bench-token")
+init_ms = (time.perf_counter() - start) * 1000
+
+start = time.perf_counter()
+for _ in range(100):
+    ai_assistant.get_assistant(provider, "bench-token")
+rerun_ms = (time.perf_counter() - start) * 1000 / 100
+
+assistant.current_config["api_url"] = f"{base_url}/{provider}"
+assistant.mevzuat_scraper.mevzuat_url = f"{base_url}/mevzuat"
+assistant.mevzuat_scraper.resmigazete_url = f"{base_url}/resmigazete"
+start = time.perf_counter()
+ok = bool(assistant.get_answer(question)[0]["generated_text"])
+answer_ms = (time.perf_counter() - start) * 1000
+
+print(json.dumps({
+    "import_ms": import_ms, "init_ms": init_ms, "rerun_ms": rerun_ms, "answer_ms": answer_ms,
+    "ok": ok, "after_import": after_import, "after_answer": loaded(),
+}))
+"""
+
+
+def measure(provider, base_url, workdir):
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD, ROOT_DIR, provider, base_url, QUESTION, ",".join(HEAVY_MODULES)],
+        cwd=workdir, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soğuk içe aktarma, asistan kurulumu ve ilk yanıt süresini ölç")
+    parser.add_argument("--provider", default="openai", choices=PROVIDERS)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    process, base_url = start_in_process(FakeServerConfig(llm_latency=args.llm_latency, token_delay=0, search_latency=0))
+    try:
+        runs = []
+        for _ in range(args.runs):
+            # İndeks ve önbellek dosyaları her çalıştırmada boş bir dizinde oluşturulur
+            with tempfile.TemporaryDirectory() as workdir:
+                runs.append(measure(args.provider, base_url, workdir))
+    finally:
+        process.terminate()
+
+    print(f"{'ölçüm':<28} {'p50 ms':>8} {'en kötü ms':>11}")
+    for key, label in (("import_ms", "ai_assistant içe aktarma"), ("init_ms", "ilk asistan kurulumu"),
+                       ("rerun_ms", "yeniden çalıştırma (önbellek)"), ("answer_ms", "ilk yanıt")):
+        values = [run[key] for run in runs]
+        print(f"{label:<28} {percentile(values, 50):8.2f} {max(values):11.2f}")
+    print("Başarılı yanıt:", sum(1 for run in runs if run["ok"]), "/", len(runs))
+    print("İçe aktarmadan sonra yüklü:", ", ".join(runs[-1]["after_import"]) or "-")
+    print("İlk yanıttan sonra yüklü:", ", ".join(runs[-1]["after_answer"]) or "-")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+import json
+import time
+import random
+import argparse
+import threading
+import multiprocessing
+from urllib.parse import urlparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from fixtures import make_search_html, make_content_html, WORDS
+
+PROVIDERS = ("huggingface", "anthropic", "openai")
+
+
+class FakeServerConfig:
+    def __init__(self, llm_latency=0.2, token_delay=0.002, answer_tokens=200, error_rate=0.0,
+                 search_latency=0.1, search_results=20, content_articles=50, prompt_token_delay=0.0,
+                 slow_rate=0.0, slow_latency=5.0, drop_after=None):
+        self.llm_latency = llm_latency
+        # Akışlı yanıtlarda bu kadar token'dan sonra bağlantı koparılır (yarıda kesilen sağlayıcı akışı)
+        self.drop_after = drop_after
+        # slow_rate oranındaki isteklere ek gecikme (ör. model soğuk başlangıcı)
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        # Girdi token başına işlem süresi; prompt boyutunun gecikmeye etkisini taklit eder
+        self.prompt_token_delay = prompt_token_delay
+        self.token_delay = token_delay
+        self.answer_tokens = answer_tokens
+        self.error_rate = error_rate
+        self.search_latency = search_latency
+        self.search_results = search_results
+        self.content_articles = content_articles
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    @property
+    def config(self):
+        return self.server.config
+
+    def _send(self, status, body, content_type="text/html; charset=utf-8", headers=None):
+        data = body.encode("utf-8") if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _maybe_fail(self):
+        if self.config.error_rate and random.random() < self.config.error_rate:
+            self._send(503, json.dumps({"error": "overloaded"}), "application/json", {"Retry-After": "0"})
+            return True
+        return False
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        time.sleep(self.config.search_latency)
+        if self._maybe_fail():
+            return
+        if path == "/mevzuat/arama.aspx":
+            self._send(200, self.server.pages["mevzuat"])
+        elif path == "/resmigazete/arama":
+            self._send(200, self.server.pages["resmigazete"])
+        elif "/doc/" in path:
+            self._send(200, self.server.pages["content"])
+        else:
+            self._send(404, "not found")
+
+    def do_POST(self):
+        provider = urlparse(self.path).path.strip("/")
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        payload = json.loads(body or b"{}")
+        if provider not in PROVIDERS:
+            self._send(404, "not found")
+            return
+        time.sleep(self.config.llm_latency + self.config.prompt_token_delay * len(body) / 4)
+        if self.config.slow_rate and random.random() < self.config.slow_rate:
+            time.sleep(self.config.slow_latency)
+        if self._maybe_fail():
+            return
+        tokens = [random.choice(WORDS) + " " for _ in range(self.config.answer_tokens)]
+        if payload.get("stream"):
+            try:
+                self._stream(provider, tokens)
+            except (BrokenPipeError, ConnectionResetError):
+                # İstemci akışı iptal etti (ör. yedek isteklerde kaybeden taraf)
+                self.close_connection = True
+        else:
+            time.sleep(self.config.token_delay * len(tokens))
+            self._send(200, json.dumps(self._completion(provider, "".join(tokens))), "application/json")
+
+    def _completion(self, provider, text):
+        if provider == "huggingface":
+            return [{"generated_text": text}]
+        if provider == "anthropic":
+            return {"content": [{"type": "text", "text": text}], "stop_reason": "end_turn"}
+        return {"choices": [{"message": {"role": "assistant", "content": text}}]}
+
+    def _event(self, provider, token):
+        if provider == "huggingface":
+            return {"token": {"text": token, "special": False}}
+        if provider == "anthropic":
+            return {"type": "content_block_delta", "delta": {"type": "text_delta", "text": token}}
+        return {"choices": [{"delta": {"content": token}}]}
+
+    def _stream(self, provider, tokens):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def write(data):
+            chunk = data.encode("utf-8")
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.flush()
+
+        for index, token in enumerate(tokens):
+            if index == self.config.drop_after:
+                self.close_connection = True
+                return
+            time.sleep(self.config.token_delay)
+            write(f"data: {json.dumps(self._event(provider, token))}\n\n")
+        if provider == "openai":
+            write("data: [DONE]\n\n")
+        elif provider == "anthropic":
+            write('event: message_stop\ndata: {"type": "message_stop"}\n\n')
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class FakeServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Yüzlerce eşzamanlı bağlantı açan istemcilerde SYN kuyruğu taşmasın
+    request_queue_size = 1024
+
+    def __init__(self, config, host="127.0.0.1", port=0):
+        super().__init__((host, port), FakeHandler)
+        self.config = config
+        # Sayfalar bir kez üretilir ki sunucu tarafı CPU ölçümleri bozmasın
+        self.pages = {
+            "mevzuat": make_search_html("search-result", config.search_results, "vergi", seed=1),
+            "resmigazete": make_search_html("gazette-result", config.search_results, "vergi", seed=2),
+            "content": make_content_html(config.content_articles),
+        }
+
+    @property
+    def base_url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+
+def start_in_thread(config=None):
+    server = FakeServer(config or FakeServerConfig())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _serve(config, port_queue):
+    server = FakeServer(config)
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+def start_in_process(config=None):
+    # Ayrı süreçte çalışan sunucu, ölçülen istemciyle GIL paylaşmaz
+    port_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_serve, args=(config or FakeServerConfig(), port_queue), daemon=True)
+    process.start()
+    return process, f"http://127.0.0.1:{port_queue.get(timeout=30)}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mevzuat siteleri ve model API'leri için yerel sahte sunucu")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--token-delay", type=float, default=0.002)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--search-latency", type=float, default=0.1)
+    parser.add_argument("--prompt-token-delay", type=float, default=0.0)
+    args = parser.parse_args()
+    config = FakeServerConfig(llm_latency=args.llm_latency, token_delay=args.token_delay,
+                              error_rate=args.error_rate, search_latency=args.search_latency,
+                              prompt_token_delay=args.prompt_token_delay)
+    server = FakeServer(config, port=args.port)
+    print(f"Sahte sunucu {server.base_url} adresinde çalışıyor")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
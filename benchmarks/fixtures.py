@@ -0,0 +1,113 @@
+import random
+
+FIXTURE_SIZES = {
+    "small": {"pdf_pages": 2, "xml_lines": 5},
+    "medium": {"pdf_pages": 40, "xml_lines": 200},
+    "large": {"pdf_pages": 400, "xml_lines": 5000},
+}
+
+WORDS = (
+    "vergi kanun madde beyanname katma değer kdv iade istisna ihracat stopaj tevkifat kurumlar gelir "
+    "usul matrah oran fatura mükellef tahakkuk ceza ithalat damga harç tebliğ sirküler özelge hizmet"
+).split()
+
+
+def _pdf_text(text):
+    # Type1 Helvetica yalnızca Latin-1 destekler; Türkçe karakterler ASCII karşılıklarına çevrilir
+    text = text.translate(str.maketrans("çğıöşüÇĞİÖŞÜ", "cgiosuCGIOSU"))
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(n_pages, lines_per_page=45, seed=1):
+    rng = random.Random(seed)
+    objects = [b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>", None]
+    pages_id = 2
+    kids = []
+    for page in range(n_pages):
+        lines = [
+            f"Sayfa {page + 1} / {i + 1}: " + " ".join(rng.choice(WORDS) for _ in range(8)) + f" {rng.randint(1, 99999)} TL"
+            for i in range(lines_per_page)
+        ]
+        stream = ("BT /F1 9 Tf 11 TL 36 806 Td " + " ".join(f"({_pdf_text(line)}) Tj T*" for line in lines) + " ET").encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 1 0 R >> >> >>" % (pages_id, content_id)
+        )
+        kids.append(len(objects))
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids), len(kids))
+    objects.append(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+    catalog_id = len(objects)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog_id, xref)
+    return bytes(out)
+
+
+def make_invoice_xml(n_lines, seed=1, rates=(1, 10, 20)):
+    rng = random.Random(seed)
+    lines = []
+    subtotals = {}
+    line_total = 0.0
+    for i in range(n_lines):
+        quantity = rng.randint(1, 50)
+        price = round(rng.uniform(5, 2500), 2)
+        amount = round(quantity * price, 2)
+        rate = rng.choice(rates)
+        tax = round(amount * rate / 100, 2)
+        line_total += amount
+        taxable, tax_sum = subtotals.get(rate, (0.0, 0.0))
+        subtotals[rate] = (taxable + amount, tax_sum + tax)
+        lines.append(f"""<cac:InvoiceLine><cbc:ID>{i + 1}</cbc:ID><cbc:InvoicedQuantity unitCode="C62">{quantity}</cbc:InvoicedQuantity><cbc:LineExtensionAmount currencyID="TRY">{amount:.2f}</cbc:LineExtensionAmount><cac:TaxTotal><cbc:TaxAmount currencyID="TRY">{tax:.2f}</cbc:TaxAmount><cac:TaxSubtotal><cbc:TaxableAmount currencyID="TRY">{amount:.2f}</cbc:TaxableAmount><cbc:TaxAmount currencyID="TRY">{tax:.2f}</cbc:TaxAmount><cbc:Percent>{rate}</cbc:Percent><cac:TaxCategory><cac:TaxScheme><cbc:Name>KDV</cbc:Name><cbc:TaxTypeCode>0015</cbc:TaxTypeCode></cac:TaxScheme></cac:TaxCategory></cac:TaxSubtotal></cac:TaxTotal><cac:Item><cbc:Name>Ürün {rng.choice(WORDS)} {i + 1}</cbc:Name></cac:Item><cac:Price><cbc:PriceAmount currencyID="TRY">{price:.2f}</cbc:PriceAmount></cac:Price></cac:InvoiceLine>""")
+    tax_total = sum(tax for _, tax in subtotals.values())
+    subtotal_xml = "".join(
+        f"""<cac:TaxSubtotal><cbc:TaxableAmount currencyID="TRY">{taxable:.2f}</cbc:TaxableAmount><cbc:TaxAmount currencyID="TRY">{tax:.2f}</cbc:TaxAmount><cbc:Percent>{rate}</cbc:Percent><cac:TaxCategory><cac:TaxScheme><cbc:Name>KDV</cbc:Name><cbc:TaxTypeCode>0015</cbc:TaxTypeCode></cac:TaxScheme></cac:TaxCategory></cac:TaxSubtotal>"""
+        for rate, (taxable, tax) in sorted(subtotals.items())
+    )
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<Invoice xmlns="urn:oasis:names:specification:ubl:schema:xsd:Invoice-2" xmlns:cac="urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2" xmlns:cbc="urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2">
+<cbc:UBLVersionID>2.1</cbc:UBLVersionID><cbc:CustomizationID>TR1.2</cbc:CustomizationID><cbc:ProfileID>TICARIFATURA</cbc:ProfileID>
+<cbc:ID>GIB{seed:013d}</cbc:ID><cbc:UUID>00000000-0000-0000-0000-{seed:012d}</cbc:UUID><cbc:IssueDate>2024-01-15</cbc:IssueDate>
+<cbc:InvoiceTypeCode>SATIS</cbc:InvoiceTypeCode><cbc:DocumentCurrencyCode>TRY</cbc:DocumentCurrencyCode><cbc:LineCountNumeric>{n_lines}</cbc:LineCountNumeric>
+<cac:AccountingSupplierParty><cac:Party><cac:PartyIdentification><cbc:ID schemeID="VKN">1234567890</cbc:ID></cac:PartyIdentification><cac:PartyName><cbc:Name>Örnek Satıcı A.Ş.</cbc:Name></cac:PartyName><cac:PostalAddress><cbc:CityName>İstanbul</cbc:CityName></cac:PostalAddress><cac:PartyTaxScheme><cac:TaxScheme><cbc:Name>Kadıköy</cbc:Name></cac:TaxScheme></cac:PartyTaxScheme></cac:Party></cac:AccountingSupplierParty>
+<cac:AccountingCustomerParty><cac:Party><cac:PartyIdentification><cbc:ID schemeID="VKN">9876543210</cbc:ID></cac:PartyIdentification><cac:PartyName><cbc:Name>Örnek Alıcı Ltd. Şti.</cbc:Name></cac:PartyName></cac:Party></cac:AccountingCustomerParty>
+<cac:TaxTotal><cbc:TaxAmount currencyID="TRY">{tax_total:.2f}</cbc:TaxAmount>{subtotal_xml}</cac:TaxTotal>
+<cac:LegalMonetaryTotal><cbc:LineExtensionAmount currencyID="TRY">{line_total:.2f}</cbc:LineExtensionAmount><cbc:TaxExclusiveAmount currencyID="TRY">{line_total:.2f}</cbc:TaxExclusiveAmount><cbc:TaxInclusiveAmount currencyID="TRY">{line_total + tax_total:.2f}</cbc:TaxInclusiveAmount><cbc:PayableAmount currencyID="TRY">{line_total + tax_total:.2f}</cbc:PayableAmount></cac:LegalMonetaryTotal>
+{"".join(lines)}
+</Invoice>""".encode("utf-8")
+
+
+def make_search_html(result_class, n_results, query="", seed=1):
+    rng = random.Random(seed)
+    padding = "".join(
+        f"<div class='menu-item'><a href='/menu/{i}'>{rng.choice(WORDS)}</a><span>{' '.join(rng.choice(WORDS) for _ in range(20))}</span></div>"
+        for i in range(200)
+    )
+    results = "".join(
+        f"""<div class="{result_class}"><h3 class="title">{query} {' '.join(rng.choice(WORDS) for _ in range(5))} {i}</h3>
+<a href="/doc/{seed}-{i}">Detay</a><p class="content">{' '.join(rng.choice(WORDS) for _ in range(60))}</p>
+<span class="date">{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.20{rng.randint(10, 24)}</span></div>"""
+        for i in range(n_results)
+    )
+    return f"""<!DOCTYPE html><html><head><title>Arama</title><script>var x = 1;</script></head>
+<body><header>{padding}</header><main>{results}</main><footer>{padding}</footer></body></html>"""
+
+
+def make_content_html(n_articles, seed=1):
+    rng = random.Random(seed)
+    articles = "".join(
+        f"<p><b>MADDE {i + 1} –</b> (1) {' '.join(rng.choice(WORDS) for _ in range(80))}</p>"
+        for i in range(n_articles)
+    )
+    return f"""<!DOCTYPE html><html><head><title>Kanun {seed}</title></head>
+<body><nav>{' '.join(rng.choice(WORDS) for _ in range(300))}</nav><div class="content">{articles}</div></body></html>"""
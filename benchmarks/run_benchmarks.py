@@ -0,0 +1,201 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import resource
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from ai_assistant import AIAssistant
+from mevzuat_scraper import MevzuatScraper
+from rate_limit import RateLimiter, CircuitBreaker
+from metrics import get_metrics
+from fixtures import FIXTURE_SIZES, make_pdf, make_invoice_xml
+from fake_servers import FakeServerConfig, PROVIDERS, start_in_process
+
+QUESTION = "İhracat istisnası kapsamında KDV iadesi nasıl alınır?"
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(p / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def peak_rss_mb():
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # Linux'ta ru_maxrss KB cinsindendir
+    return round(own / 1024, 1), round(children / 1024, 1)
+
+
+def run_load(func, requests, concurrency):
+    latencies = []
+    errors = 0
+
+    def call(_):
+        start = time.perf_counter()
+        try:
+            ok = func()
+        except Exception:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for elapsed, ok in executor.map(call, range(requests)):
+            latencies.append(elapsed)
+            errors += 0 if ok else 1
+    return latencies, time.perf_counter() - start, errors
+
+
+def make_scraper(base_url):
+    scraper = MevzuatScraper(use_index=False)
+    scraper.mevzuat_url = f"{base_url}/mevzuat"
+    scraper.resmigazete_url = f"{base_url}/resmigazete"
+    return scraper
+
+
+def make_assistant(provider, base_url):
+    assistant = AIAssistant(model_provider=provider, api_token="bench-token", use_cache=False)
+    assistant.current_config["api_url"] = f"{base_url}/{provider}"
+    # Kota ve devre kesici ölçülen gecikmeye karışmasın
+    assistant.rate_limiter = RateLimiter()
+    assistant.circuit_breaker = CircuitBreaker(provider, failure_threshold=10 ** 9)
+    assistant.mevzuat_scraper = make_scraper(base_url)
+    return assistant
+
+
+class BenchmarkRunner:
+    def __init__(self, base_url, requests, concurrency_levels):
+        self.base_url = base_url
+        self.requests = requests
+        self.concurrency_levels = concurrency_levels
+        self.rows = []
+
+    def record(self, name, concurrency, latencies, wall, errors, extra=None):
+        rss, children_rss = peak_rss_mb()
+        row = {
+            "scenario": name,
+            "concurrency": concurrency,
+            "requests": len(latencies),
+            "errors": errors,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+            "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0,
+            "peak_rss_mb": rss,
+            "children_peak_rss_mb": children_rss,
+        }
+        row.update(extra or {})
+        self.rows.append(row)
+        print(f"{name:<34} c={concurrency:<3} p50={row['p50_ms']:>9.1f} p95={row['p95_ms']:>9.1f} "
+              f"p99={row['p99_ms']:>9.1f} ms  {row['throughput_rps']:>8.2f} req/s  "
+              f"hata={errors:<3} rss={rss} MB" + "".join(f"  {k}={v}" for k, v in (extra or {}).items()))
+
+    def load(self, name, func, requests=None, concurrency_levels=None):
+        for concurrency in concurrency_levels or self.concurrency_levels:
+            latencies, wall, errors = run_load(func, requests or self.requests, concurrency)
+            self.record(name, concurrency, latencies, wall, errors)
+
+    def scraper_scenarios(self):
+        scraper = make_scraper(self.base_url)
+        self.load("scraper.search_mevzuat", lambda: bool(scraper.search_mevzuat(QUESTION)))
+
+    def answer_scenarios(self, providers):
+        for provider in providers:
+            assistant = make_assistant(provider, self.base_url)
+            self.load(f"get_answer/{provider}", lambda: bool(assistant.get_answer(QUESTION)))
+
+            first_tokens = []
+
+            def stream():
+                start = time.perf_counter()
+                response = assistant.stream_answer(QUESTION)
+                first = None
+                for _ in response:
+                    if first is None:
+                        first = time.perf_counter() - start
+                if first is not None:
+                    first_tokens.append(first)
+                return response.completed and bool(response.text)
+
+            for concurrency in self.concurrency_levels:
+                first_tokens.clear()
+                latencies, wall, errors = run_load(stream, self.requests, concurrency)
+                self.record(f"stream_answer/{provider}", concurrency, latencies, wall, errors,
+                            {"ttft_p50_ms": round(percentile(first_tokens, 50) * 1000, 1)})
+
+    def analysis_scenarios(self, providers, sizes):
+        for size in sizes:
+            pdf = make_pdf(FIXTURE_SIZES[size]["pdf_pages"])
+            xml = make_invoice_xml(FIXTURE_SIZES[size]["xml_lines"])
+            for provider in providers:
+                assistant = make_assistant(provider, self.base_url)
+                requests = max(1, self.requests // 4)
+                self.load(f"analyze_file/{provider}/pdf-{size}",
+                          lambda: assistant.analyze_file(pdf, "pdf").get("success", False), requests)
+                self.load(f"analyze_file/{provider}/xml-{size}",
+                          lambda: assistant.analyze_file(xml, "xml").get("success", False), requests)
+
+    def extraction_scenarios(self, sizes):
+        assistant = make_assistant("huggingface", self.base_url)
+        for size in sizes:
+            pdf = make_pdf(FIXTURE_SIZES[size]["pdf_pages"])
+            xml = make_invoice_xml(FIXTURE_SIZES[size]["xml_lines"])
+            repeat = 3 if size == "large" else 10
+            self.load(f"_extract_pdf_content/{size} ({len(pdf) // 1024} KB)",
+                      lambda: bool(assistant._extract_pdf_content(pdf)), repeat, [1])
+            self.load(f"_extract_xml_content/{size} ({len(xml) // 1024} KB)",
+                      lambda: bool(assistant._extract_xml_content(xml)), repeat, [1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Yerel sahte sunucularla uçtan uca performans ölçümü")
+    parser.add_argument("--scenarios", default="scraper,answer,analysis,extraction")
+    parser.add_argument("--providers", default=",".join(PROVIDERS))
+    parser.add_argument("--sizes", default="small,medium,large", help="Çıkarma fixture boyutları")
+    parser.add_argument("--analysis-sizes", default="small,medium", help="analyze_file fixture boyutları")
+    parser.add_argument("--concurrency", default="1,4,16")
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--token-delay", type=float, default=0.002)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--search-latency", type=float, default=0.1)
+    parser.add_argument("--json", help="Sonuçları JSON olarak bu dosyaya yaz")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    config = FakeServerConfig(llm_latency=args.llm_latency, token_delay=args.token_delay,
+                              error_rate=args.error_rate, search_latency=args.search_latency)
+    process, base_url = start_in_process(config)
+    scenarios = args.scenarios.split(",")
+    providers = args.providers.split(",")
+    runner = BenchmarkRunner(base_url, args.requests, [int(c) for c in args.concurrency.split(",")])
+    try:
+        if "scraper" in scenarios:
+            runner.scraper_scenarios()
+        if "answer" in scenarios:
+            runner.answer_scenarios(providers)
+        if "analysis" in scenarios:
+            runner.analysis_scenarios(providers, args.analysis_sizes.split(","))
+        if "extraction" in scenarios:
+            runner.extraction_scenarios(args.sizes.split(","))
+    finally:
+        process.terminate()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": runner.rows, "stages": get_metrics().stage_summary()},
+                      f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
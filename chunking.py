@@ -0,0 +1,57 @@
+import math
+
+# Türkçe metinlerde ortalama token yaklaşık 4 karakter; sağlayıcıdan bağımsız kaba bir tahmin yeterli
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+def split_text(text, max_tokens):
+    # Tek başına bütçeyi aşan birimi önce paragraf, sonra satır, en son karakter sınırından böl
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+    for separator in ("\n\n", "\n", ". "):
+        parts = text.split(separator)
+        if len(parts) > 1:
+            pieces = []
+            for part in parts:
+                pieces.extend(split_text(part, max_tokens))
+            return list(_merge(pieces, max_tokens, separator))
+    size = max_tokens * CHARS_PER_TOKEN
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def _merge(pieces, max_tokens, separator):
+    buffer = []
+    used = 0
+    for piece in pieces:
+        tokens = estimate_tokens(piece) + estimate_tokens(separator)
+        if buffer and used + tokens > max_tokens:
+            yield separator.join(buffer)
+            buffer = []
+            used = 0
+        buffer.append(piece)
+        used += tokens
+    if buffer:
+        yield separator.join(buffer)
+
+
+def iter_chunks(units, max_tokens, separator="\n"):
+    # Birimler (sayfa, XML öğesi) bölünmeden bütçeye sığdığı kadar birleştirilir
+    buffer = []
+    used = 0
+    for unit in units:
+        if not unit:
+            continue
+        for piece in split_text(unit, max_tokens):
+            tokens = estimate_tokens(piece) + estimate_tokens(separator)
+            if buffer and used + tokens > max_tokens:
+                yield separator.join(buffer)
+                buffer = []
+                used = 0
+            buffer.append(piece)
+            used += tokens
+    if buffer:
+        yield separator.join(buffer)
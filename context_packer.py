@@ -0,0 +1,109 @@
+import os
+import numpy as np
+from chunking import estimate_tokens, CHARS_PER_TOKEN
+from mevzuat_index import turkish_casefold
+
+# Karakter n-gramları sabit boyutlu vektöre hash'lenir; sözlük tutulmaz
+HASH_DIM = 1 << 14
+NGRAM_SIZES = (3, 4, 5)
+DEDUP_THRESHOLD = float(os.getenv('GIB_CONTEXT_DEDUP_THRESHOLD', '0.9'))
+# Tek bir kesitin bütçeye sığması için kısaltılacağı en az token sayısı
+MIN_SNIPPET_TOKENS = 48
+
+_HASH_MULT = np.uint64(1099511628211)
+_NGRAM_SALTS = {n: np.uint64(n * 0x9E3779B97F4A7C15 % (1 << 64)) for n in NGRAM_SIZES}
+
+
+def format_item(item):
+    return f"- {item.get('title', '')}: {item.get('content', '')}"
+
+
+def _ngram_counts(texts):
+    # Tüm metinler tek diziye eklenip n-gram hash'leri tek seferde hesaplanır; metin sınırını aşan pencereler atılır
+    folded = [f" {turkish_casefold(text or '')} " for text in texts]
+    codes = np.frombuffer(''.join(folded).encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    rows = np.repeat(np.arange(len(folded)), [len(text) for text in folded])
+    buckets = []
+    for n in NGRAM_SIZES:
+        if len(codes) < n:
+            continue
+        # Kayan polinom hash (uint64 taşması kasıtlı)
+        h = np.zeros(len(codes) - n + 1, dtype=np.uint64)
+        for k in range(n):
+            h = h * _HASH_MULT + codes[k:len(codes) - n + 1 + k]
+        valid = rows[:len(h)] == rows[n - 1:]
+        buckets.append(rows[:len(h)][valid] * HASH_DIM + ((h[valid] ^ _NGRAM_SALTS[n]) % np.uint64(HASH_DIM)).astype(np.intp))
+    flat = np.concatenate(buckets) if buckets else np.zeros(0, dtype=np.intp)
+    return np.bincount(flat, minlength=len(texts) * HASH_DIM).reshape(len(texts), HASH_DIM)
+
+
+def vectorize(texts):
+    # Satırlar: log ölçekli terim sıklığı x IDF, L2 normalize
+    counts = _ngram_counts(texts)
+    matrix = np.log1p(counts, dtype=np.float32)
+    df = np.count_nonzero(counts, axis=0)
+    idf = np.log((1 + len(texts)) / (1 + df)).astype(np.float32) + 1
+    matrix *= idf
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return matrix / norms
+
+
+def rank(query, items, top_k=None):
+    # Sorgu ve adaylar aynı IDF ile vektörlenir; benzerlik tek matris çarpımı
+    if not items:
+        return [], np.zeros((0, 0), dtype=np.float32)
+    vectors = vectorize([query] + [f"{item.get('title', '')} {item.get('content', '')}" for item in items])
+    docs = vectors[1:]
+    scores = docs @ vectors[0]
+    order = np.argsort(-scores, kind='stable')
+    if top_k:
+        order = order[:top_k]
+    return [(int(i), float(scores[i])) for i in order], docs
+
+
+def deduplicate(ranked, docs, threshold=DEDUP_THRESHOLD):
+    # Daha yüksek puanlı bir kesite çok benzeyen (aynı metnin kopyası/yeniden yayını) kesitler atlanır
+    similarity = docs @ docs.T
+    kept = []
+    for index, score in ranked:
+        if kept and similarity[index, [i for i, _ in kept]].max() >= threshold:
+            continue
+        kept.append((index, score))
+    return kept
+
+
+def _truncate(item, max_tokens):
+    overhead = estimate_tokens(format_item(dict(item, content='')))
+    # ' ...' eki için yer bırakılır
+    size = (max_tokens - overhead) * CHARS_PER_TOKEN - 4
+    if size <= 0:
+        return None
+    content = item.get('content', '')
+    cut = content.rfind(' ', 0, size)
+    return dict(item, content=content[:cut if cut > size // 2 else size].rstrip() + ' ...')
+
+
+def pack(query, items, max_tokens, top_k=None, threshold=DEDUP_THRESHOLD):
+    # En alakalı kesitlerden başlayarak bütçe dolana kadar açgözlü doldurma
+    ranked, docs = rank(query, items, top_k)
+    selected = []
+    used = 0
+    for index, score in deduplicate(ranked, docs, threshold):
+        item = dict(items[index], score=round(score, 4))
+        tokens = estimate_tokens(format_item(item)) + 1
+        if used + tokens > max_tokens:
+            remaining = max_tokens - used - 1
+            if remaining < MIN_SNIPPET_TOKENS:
+                continue
+            item = _truncate(item, remaining)
+            if item is None:
+                continue
+            tokens = estimate_tokens(format_item(item)) + 1
+        selected.append(item)
+        used += tokens
+    return selected
+
+
+def pack_text(query, items, max_tokens, top_k=None):
+    return "\n".join(format_item(item) for item in pack(query, items, max_tokens, top_k))
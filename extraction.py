@@ -0,0 +1,43 @@
+import os
+import logging
+from pdf_extractor import PdfExtractor
+from xml_extractor import extract_xml_summary, format_summary
+from invoice_aggregate import format_invoice_prompt
+
+SUPPORTED_TYPES = ("pdf", "xml")
+
+
+def detect_file_type(path):
+    extension = os.path.splitext(path)[1].lower().lstrip(".")
+    return extension if extension in SUPPORTED_TYPES else None
+
+
+def iter_content_units(source, file_type, pdf_extractor=None, fields=None):
+    # source: dosya içeriği (bytes) ya da dosya yolu
+    # fields verilirse belgenin yapısal bilgileri (sayfa sayısı, XML özeti) içine yazılır
+    fields = fields if fields is not None else {}
+    if file_type == "pdf":
+        if isinstance(source, str):
+            with open(source, "rb") as f:
+                source = f.read()
+        extractor = pdf_extractor or PdfExtractor()
+        pages = 0
+        for page in extractor.iter_pages(source):
+            pages += 1
+            yield f"[Sayfa {page.number}]\n{page.text.strip()}"
+        fields.update(pages=pages, truncated=extractor.truncated)
+        logging.info(extractor.timing_summary())
+    elif file_type == "xml":
+        summary = extract_xml_summary(source)
+        logging.info(f"XML özeti çıkarıldı: {summary['type']} ({summary['root']})")
+        fields.update(summary)
+        # Faturalarda toplamlar ve tutarlılık kontrolleri yerelde hesaplanır, prompta yalnızca özet gider
+        text = format_invoice_prompt(summary) if summary['type'] == 'invoice' else format_summary(summary)
+        # XML özeti satır satır öğe sınırlarına denk gelir
+        yield from text.split("\n")
+    else:
+        raise ValueError(f"Desteklenmeyen dosya formatı: {file_type}")
+
+
+def extract_units(source, file_type, pdf_workers=1):
+    return list(iter_content_units(source, file_type, PdfExtractor(workers=pdf_workers)))
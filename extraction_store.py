@@ -0,0 +1,214 @@
+import os
+import json
+import mmap
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from array import array
+
+DEFAULT_STORE_PATH = os.getenv('GIB_EXTRACTION_STORE_PATH', 'extraction_store')
+DEFAULT_MAX_BYTES = int(os.getenv('GIB_EXTRACTION_STORE_MAX_BYTES', str(256 * 1024 * 1024)))
+# Bu boyutun üzerindeki metinler okunurken belleğe alınmaz, mmap ile sayfa sayfa erişilir
+MMAP_MIN_BYTES = 1024 * 1024
+# Çıkarma mantığı değişince eski kayıtlar kullanılmasın diye anahtara eklenir
+STORE_VERSION = '3'
+
+
+class StoredDocument:
+    # Metin tek UTF-8 dosyada; her birimin (sayfa/öğe) bitiş ofseti ayrı tutulur
+    def __init__(self, key, path, file_type, offsets, fields, source_bytes):
+        self.key = key
+        self.path = path
+        self.file_type = file_type
+        self.offsets = offsets
+        self.fields = fields
+        self.source_bytes = source_bytes
+
+    @property
+    def unit_count(self):
+        return len(self.offsets)
+
+    def units(self):
+        with open(self.path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size >= MMAP_MIN_BYTES else f.read()
+            try:
+                start = 0
+                for end in self.offsets:
+                    yield data[start:end].decode('utf-8')
+                    start = end
+            finally:
+                if isinstance(data, mmap.mmap):
+                    data.close()
+
+    @property
+    def text(self):
+        return "\n".join(self.units())
+
+
+class ExtractionStore:
+    # Yüklenen belgenin içerik özetine göre çıkarılmış metin; aynı dosya tekrar yüklenince ayrıştırma atlanır
+    def __init__(self, path=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path or DEFAULT_STORE_PATH
+        self.max_bytes = max_bytes
+        os.makedirs(self.path, exist_ok=True)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._create_schema()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(os.path.join(self.path, 'index.db'), timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _create_schema(self):
+        conn = self._connection()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS documents (
+                key TEXT PRIMARY KEY,
+                file_type TEXT NOT NULL,
+                offsets BLOB NOT NULL,
+                fields TEXT NOT NULL,
+                source_bytes INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS documents_last_access ON documents (last_access);
+            CREATE TABLE IF NOT EXISTS stats (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO stats (name, value)
+                VALUES ('hits', 0), ('misses', 0), ('evictions', 0), ('bytes_saved', 0);
+        """)
+        conn.commit()
+
+    def _bump(self, conn, name, amount=1):
+        conn.execute('UPDATE stats SET value = value + ? WHERE name = ?', (amount, name))
+
+    def _text_path(self, key):
+        return os.path.join(self.path, f"{key}.txt")
+
+    def key(self, file_content, file_type, variant=''):
+        # variant: çıktıyı etkileyen ayarlar (ör. PDF sayfa sınırı)
+        digest = hashlib.sha256(f"{STORE_VERSION}\x1f{file_type}\x1f{variant}\x1f".encode('utf-8'))
+        digest.update(file_content)
+        return digest.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                'SELECT file_type, offsets, fields, source_bytes FROM documents WHERE key = ?', (key,)
+            ).fetchone()
+            if row and not os.path.exists(self._text_path(key)):
+                conn.execute('DELETE FROM documents WHERE key = ?', (key,))
+                row = None
+            if row is None:
+                self._bump(conn, 'misses')
+                conn.commit()
+                return None
+            conn.execute('UPDATE documents SET last_access = ?, hits = hits + 1 WHERE key = ?', (time.time(), key))
+            self._bump(conn, 'hits')
+            self._bump(conn, 'bytes_saved', row[3])
+            conn.commit()
+        offsets = array('Q')
+        offsets.frombytes(row[1])
+        return StoredDocument(key, self._text_path(key), row[0], offsets, json.loads(row[2]), row[3])
+
+    def put(self, key, file_type, units, source_bytes, fields=None):
+        offsets = array('Q')
+        total = 0
+        path = self._text_path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            for unit in units:
+                data = unit.encode('utf-8')
+                f.write(data)
+                total += len(data)
+                offsets.append(total)
+        os.replace(temp_path, path)
+
+        offsets_blob = offsets.tobytes()
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                'INSERT OR REPLACE INTO documents '
+                '(key, file_type, offsets, fields, source_bytes, size, created_at, last_access) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, file_type, offsets_blob, json.dumps(fields or {}, ensure_ascii=False, default=str),
+                 source_bytes, total + len(offsets_blob), now, now)
+            )
+            self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn):
+        evicted = 0
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM documents').fetchone()[0]
+        # En uzun süredir kullanılmayan belgelerden başlayarak boyut sınırının altına in
+        while total > self.max_bytes:
+            rows = conn.execute('SELECT key, size FROM documents ORDER BY last_access LIMIT 16').fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                conn.execute('DELETE FROM documents WHERE key = ?', (key,))
+                try:
+                    os.remove(self._text_path(key))
+                except FileNotFoundError:
+                    pass
+                total -= size
+                evicted += 1
+                if total <= self.max_bytes:
+                    break
+        if evicted:
+            self._bump(conn, 'evictions', evicted)
+            logging.info(f"Çıkarma deposundan {evicted} belge çıkarıldı")
+
+    def stats(self):
+        conn = self._connection()
+        values = dict(conn.execute('SELECT name, value FROM stats'))
+        count, total = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM documents').fetchone()
+        lookups = values['hits'] + values['misses']
+        return {
+            'entries': count,
+            'bytes': total,
+            'hits': values['hits'],
+            'misses': values['misses'],
+            'evictions': values['evictions'],
+            'bytes_saved': values['bytes_saved'],
+            'hit_rate': round(values['hits'] / lookups, 4) if lookups else 0.0
+        }
+
+    def clear(self):
+        with self._lock:
+            conn = self._connection()
+            for (key,) in conn.execute('SELECT key FROM documents').fetchall():
+                try:
+                    os.remove(self._text_path(key))
+                except FileNotFoundError:
+                    pass
+            conn.execute('DELETE FROM documents')
+            conn.execute('UPDATE stats SET value = 0')
+            conn.commit()
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_extraction_store():
+    global _default_store
+    if _default_store is None:
+        with _default_store_lock:
+            if _default_store is None:
+                _default_store = ExtractionStore()
+    return _default_store
@@ -0,0 +1,181 @@
+import os
+import re
+import logging
+import threading
+import html as html_lib
+
+# GIB_HTML_PARSER=bs4 ile eski BeautifulSoup ayrıştırıcısına dönülebilir
+# lxml/bs4 ilk ayrıştırıcı oluşturulurken yüklenir; modülü içe aktarmak bu kütüphaneleri yüklemez
+DEFAULT_BACKEND = os.getenv('GIB_HTML_PARSER', 'lxml')
+
+RESULT_FIELDS = ('title', 'content', 'date')
+_TITLE_RE = re.compile(r'<title[^>]*>(.*?)</title\s*>', re.IGNORECASE | re.DOTALL)
+
+
+def _class_xpath(class_name, first=False):
+    # CSS ".sinif" seçicisinin XPath karşılığı: class özniteliğindeki kelimelerden biri eşleşmeli
+    from lxml import etree
+    path = f".//*[contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')]"
+    return etree.XPath(f"({path})[1]" if first else path)
+
+
+def _class_pattern(class_name):
+    # Ayrıştırma sırasında class değeri henüz bölünmemiş olduğundan kelime olarak aranır
+    return re.compile(rf'(^|\s){re.escape(class_name)}(\s|$)')
+
+
+class LxmlParser:
+    # Belgenin tamamı ayrıştırılır, yalnızca gereken alt ağaçlar XPath ile okunur. lxml'de SoupStrainer
+    # karşılığı bir kısmi ayrıştırma yok; C ayrıştırıcının tam ağacı, bs4'ün süzülmüş ayrıştırmasından hızlıdır
+    # (benchmarks/bench_html_parsing.py)
+    name = 'lxml'
+
+    def __init__(self):
+        from lxml import etree, html as lxml_html
+        self._fromstring = lxml_html.document_fromstring
+        self._parser_error = etree.ParserError
+        self._result_paths = {}
+        self._field_paths = {field: _class_xpath(field, first=True) for field in RESULT_FIELDS}
+        self._first_link = etree.XPath("(.//a)[1]")
+        self._content_path = _class_xpath('content', first=True)
+        self._title_path = etree.XPath("(//title)[1]")
+        self._links_path = etree.XPath("//a[@href]")
+        self._noise_path = etree.XPath("//script|//style")
+
+    def _parse(self, text):
+        if not text or not text.strip():
+            return None
+        try:
+            return self._fromstring(text)
+        except ValueError:
+            # Kodlama bildirimi içeren str girdiyi lxml kabul etmez
+            return self._fromstring(text.encode('utf-8'))
+        except self._parser_error:
+            return None
+
+    def search_results(self, text, result_class):
+        root = self._parse(text)
+        if root is None:
+            return []
+        path = self._result_paths.get(result_class)
+        if path is None:
+            path = self._result_paths[result_class] = _class_xpath(result_class)
+
+        results = []
+        for node in path(root):
+            fields = {field: self._field_paths[field](node) for field in RESULT_FIELDS}
+            link = self._first_link(node)
+            if not fields['title'] or not link or link[0].get('href') is None:
+                continue
+            results.append({
+                'title': fields['title'][0].text_content().strip(),
+                'href': link[0].get('href'),
+                'content': fields['content'][0].text_content().strip() if fields['content'] else '',
+                'date': fields['date'][0].text_content().strip() if fields['date'] else ''
+            })
+        return results
+
+    def page_content(self, text):
+        root = self._parse(text)
+        if root is None:
+            return '', ''
+        content = self._content_path(root)
+        title = self._title_path(root)
+        return (
+            title[0].text_content().strip() if title else '',
+            content[0].text_content().strip() if content else ''
+        )
+
+    def page_links(self, text):
+        root = self._parse(text)
+        if root is None:
+            return []
+        return [(link.get('href'), link.text_content().strip()) for link in self._links_path(root)]
+
+    def page_text(self, text):
+        # .content bölümü olmayan sayfalarda (ör. Resmî Gazete metinleri) tüm gövde metni alınır
+        root = self._parse(text)
+        if root is None:
+            return '', ''
+        title = self._title_path(root)
+        title = title[0].text_content().strip() if title else ''
+        content = self._content_path(root)
+        if content:
+            return title, content[0].text_content().strip()
+        for node in self._noise_path(root):
+            node.drop_tree()
+        body = root.find('body')
+        return title, '\n'.join(part.strip() for part in (body if body is not None else root).itertext() if part.strip())
+
+
+class SoupParser:
+    name = 'bs4'
+
+    def __init__(self):
+        from bs4 import BeautifulSoup, SoupStrainer
+        self._soup = BeautifulSoup
+        self._strainer = SoupStrainer
+
+    def search_results(self, text, result_class):
+        # Yalnızca sonuç düğümleri ağaca alınır; sayfanın geri kalanı için nesne oluşturulmaz
+        soup = self._soup(text, 'html.parser', parse_only=self._strainer(class_=_class_pattern(result_class)))
+        results = []
+        for result in soup.select(f'.{result_class}'):
+            title = result.select_one('.title')
+            link = result.select_one('a')
+            content = result.select_one('.content')
+            date = result.select_one('.date')
+
+            if title and link and link.get('href') is not None:
+                results.append({
+                    'title': title.text.strip(),
+                    'href': link['href'],
+                    'content': content.text.strip() if content else '',
+                    'date': date.text.strip() if date else ''
+                })
+        return results
+
+    def page_content(self, text):
+        strainer = self._strainer(class_=_class_pattern('content'))
+        content = self._soup(text, 'html.parser', parse_only=strainer).select_one('.content')
+        # Başlık için ikinci bir ayrıştırma yerine <title> etiketi doğrudan okunur
+        title = _TITLE_RE.search(text)
+        return (
+            html_lib.unescape(title.group(1)).strip() if title else '',
+            content.text.strip() if content else ''
+        )
+
+    def page_links(self, text):
+        soup = self._soup(text, 'html.parser', parse_only=self._strainer('a', href=True))
+        return [(link['href'], link.text.strip()) for link in soup.find_all('a')]
+
+    def page_text(self, text):
+        title, content = self.page_content(text)
+        if content:
+            return title, content
+        soup = self._soup(text, 'html.parser')
+        for node in soup(['script', 'style']):
+            node.decompose()
+        return title, (soup.body or soup).get_text('\n', strip=True)
+
+
+PARSERS = {
+    'lxml': LxmlParser,
+    'bs4': SoupParser,
+}
+
+# Derlenmiş XPath nesneleri çağrı sırasında kilitlenir; her iş parçacığı kendi ayrıştırıcısını kullanır
+_local = threading.local()
+
+
+def get_parser(name=None):
+    name = name or DEFAULT_BACKEND
+    if name not in PARSERS:
+        logging.warning(f"Bilinmeyen HTML ayrıştırıcı: {name}, lxml kullanılıyor")
+        name = 'lxml'
+    parsers = getattr(_local, 'parsers', None)
+    if parsers is None:
+        parsers = _local.parsers = {}
+    if name not in parsers:
+        parsers[name] = PARSERS[name]()
+    return parsers[name]
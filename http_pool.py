@@ -0,0 +1,140 @@
+import os
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Havuz ayarları ortam değişkenleri ile değiştirilebilir
+POOL_CONNECTIONS = int(os.getenv('GIB_HTTP_POOL_CONNECTIONS', '16'))
+POOL_MAXSIZE = int(os.getenv('GIB_HTTP_POOL_MAXSIZE', '10'))
+POOL_BLOCK = os.getenv('GIB_HTTP_POOL_BLOCK', '0') == '1'
+
+
+def _parse_host_pool_sizes(value):
+    sizes = {}
+    for item in filter(None, (part.strip() for part in value.split(','))):
+        host, _, size = item.partition('=')
+        sizes[host.strip()] = int(size)
+    return sizes
+
+
+# Örnek: GIB_HTTP_HOST_POOL_SIZES="api.openai.com=20,www.mevzuat.gov.tr=4"
+HOST_POOL_SIZES = _parse_host_pool_sizes(os.getenv('GIB_HTTP_HOST_POOL_SIZES', ''))
+
+
+class ConnectionStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def _host(self, host):
+        return self._hosts.setdefault(host, {'requests': 0, 'new_connections': 0})
+
+    def record_request(self, host):
+        with self._lock:
+            self._host(host)['requests'] += 1
+
+    def record_connect(self, host):
+        with self._lock:
+            self._host(host)['new_connections'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            hosts = {
+                host: dict(counts, reused=max(0, counts['requests'] - counts['new_connections']))
+                for host, counts in self._hosts.items()
+            }
+        total_requests = sum(counts['requests'] for counts in hosts.values())
+        total_new = sum(counts['new_connections'] for counts in hosts.values())
+        return {
+            'requests': total_requests,
+            'new_connections': total_new,
+            'reused': max(0, total_requests - total_new),
+            'reuse_ratio': round((total_requests - total_new) / total_requests, 4) if total_requests else 0.0,
+            'hosts': hosts
+        }
+
+    def reset(self):
+        with self._lock:
+            self._hosts.clear()
+
+
+connection_stats = ConnectionStats()
+
+
+# Her connect() çağrısı yeni bir TCP (+TLS) el sıkışması demektir
+class _CountingHTTPConnection(HTTPConnection):
+    def connect(self):
+        connection_stats.record_connect(self.host)
+        return super().connect()
+
+
+class _CountingHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        connection_stats.record_connect(self.host)
+        return super().connect()
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _CountingHTTPConnection
+
+    def urlopen(self, method, url, *args, **kwargs):
+        connection_stats.record_request(self.host)
+        return super().urlopen(method, url, *args, **kwargs)
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _CountingHTTPSConnection
+
+    def urlopen(self, method, url, *args, **kwargs):
+        connection_stats.record_request(self.host)
+        return super().urlopen(method, url, *args, **kwargs)
+
+
+class CountingHTTPAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _CountingHTTPConnectionPool,
+            'https': _CountingHTTPSConnectionPool
+        }
+
+
+def _build_session():
+    session = requests.Session()
+    adapter = CountingHTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, pool_block=POOL_BLOCK)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    for host, size in HOST_POOL_SIZES.items():
+        host_adapter = CountingHTTPAdapter(pool_connections=1, pool_maxsize=size, pool_block=POOL_BLOCK)
+        session.mount(f'https://{host}', host_adapter)
+        session.mount(f'http://{host}', host_adapter)
+    logging.info(f"HTTP bağlantı havuzu oluşturuldu (host başına {POOL_MAXSIZE} bağlantı)")
+    return session
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def pool_stats():
+    return connection_stats.snapshot()
+
+
+def close_session():
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
@@ -0,0 +1,280 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from xml_extractor import extract_xml_summary, format_invoice_summary, _amount
+
+# Kuruş yuvarlaması dışındaki farklar tutarsızlık sayılır
+TOLERANCE = float(os.getenv('GIB_INVOICE_TOLERANCE', '0.01'))
+PROMPT_LINES = 10
+MAX_ISSUES = 20
+LINE_FIELDS = ('quantity', 'price', 'amount', 'tax_percent', 'tax_amount', 'withholding_percent', 'withholding_amount')
+SUBTOTAL_FIELDS = ('percent', 'taxable', 'amount')
+TOTAL_FIELDS = ('line_extension', 'tax_exclusive', 'tax_inclusive', 'allowance_total', 'charge_total', 'rounding', 'payable')
+# (fatura, oran) çiftini tek tamsayı anahtara çevirmek için; oranlar iki ondalığa kadar ayırt edilir
+_RATE_SCALE = 100
+_KEY_STRIDE = 1000 * _RATE_SCALE
+
+
+def _column(rows, field, count):
+    return np.fromiter((np.nan if row[field] is None else row[field] for row in rows), dtype=np.float64, count=count)
+
+
+class InvoiceColumns:
+    # Bir ya da binlerce faturanın kalem ve vergi alt toplamları sütun dizileri halinde; eksik değerler NaN
+    def __init__(self, summaries):
+        invoices = [summary for summary in summaries if summary.get('type') == 'invoice']
+        self.count = len(invoices)
+        self.ids = [summary['header'].get('id', '') for summary in invoices]
+        self.dates = [summary['header'].get('issue_date', '') for summary in invoices]
+        self.currency_codes, self.currency = np.unique(
+            np.array([summary['header'].get('currency', '') for summary in invoices], dtype=object).astype(str),
+            return_inverse=True
+        )
+
+        lines = [line for summary in invoices for line in summary['lines']]
+        self.line_invoice = np.repeat(np.arange(self.count), [len(summary['lines']) for summary in invoices])
+        self.lines = {field: _column(lines, field, len(lines)) for field in LINE_FIELDS}
+
+        self.subtotals = self._subtotals(invoices, 'tax_subtotals')
+        self.withholding = self._subtotals(invoices, 'withholding')
+        self.tax_total = np.array([np.nan if summary['tax_total'] is None else summary['tax_total'] for summary in invoices],
+                                  dtype=np.float64)
+        self.totals = {
+            field: np.array([summary['totals'].get(field, np.nan) for summary in invoices], dtype=np.float64)
+            for field in TOTAL_FIELDS
+        }
+
+    def _subtotals(self, invoices, key):
+        rows = [row for summary in invoices for row in summary[key]]
+        columns = {field: _column(rows, field, len(rows)) for field in SUBTOTAL_FIELDS}
+        columns['invoice'] = np.repeat(np.arange(self.count), [len(summary[key]) for summary in invoices])
+        return columns
+
+    @classmethod
+    def from_files(cls, paths, workers=None):
+        # Ayrıştırma süreç havuzunda, toplama tek seferde vektörel yapılır
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            summaries = list(executor.map(_read_summary, paths, chunksize=16))
+        return cls(summary for summary in summaries if summary is not None)
+
+
+def _read_summary(path):
+    try:
+        with open(path, 'rb') as f:
+            return extract_xml_summary(f.read())
+    except Exception as e:
+        logging.error(f"{path} okunamadı: {e}")
+        return None
+
+
+def _sum(values, groups, count):
+    return np.bincount(groups, weights=np.nan_to_num(values), minlength=count)
+
+
+def _present(values, groups, count):
+    return np.bincount(groups, weights=~np.isnan(values), minlength=count) > 0
+
+
+def _exceeds(diff, tolerance):
+    # Kayan nokta hatası tam bir kuruşluk farkı tolerans dışına itmesin
+    return np.abs(diff) > tolerance + 1e-6
+
+
+def _rate_keys(groups, rates):
+    return groups.astype(np.int64) * _KEY_STRIDE + np.round(rates * _RATE_SCALE).astype(np.int64)
+
+
+def _group_by_rate(groups, rates, *values):
+    # (grup, oran) anahtarına göre toplam; oranı olmayan satırlar atlanır
+    valid = ~np.isnan(rates)
+    keys, inverse = np.unique(_rate_keys(groups[valid], rates[valid]), return_inverse=True)
+    sums = [np.bincount(inverse, weights=np.nan_to_num(column[valid]), minlength=len(keys)) for column in values]
+    counts = np.bincount(inverse, minlength=len(keys))
+    return keys, counts, sums
+
+
+def aggregate(columns, tolerance=TOLERANCE):
+    n = columns.count
+    inv = columns.line_invoice
+    lines = columns.lines
+    amount, tax, rate = lines['amount'], lines['tax_amount'], lines['tax_percent']
+    totals = columns.totals
+    line_currency = columns.currency[inv]
+
+    line_sum = _sum(amount, inv, n)
+    line_tax = np.where(_present(tax, inv, n), _sum(tax, inv, n), np.nan)
+    subtotals = columns.subtotals
+    subtotal_tax = np.where(_present(subtotals['amount'], subtotals['invoice'], n),
+                            _sum(subtotals['amount'], subtotals['invoice'], n), np.nan)
+    withholding = columns.withholding
+    withholding_sum = _sum(withholding['amount'], withholding['invoice'], n)
+
+    # Para birimi ve oran bazında matrah/KDV
+    rate_keys, rate_counts, (rate_taxable, rate_tax) = _group_by_rate(line_currency, rate, amount, tax)
+    withholding_keys, _, (withholding_taxable, withholding_tax) = _group_by_rate(
+        columns.currency[withholding['invoice']], withholding['percent'], withholding['taxable'], withholding['amount'])
+
+    # Kalem KDV'si matrah × oran ile uyuşmalı
+    expected_tax = np.round(amount * rate / 100, 2)
+    line_tax_mismatch = ~np.isnan(expected_tax) & ~np.isnan(tax) & _exceeds(tax - expected_tax, tolerance)
+
+    allowance = np.nan_to_num(totals['allowance_total'])
+    charge = np.nan_to_num(totals['charge_total'])
+    rounding = np.nan_to_num(totals['rounding'])
+    tax_total = np.where(np.isnan(columns.tax_total), line_tax, columns.tax_total)
+    checks = [
+        ('Kalem tutarları toplamı / LegalMonetaryTotal', line_sum, totals['line_extension']),
+        ('Kalem KDV toplamı / TaxTotal', line_tax, columns.tax_total),
+        ('Vergi alt toplamları / TaxTotal', subtotal_tax, columns.tax_total),
+        ('Mal/hizmet - iskonto + artırım / vergiler hariç', totals['line_extension'] - allowance + charge, totals['tax_exclusive']),
+        ('Vergiler hariç + vergi / vergiler dahil', totals['tax_exclusive'] + tax_total, totals['tax_inclusive']),
+    ]
+
+    issues = []
+    for label, computed, declared in checks:
+        diff = declared - computed
+        for index in np.nonzero(_exceeds(diff, tolerance))[0]:
+            issues.append((columns.ids[index], label, computed[index], declared[index], diff[index], index))
+
+    # Ödenecek tutar, tevkifatın düşüldüğü ve düşülmediği iki yaygın gösterimden biriyle uyuşmalı
+    payable = totals['payable']
+    gross = totals['tax_inclusive'] + rounding
+    net = gross - withholding_sum
+    for index in np.nonzero(_exceeds(payable - gross, tolerance) & _exceeds(payable - net, tolerance))[0]:
+        issues.append((columns.ids[index], 'Vergiler dahil - tevkifat / ödenecek', net[index], payable[index],
+                       payable[index] - net[index], index))
+
+    # Beyan edilen oran bazlı matrahlar, kalemlerden hesaplananla karşılaştırılır
+    line_keys, _, (line_taxable,) = _group_by_rate(inv, rate, amount)
+    sub_keys, _, (sub_taxable,) = _group_by_rate(subtotals['invoice'], subtotals['percent'], subtotals['taxable'])
+    _, line_index, sub_index = np.intersect1d(line_keys, sub_keys, assume_unique=True, return_indices=True)
+    diff = sub_taxable[sub_index] - line_taxable[line_index]
+    for position in np.nonzero(_exceeds(diff, tolerance))[0]:
+        key = sub_keys[sub_index[position]]
+        index = int(key // _KEY_STRIDE)
+        issues.append((columns.ids[index], f"KDV %{(key % _KEY_STRIDE) / _RATE_SCALE:g} matrahı (kalemler / alt toplam)",
+                       line_taxable[line_index[position]], sub_taxable[sub_index[position]], diff[position], index))
+
+    issues.sort(key=lambda issue: -abs(issue[4]))
+    # Kalemi ve beyan edilen hiçbir toplamı olmayan faturada karşılaştırılacak bir şey yoktur; "tutarlı" sayılmaz
+    has_totals = ~np.isnan(columns.tax_total) | _present(subtotals['amount'], subtotals['invoice'], n)
+    for field in TOTAL_FIELDS:
+        has_totals |= ~np.isnan(totals[field])
+    unchecked = np.nonzero((np.bincount(inv, minlength=n) == 0) & ~has_totals)[0]
+    currencies = columns.currency_codes
+    per_currency = {
+        str(code): {
+            'invoices': int(np.count_nonzero(columns.currency == position)),
+            'line_extension': float(np.nansum(totals['line_extension'][columns.currency == position])),
+            'tax_total': float(np.nansum(tax_total[columns.currency == position])),
+            'withholding': float(withholding_sum[columns.currency == position].sum()),
+            'payable': float(np.nansum(payable[columns.currency == position])),
+        }
+        for position, code in enumerate(currencies)
+    }
+    return {
+        'invoices': n,
+        'lines': int(len(inv)),
+        'currencies': per_currency,
+        'rates': [
+            {'currency': str(currencies[key // _KEY_STRIDE]), 'percent': (key % _KEY_STRIDE) / _RATE_SCALE,
+             'lines': int(count), 'taxable': float(taxable), 'tax': float(tax_sum)}
+            for key, count, taxable, tax_sum in zip(rate_keys, rate_counts, rate_taxable, rate_tax)
+        ],
+        'withholding': [
+            {'currency': str(currencies[key // _KEY_STRIDE]), 'percent': (key % _KEY_STRIDE) / _RATE_SCALE,
+             'taxable': float(taxable), 'tax': float(tax_sum)}
+            for key, taxable, tax_sum in zip(withholding_keys, withholding_taxable, withholding_tax)
+        ],
+        'line_tax_mismatches': int(np.count_nonzero(line_tax_mismatch)),
+        'unchecked': [columns.ids[index] for index in unchecked],
+        'issue_count': len(issues),
+        'issues': [
+            {'invoice': invoice, 'date': columns.dates[index], 'check': label,
+             'computed': round(float(computed), 2), 'declared': round(float(declared), 2), 'diff': round(float(diff), 2)}
+            for invoice, label, computed, declared, diff, index in issues
+        ],
+    }
+
+
+def format_aggregate(result, max_issues=MAX_ISSUES, details=True):
+    # details=False: oran ve para birimi toplamları yazılmaz, yalnızca kontrol sonuçları
+    out = [f"Yerel hesaplama ({result['invoices']} fatura, {result['lines']} kalem):"]
+    unchecked = result.get('unchecked', [])
+    # Hiçbir faturada kalem/toplam yoksa sıfır toplamlar yazılmaz
+    details = details and len(unchecked) < result['invoices']
+    for rate in result['rates'] if details else ():
+        out.append(f"- KDV %{rate['percent']:g}: {rate['lines']} kalem, matrah {_amount(rate['taxable'], rate['currency'])}, "
+                   f"KDV {_amount(rate['tax'], rate['currency'])}")
+    for rate in result['withholding'] if details else ():
+        out.append(f"- Tevkifat %{rate['percent']:g}: matrah {_amount(rate['taxable'], rate['currency'])}, "
+                   f"vergi {_amount(rate['tax'], rate['currency'])}")
+    for currency, totals in result['currencies'].items() if details else ():
+        out.append(f"- Toplam ({totals['invoices']} fatura): mal/hizmet {_amount(totals['line_extension'], currency)}, "
+                   f"vergi {_amount(totals['tax_total'], currency)}, tevkifat {_amount(totals['withholding'], currency)}, "
+                   f"ödenecek {_amount(totals['payable'], currency)}")
+
+    if unchecked:
+        names = ", ".join(invoice or "?" for invoice in unchecked[:max_issues])
+        more = f" ve {len(unchecked) - max_issues} fatura daha" if len(unchecked) > max_issues else ""
+        out.append(f"- Satır/toplam yok, tutarlılık denetlenemedi: {names}{more}")
+        if len(unchecked) == result['invoices']:
+            return "\n".join(out)
+    if not result['issues'] and not result['line_tax_mismatches']:
+        out.append("- Kalem toplamları, oran bazlı matrah/KDV ve LegalMonetaryTotal tutarlı; tutarların yeniden hesaplanması gerekmez")
+        return "\n".join(out)
+    out.append("Tutarsızlıklar:")
+    if result['line_tax_mismatches']:
+        out.append(f"- {result['line_tax_mismatches']} kalemde KDV tutarı matrah × oran ile uyuşmuyor")
+    for issue in result['issues'][:max_issues]:
+        out.append(f"- {issue['invoice']}: {issue['check']}: hesaplanan {_amount(issue['computed'])}, "
+                   f"beyan edilen {_amount(issue['declared'])} (fark {_amount(issue['diff'])})")
+    if len(result['issues']) > max_issues:
+        out.append(f"- ... {len(result['issues']) - max_issues} tutarsızlık daha")
+    return "\n".join(out)
+
+
+def format_invoice_prompt(summary):
+    # Model aritmetik yapmasın: kalemlerin yalnızca ilk birkaçı ve yerelde yapılan kontrollerin sonucu gider.
+    # Beyan edilen vergi alt toplamı yoksa oran bazlı toplamlar da eklenir
+    result = aggregate(InvoiceColumns([summary]))
+    return format_invoice_summary(summary, max_lines=PROMPT_LINES) + "\n" + \
+        format_aggregate(result, details=not summary['tax_subtotals'])
+
+
+def main(argv=None):
+    from batch_analyze import collect_jobs
+    from extraction import detect_file_type
+
+    parser = argparse.ArgumentParser(description="Klasördeki e-Fatura XML'lerini topla ve tutarlılığını denetle")
+    parser.add_argument("source", help="Klasör veya manifest dosyası")
+    parser.add_argument("--workers", type=int, default=None, help="Ayrıştırma süreç sayısı")
+    parser.add_argument("--max-issues", type=int, default=50)
+    parser.add_argument("--json", help="Sonucu JSON olarak bu dosyaya yaz")
+    args = parser.parse_args(argv)
+
+    paths = [job["path"] for job in collect_jobs(args.source) if detect_file_type(job["path"]) == "xml"]
+    start = time.perf_counter()
+    columns = InvoiceColumns.from_files(paths, args.workers)
+    parsed = time.perf_counter()
+    result = aggregate(columns)
+    aggregated = time.perf_counter()
+
+    print(format_aggregate(result, args.max_issues))
+    print(f"{len(paths)} dosya, {columns.count} fatura: ayrıştırma {parsed - start:.2f} sn, "
+          f"toplama {(aggregated - parsed) * 1000:.1f} ms")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    return 1 if result['issue_count'] else 0
+
+
+if __name__ == '__main__':
+    from metrics import configure_logging
+    configure_logging(filename=None, console=True)
+    sys.exit(main())
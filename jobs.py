@@ -0,0 +1,308 @@
+import os
+import time
+import uuid
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from extraction import iter_content_units
+from pdf_extractor import PdfExtractor
+from ai_assistant import StreamingResponse
+from metrics import span, inc
+
+JOB_WORKERS = int(os.getenv('GIB_JOB_WORKERS', '8'))
+JOBS_PER_USER = int(os.getenv('GIB_JOB_PER_USER', '2'))
+EXTRACT_WORKERS = int(os.getenv('GIB_JOB_EXTRACT_WORKERS', str(min(4, os.cpu_count() or 1))))
+# Biten işler bu süre kadar saklanır (sn); sonra yeni iş gönderilirken temizlenir
+JOB_TTL = float(os.getenv('GIB_JOB_TTL', '3600'))
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(BaseException):
+    # asyncio.CancelledError gibi: ara katmanlardaki "except Exception" blokları iptali yutmasın
+    pass
+
+
+class JobLimitError(Exception):
+    pass
+
+
+def _extract_units(file_content, file_type):
+    # Süreç havuzunda çalışır: XML ayrıştırma ve fatura toplamları sunucu sürecinin GIL'ini tutmaz
+    fields = {}
+    units = list(iter_content_units(file_content, file_type, fields=fields))
+    return units, fields
+
+
+class Job:
+    def __init__(self, owner, kind):
+        self.id = uuid.uuid4().hex[:12]
+        self.owner = owner
+        self.kind = kind
+        self.state = QUEUED
+        self.progress = {'stage': QUEUED, 'units': 0, 'chunks_total': 0, 'chunks_done': 0}
+        self.tokens = []
+        self.content = None
+        self.mevzuat = []
+        self.timed_out_sources = []
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self._cond = threading.Condition()
+
+    @property
+    def done(self):
+        return self.state in FINISHED
+
+    @property
+    def text(self):
+        with self._cond:
+            return "".join(self.tokens)
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    def advance(self, field, amount=1):
+        # _map_chunks ve çıkarıcı tarafından çağrılır (check_cancelled ile birlikte); iptal edilen iş bir sonraki adımda durur
+        self.check_cancelled()
+        with self._cond:
+            self.progress[field] = self.progress.get(field, 0) + amount
+            self._cond.notify_all()
+
+    def set_stage(self, stage):
+        self.check_cancelled()
+        with self._cond:
+            self.progress['stage'] = stage
+            self._cond.notify_all()
+
+    def append(self, token):
+        self.check_cancelled()
+        with self._cond:
+            self.tokens.append(token)
+            self._cond.notify_all()
+
+    def cancel(self):
+        self.cancel_event.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def _finish(self, state, error=None):
+        with self._cond:
+            self.state = state
+            self.error = error
+            self.progress['stage'] = state
+            self.finished_at = time.time()
+            self._cond.notify_all()
+
+    def wait(self, timeout=None):
+        # Yeni token, ilerleme ya da bitiş gelene kadar bekler
+        with self._cond:
+            if not self.done:
+                self._cond.wait(timeout)
+            return self.done
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                'id': self.id,
+                'kind': self.kind,
+                'state': self.state,
+                'progress': dict(self.progress),
+                'text': "".join(self.tokens),
+                'content': self.content,
+                'mevzuat': self.mevzuat,
+                'timed_out_sources': self.timed_out_sources,
+                'error': self.error,
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at
+            }
+
+
+class JobManager:
+    # Uzun yanıt/analiz işleri arka planda: G/Ç iş parçacıklarında, çıkarma süreç havuzunda çalışır
+    def __init__(self, workers=JOB_WORKERS, per_user=JOBS_PER_USER, extract_workers=EXTRACT_WORKERS, ttl=JOB_TTL):
+        self.per_user = per_user
+        self.extract_workers = extract_workers
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='gib-job')
+        self._extract_pool = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    @property
+    def extract_pool(self):
+        if self._extract_pool is None:
+            with self._lock:
+                if self._extract_pool is None:
+                    # spawn: sunucunun iş parçacıkları ve kilitleri alt süreçlere kopyalanmaz
+                    self._extract_pool = ProcessPoolExecutor(
+                        max_workers=self.extract_workers, mp_context=multiprocessing.get_context('spawn')
+                    )
+        return self._extract_pool
+
+    def _prune(self):
+        now = time.time()
+        for job_id in [job.id for job in self._jobs.values() if job.done and now - job.finished_at > self.ttl]:
+            del self._jobs[job_id]
+
+    def _submit(self, owner, kind, func, *args):
+        with self._lock:
+            self._prune()
+            active = sum(1 for job in self._jobs.values() if job.owner == owner and not job.done)
+            if active >= self.per_user:
+                inc("gib_jobs_total", kind=kind, state="rejected")
+                raise JobLimitError(f"Aynı anda en fazla {self.per_user} iş çalıştırılabilir")
+            job = Job(owner, kind)
+            self._jobs[job.id] = job
+        inc("gib_jobs_total", kind=kind, state="submitted")
+        self._executor.submit(self._run, job, func, *args)
+        return job
+
+    def _run(self, job, func, *args):
+        if job.cancel_event.is_set():
+            job._finish(CANCELLED)
+            inc("gib_jobs_total", kind=job.kind, state=CANCELLED)
+            return
+        job.state = RUNNING
+        job.started_at = time.time()
+        try:
+            with span(f"job.{job.kind}"):
+                func(job, *args)
+            job._finish(DONE)
+        except JobCancelled:
+            logging.info(f"İş iptal edildi: {job.id}")
+            job._finish(CANCELLED)
+        except Exception as e:
+            logging.error(f"İş hatası ({job.id}): {str(e)}")
+            job._finish(FAILED, str(e))
+        inc("gib_jobs_total", kind=job.kind, state=job.state)
+
+    def _stream(self, job, stream):
+        if stream.error:
+            raise RuntimeError(stream.error)
+        job.content = stream.content
+        job.mevzuat = stream.mevzuat
+        job.timed_out_sources = stream.timed_out_sources
+        job.set_stage('generating')
+        for token in stream:
+            if job.cancel_event.is_set():
+                # Akış cancel_event'i kendisi görüp kapanır; okuyucu burada yarıda bırakılmaz
+                continue
+            job.append(token)
+        job.check_cancelled()
+        # Sağlayıcı hatası akıştan yükselir; token gelmiş olsa da tamamlanmayan yanıt başarılı sayılmaz
+        if not stream.completed:
+            raise RuntimeError(stream.error or "Yanıt yarıda kesildi. Lütfen tekrar deneyin.")
+        if not job.tokens:
+            raise RuntimeError("Yanıt alınamadı. Lütfen tekrar deneyin.")
+
+    def _answer(self, job, assistant, question, search_gib, search_mevbank):
+        job.set_stage('searching')
+        self._stream(job, assistant.stream_answer(question, search_gib=search_gib, search_mevbank=search_mevbank,
+                                                  cancel_event=job.cancel_event))
+
+    def _wait(self, job, future):
+        while True:
+            try:
+                return future.result(timeout=0.2)
+            except FutureTimeoutError:
+                if job.cancel_event.is_set():
+                    future.cancel()
+                    raise JobCancelled()
+
+    def _extract(self, job, file_content, file_type, fields=None):
+        # AIAssistant._iter_content_units için çıkarıcı; depo isabetinde hiç çağrılmaz
+        if file_type == 'pdf':
+            extractor = PdfExtractor(executor=self.extract_pool)
+            for unit in iter_content_units(file_content, file_type, pdf_extractor=extractor, fields=fields):
+                job.advance('units')
+                yield unit
+            return
+        units, extracted = self._wait(job, self.extract_pool.submit(_extract_units, file_content, file_type))
+        if fields is not None:
+            fields.update(extracted)
+        job.advance('units', len(units))
+        yield from units
+
+    def _analysis(self, job, assistant, file_content, file_type, question, search_gib, search_mevbank):
+        # Yönlendirici analizi birincil sağlayıcıya bırakır; uzak API istemcisinde ayrıntılı ilerleme yoktur
+        target = getattr(assistant, 'primary', assistant)
+        if not hasattr(target, '_prepare_analysis'):
+            job.set_stage('analyzing')
+            self._stream(job, assistant.stream_analysis(file_content, file_type, question, search_gib, search_mevbank,
+                                                        cancel_event=job.cancel_event))
+            return
+
+        job.set_stage('extracting')
+        extract = lambda content, kind, fields=None: self._extract(job, content, kind, fields)
+        prepared = target._prepare_analysis(
+            file_content, file_type, question, search_gib, search_mevbank, extract=extract, progress=job
+        )
+        if prepared is None:
+            raise ValueError("Desteklenmeyen dosya formatı")
+        prompt, content, mevzuat_bilgileri = prepared
+        self._stream(job, StreamingResponse(
+            target._stream_api_request(prompt, cancel_event=job.cancel_event),
+            content=content,
+            mevzuat=mevzuat_bilgileri,
+            timed_out_sources=getattr(mevzuat_bilgileri, 'timed_out', [])
+        ))
+
+    def submit_answer(self, owner, assistant, question, search_gib=False, search_mevbank=False):
+        return self._submit(owner, 'answer', self._answer, assistant, question, search_gib, search_mevbank)
+
+    def submit_analysis(self, owner, assistant, file_content, file_type, question=None, search_gib=False,
+                        search_mevbank=False):
+        return self._submit(owner, 'analysis', self._analysis, assistant, file_content, file_type, question,
+                            search_gib, search_mevbank)
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self, owner=None):
+        with self._lock:
+            return [job for job in self._jobs.values() if owner is None or job.owner == owner]
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is None or job.done:
+            return False
+        job.cancel()
+        return True
+
+    def stats(self):
+        counts = {state: 0 for state in (QUEUED, RUNNING) + FINISHED}
+        for job in self.jobs():
+            counts[job.state] += 1
+        return counts
+
+    def shutdown(self):
+        for job in self.jobs():
+            job.cancel()
+        self._executor.shutdown(wait=False)
+        if self._extract_pool is not None:
+            self._extract_pool.shutdown(wait=False, cancel_futures=True)
+
+
+_default_manager = None
+_default_manager_lock = threading.Lock()
+
+
+def get_job_manager():
+    global _default_manager
+    if _default_manager is None:
+        with _default_manager_lock:
+            if _default_manager is None:
+                _default_manager = JobManager()
+    return _default_manager
@@ -0,0 +1,320 @@
+import os
+import re
+import sys
+import sqlite3
+import logging
+import argparse
+import threading
+from collections import namedtuple
+from mevzuat_index import DEFAULT_INDEX_PATH, MevzuatIndex, turkish_casefold
+
+# Prompta eklenecek madde metinleri için üst sınırlar (karakter)
+MAX_ARTICLE_CHARS = int(os.getenv('GIB_MADDE_MAX_CHARS', '2000'))
+MAX_TOTAL_CHARS = int(os.getenv('GIB_MADDE_MAX_TOTAL_CHARS', '6000'))
+
+# Kanun numarası -> (kısaltma, tam ad)
+LAWS = {
+    '213': ('VUK', 'Vergi Usul Kanunu'),
+    '193': ('GVK', 'Gelir Vergisi Kanunu'),
+    '5520': ('KVK', 'Kurumlar Vergisi Kanunu'),
+    '3065': ('KDVK', 'Katma Değer Vergisi Kanunu'),
+    '4760': ('ÖTVK', 'Özel Tüketim Vergisi Kanunu'),
+    '488': ('DVK', 'Damga Vergisi Kanunu'),
+    '492': ('HK', 'Harçlar Kanunu'),
+    '6183': ('AATUHK', 'Amme Alacaklarının Tahsil Usulü Hakkında Kanun'),
+    '197': ('MTVK', 'Motorlu Taşıtlar Vergisi Kanunu'),
+    '1319': ('EVK', 'Emlak Vergisi Kanunu'),
+    '2464': ('BGK', 'Belediye Gelirleri Kanunu'),
+    '6102': ('TTK', 'Türk Ticaret Kanunu'),
+}
+
+# Metinde geçebilecek diğer adlar (küçük harfe çevrilmiş)
+EXTRA_ALIASES = {
+    'kdv kanunu': '3065',
+    'ötv kanunu': '4760',
+    'amme alacakları kanunu': '6183',
+}
+
+Article = namedtuple('Article', ['law_no', 'key', 'label', 'law_title', 'text', 'link'])
+Citation = namedtuple('Citation', ['law_no', 'article', 'paragraph'])
+
+_ABBREVIATIONS = {turkish_casefold(abbr): law_no for law_no, (abbr, _) in LAWS.items()}
+_NAMES = {turkish_casefold(name): law_no for law_no, (_, name) in LAWS.items()}
+_NAMES.update({alias: law_no for alias, law_no in EXTRA_ALIASES.items() if alias not in _ABBREVIATIONS})
+
+
+def _alternation(words):
+    return '|'.join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+
+
+# Madde başlıkları "MADDE 29 –", "Geçici Madde 1 -", "Mükerrer Madde 257 –" biçimindedir; metin içindeki
+# "29 uncu maddesi" gibi atıflar tireyle bitmediği için başlık sayılmaz
+_ARTICLE_RE = re.compile(
+    r"(?:(?<=\s)|^)(?P<kind>(?:ek|geçici|mükerrer)\s+)?madde\s+(?P<number>\d+)"
+    r"(?:\s*/\s*(?P<suffix>[a-zçğıöşü])(?![a-zçğıöşü]))?\s*[-–—]"
+)
+_PARAGRAPH_RE = re.compile(r"(?:(?<=\s)|^)\((\d+)\)\s")
+_LAW_NUMBER_RE = re.compile(r"kanun\s+numarası\s*:\s*(\d+)")
+_LINK_NUMBER_RE = re.compile(r"mevzuatno=(\d+)")
+_SAYILI_RE = re.compile(r"(\d{3,4})\s+sayılı")
+
+_ORDINAL = r"(?:['’]?\s*(?:inci|ıncı|uncu|üncü|nci|ncı|ncu|ncü|ci|cı|cu|cü)|\.)"
+_CITATION_RE = re.compile(
+    r"(?<![\w])(?:(?P<law_no>\d{3,4})\s+sayılı\s+)?"
+    r"(?:(?P<abbr>" + _alternation(_ABBREVIATIONS) + r")(?:['’][a-zçğıöşü]+)?(?![\w])"
+    r"|(?P<name>" + _alternation(list(_NAMES) + ['kanun']) + r")[a-zçğıöşü]*(?:['’][a-zçğıöşü]+)?)"
+    r"\s*(?P<pre>md\.?|m\.|maddesi\w*|madde)?\s*"
+    r"(?P<kind>(?:ek|geçici|mükerrer)\s+)?"
+    r"(?P<article>\d{1,3})(?!\d)"
+    r"(?:\s*/\s*(?P<paragraph>\d{1,2}|[a-zçğıöşü])(?![\w]))?"
+    r"(?P<post>\s*" + _ORDINAL + r"?\s*madde)?"
+)
+
+
+def article_key(number, kind='', suffix=''):
+    key = f"{kind.strip()} {number}".strip()
+    return f"{key}/{suffix}" if suffix else key
+
+
+def article_label(law_no, key):
+    abbr = LAWS.get(law_no, (f"{law_no} s.K.",))[0]
+    return f"{abbr} {key.title() if not key[0].isdigit() else key}"
+
+
+def detect_law_number(title='', content='', link=''):
+    folded_head = turkish_casefold(content[:3000])
+    match = _LAW_NUMBER_RE.search(folded_head)
+    if match:
+        return match.group(1)
+    match = _LINK_NUMBER_RE.search((link or '').lower())
+    if match:
+        return match.group(1)
+    folded_title = turkish_casefold(title or '')
+    for name, law_no in sorted(_NAMES.items(), key=lambda item: len(item[0]), reverse=True):
+        if name in folded_title:
+            return law_no
+    match = _SAYILI_RE.search(folded_title)
+    return match.group(1) if match else None
+
+
+def segment_articles(content):
+    # (madde anahtarı, madde metni) listesi; küçük harfe çevirme uzunluğu değiştirmediğinden konumlar ortaktır
+    folded = turkish_casefold(content)
+    matches = list(_ARTICLE_RE.finditer(folded))
+    articles = []
+    seen = set()
+    for index, match in enumerate(matches):
+        key = article_key(match.group('number'), match.group('kind') or '', match.group('suffix') or '')
+        end = matches[index + 1].start() if index + 1 < len(matches) else len(content)
+        if key in seen:
+            # Değişiklik kanunlarının aynı numaralı geçici maddeleri: ilk (asıl) metin tutulur
+            continue
+        seen.add(key)
+        articles.append((key, content[match.start():end].strip()))
+    return articles
+
+
+def split_paragraphs(text):
+    marks = list(_PARAGRAPH_RE.finditer(text))
+    if marks:
+        return {
+            mark.group(1): text[mark.start():marks[i + 1].start() if i + 1 < len(marks) else len(text)].strip()
+            for i, mark in enumerate(marks)
+        }
+    # Numarasız fıkralar (eski kanunlar) satır satır ayrılır; ilk satır madde başlığını içerir
+    lines = [line.strip() for line in text.split('\n') if line.strip()]
+    return {str(i + 1): line for i, line in enumerate(lines)}
+
+
+def find_citations(text):
+    citations = []
+    for match in _CITATION_RE.finditer(turkish_casefold(text or '')):
+        if match.group('abbr'):
+            law_no = _ABBREVIATIONS[match.group('abbr')]
+        elif match.group('name') != 'kanun':
+            law_no = _NAMES[match.group('name')]
+        else:
+            law_no = match.group('law_no')
+        # Tam ad ve "sayılı Kanun" atıflarında madde ibaresi aranır; "Kanunun 2024 yılı" gibi eşleşmeler elenir
+        if not law_no or (match.group('name') and not (match.group('pre') or match.group('post'))):
+            continue
+        citation = Citation(law_no, article_key(match.group('article'), match.group('kind') or ''),
+                            match.group('paragraph'))
+        if citation not in citations:
+            citations.append(citation)
+    return citations
+
+
+class MaddeIndex:
+    def __init__(self, path=None):
+        self.path = path or DEFAULT_INDEX_PATH
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._articles = None
+        conn = self._connection()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS articles (
+                law_no TEXT NOT NULL,
+                article TEXT NOT NULL,
+                law_title TEXT,
+                text TEXT NOT NULL,
+                link TEXT,
+                PRIMARY KEY (law_no, article)
+            ) WITHOUT ROWID;
+        """)
+        conn.commit()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _load(self):
+        # Tüm maddeler (kanun no, madde) anahtarıyla bellekte tutulur; atıf çözümü sözlük erişimidir
+        if self._articles is None:
+            with self._write_lock:
+                if self._articles is None:
+                    self._articles = {
+                        (law_no, article): Article(law_no, article, article_label(law_no, article), law_title, text, link)
+                        for law_no, article, law_title, text, link in self._connection().execute(
+                            'SELECT law_no, article, law_title, text, link FROM articles'
+                        )
+                    }
+        return self._articles
+
+    def __len__(self):
+        return len(self._load())
+
+    def add_law(self, link, title, content, law_no=None):
+        law_no = law_no or detect_law_number(title, content, link)
+        if not law_no:
+            return 0
+        articles = segment_articles(content)
+        if not articles:
+            return 0
+        law_title = LAWS.get(law_no, (None, title))[1]
+        with self._write_lock:
+            conn = self._connection()
+            conn.execute('DELETE FROM articles WHERE law_no = ?', (law_no,))
+            conn.executemany(
+                'INSERT INTO articles (law_no, article, law_title, text, link) VALUES (?, ?, ?, ?, ?)',
+                [(law_no, key, law_title, text, link) for key, text in articles]
+            )
+            conn.commit()
+            if self._articles is not None:
+                for key in [key for key in self._articles if key[0] == law_no]:
+                    del self._articles[key]
+                for key, text in articles:
+                    self._articles[(law_no, key)] = Article(law_no, key, article_label(law_no, key), law_title, text, link)
+        logging.info(f"{law_no} sayılı {law_title}: {len(articles)} madde indekslendi")
+        return len(articles)
+
+    def get(self, law_no, article):
+        return self._load().get((str(law_no), turkish_casefold(str(article)).strip()))
+
+    def resolve(self, citation):
+        # Fıkra numarası verilmişse yalnızca o fıkra döner; harfli bentlerde maddenin tamamı kullanılır
+        article = self.get(citation.law_no, citation.article)
+        if article is None and citation.paragraph and not citation.paragraph.isdigit():
+            article = self.get(citation.law_no, f"{citation.article}/{citation.paragraph}")
+        if article is None:
+            return None, None
+        if citation.paragraph and citation.paragraph.isdigit():
+            paragraph = split_paragraphs(article.text).get(citation.paragraph)
+            if paragraph:
+                return f"{article.label}/{citation.paragraph}", paragraph
+        return article.label, article.text
+
+    def lookup(self, text):
+        citations = find_citations(text)
+        return self.resolve(citations[0]) if citations else (None, None)
+
+    def render(self, citations, max_chars=MAX_TOTAL_CHARS, max_article_chars=MAX_ARTICLE_CHARS):
+        parts = []
+        total = 0
+        for citation in citations:
+            label, text = self.resolve(citation)
+            if text is None:
+                continue
+            if len(text) > max_article_chars:
+                text = text[:max_article_chars].rsplit(' ', 1)[0] + ' …'
+            if total + len(text) > max_chars:
+                break
+            parts.append(f"[{label}] {text}")
+            total += len(text)
+        return "\n\n".join(parts)
+
+    def cited_text(self, *texts, max_chars=MAX_TOTAL_CHARS):
+        return self.render(find_citations("\n".join(text for text in texts if text)), max_chars)
+
+    def laws(self):
+        return self._connection().execute(
+            'SELECT law_no, law_title, COUNT(*) FROM articles GROUP BY law_no, law_title ORDER BY law_no'
+        ).fetchall()
+
+    def build_from(self, index):
+        laws = 0
+        for link in index.links():
+            doc = index.get_document(link)
+            if doc and self.add_law(link, doc['title'], doc['content']):
+                laws += 1
+        return laws
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_madde_index(path=None):
+    path = path or DEFAULT_INDEX_PATH
+    with _indexes_lock:
+        if path not in _indexes:
+            _indexes[path] = MaddeIndex(path)
+        return _indexes[path]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kanun maddesi indeksi ve atıf çözümleme")
+    parser.add_argument('--index', default=DEFAULT_INDEX_PATH, help="İndeks dosyası")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('build', help="Mevzuat indeksindeki kanun metinlerini maddelere ayır")
+    add_parser = subparsers.add_parser('add', help="Bir kanun metnini dosyadan ekle")
+    add_parser.add_argument('file')
+    add_parser.add_argument('--law-no')
+    add_parser.add_argument('--title', default='')
+    lookup_parser = subparsers.add_parser('lookup', help="Atıf çözümle, ör. \"VUK 359\"")
+    lookup_parser.add_argument('citation')
+    cite_parser = subparsers.add_parser('cite', help="Metindeki atıfları listele")
+    cite_parser.add_argument('text')
+    subparsers.add_parser('laws', help="İndekslenmiş kanunlar")
+
+    args = parser.parse_args(argv)
+    index = MaddeIndex(args.index)
+
+    if args.command == 'build':
+        print(f"{index.build_from(MevzuatIndex(args.index))} kanun maddelere ayrıldı, toplam {len(index)} madde")
+    elif args.command == 'add':
+        with open(args.file, encoding='utf-8') as f:
+            count = index.add_law(args.file, args.title, f.read(), law_no=args.law_no)
+        print(f"{count} madde eklendi")
+    elif args.command == 'lookup':
+        label, text = index.lookup(args.citation)
+        print(f"[{label}]\n{text}" if text else "Madde bulunamadı")
+    elif args.command == 'cite':
+        for citation in find_citations(args.text):
+            print(article_label(citation.law_no, citation.article) + (f"/{citation.paragraph}" if citation.paragraph else ''))
+    elif args.command == 'laws':
+        for law_no, law_title, count in index.laws():
+            print(f"{law_no:>5}  {law_title}  ({count} madde)")
+    return 0
+
+
+if __name__ == '__main__':
+    from metrics import configure_logging
+    configure_logging(filename=None, console=True)
+    sys.exit(main())
@@ -0,0 +1,338 @@
+import os
+import json
+import time
+import queue
+import atexit
+import bisect
+import logging
+import threading
+import logging.handlers
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# GIB_METRICS=0 ile ölçüm tamamen kapatılır; span'ler paylaşılan boş bir nesne döndürür
+METRICS_ENABLED = os.getenv('GIB_METRICS', '1') != '0'
+LOG_FILE = os.getenv('GIB_LOG_FILE', 'app.log')
+LOG_LEVEL = os.getenv('GIB_LOG_LEVEL', 'INFO').upper()
+# Span kayıtları JSON satırları olarak ayrı dosyaya yazılır; boş bırakılırsa yazılmaz
+METRICS_LOG_FILE = os.getenv('GIB_METRICS_LOG', 'metrics.jsonl')
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+STAGE_METRIC = 'gib_stage_duration_seconds'
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+_span_logger = logging.getLogger('gib.metrics')
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'count', 'sum')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        # Kova sınırları arasında doğrusal yaklaşım; Prometheus histogram_quantile ile aynı mantık
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                if index == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class Span:
+    __slots__ = ('registry', 'stage', 'labels', 'start')
+
+    def __init__(self, registry, stage, labels):
+        self.registry = registry
+        self.stage = stage
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.record_span(self.stage, time.perf_counter() - self.start, self.labels, exc_type is None)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+class Metrics:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def span(self, stage, **labels):
+        if not self.enabled:
+            return _NOOP_SPAN
+        return Span(self, stage, labels)
+
+    def record_span(self, stage, seconds, labels=None, ok=True):
+        self.observe(STAGE_METRIC, seconds, stage=stage, **(labels or {}))
+        if not ok:
+            self.inc('gib_stage_errors_total', stage=stage, **(labels or {}))
+        if _span_logger.isEnabledFor(logging.INFO):
+            record = {'stage': stage, 'duration_ms': round(seconds * 1000, 3), 'ok': ok}
+            record.update(labels or {})
+            _span_logger.info(json.dumps(record, ensure_ascii=False))
+
+    def timed_iter(self, stage, iterable, **labels):
+        # Üretecin kendi içinde geçen süre ölçülür; tüketicinin beklemesi dahil edilmez
+        if not self.enabled:
+            yield from iterable
+            return
+        iterator = iter(iterable)
+        elapsed = 0.0
+        ok = False
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    elapsed += time.perf_counter() - start
+                    ok = True
+                    break
+                elapsed += time.perf_counter() - start
+                yield item
+        finally:
+            self.record_span(stage, elapsed, labels, ok)
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self):
+        with self._lock:
+            counters = [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+            histograms = [
+                {
+                    'name': name,
+                    'labels': dict(labels),
+                    'count': histogram.count,
+                    'sum': round(histogram.sum, 6),
+                    'p50': round(histogram.quantile(0.5), 6),
+                    'p95': round(histogram.quantile(0.95), 6),
+                    'buckets': dict(zip([str(b) for b in histogram.buckets] + ['+Inf'], histogram.counts)),
+                }
+                for (name, labels), histogram in sorted(self._histograms.items())
+            ]
+        return {'enabled': self.enabled, 'counters': counters, 'histograms': histograms}
+
+    def stage_summary(self):
+        # Arayüz için aşama bazında özet (ms)
+        rows = []
+        for item in self.snapshot()['histograms']:
+            if item['name'] != STAGE_METRIC:
+                continue
+            labels = dict(item['labels'])
+            stage = labels.pop('stage')
+            rows.append({
+                'stage': stage + ''.join(f' [{value}]' for value in labels.values()),
+                'count': item['count'],
+                'avg_ms': round(item['sum'] / item['count'] * 1000, 1) if item['count'] else 0.0,
+                'p50_ms': round(item['p50'] * 1000, 1),
+                'p95_ms': round(item['p95'] * 1000, 1),
+            })
+        return rows
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+
+    def to_prometheus(self):
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, list(h.buckets), list(h.counts), h.count, h.sum) for key, h in self._histograms.items()
+            )
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f'# TYPE {name} counter')
+                typed.add(name)
+            lines.append(f'{name}{_format_labels(labels)} {value}')
+        for (name, labels), buckets, counts, count, total in histograms:
+            if name not in typed:
+                lines.append(f'# TYPE {name} histogram')
+                typed.add(name)
+            cumulative = 0
+            for bound, bucket_count in zip(buckets + ['+Inf'], counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{_format_labels(labels + (("le", str(bound)),))} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {total}')
+            lines.append(f'{name}_count{_format_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+_registry = Metrics(enabled=METRICS_ENABLED)
+
+
+def get_metrics():
+    return _registry
+
+
+def span(stage, **labels):
+    return _registry.span(stage, **labels)
+
+
+def timed_iter(stage, iterable, **labels):
+    return _registry.timed_iter(stage, iterable, **labels)
+
+
+def inc(name, value=1, **labels):
+    _registry.inc(name, value, **labels)
+
+
+def observe(name, value, buckets=LATENCY_BUCKETS, **labels):
+    _registry.observe(name, value, buckets, **labels)
+
+
+class _JsonFormatter(logging.Formatter):
+    def format(self, record):
+        # Span mesajları zaten JSON; zaman damgası eklenerek tek satır yazılır
+        return json.dumps({'ts': round(record.created, 3), **json.loads(record.getMessage())}, ensure_ascii=False)
+
+
+class _ExcludeMetrics(logging.Filter):
+    def filter(self, record):
+        return record.name != _span_logger.name
+
+
+_listener = None
+_logging_lock = threading.Lock()
+
+
+def configure_logging(filename=LOG_FILE, console=False, level=LOG_LEVEL, metrics_file=METRICS_LOG_FILE):
+    # Kök logger'a tek bir kuyruk handler'ı bağlanır; dosyaya yazma arka plandaki dinleyici iş parçacığında yapılır
+    global _listener
+    with _logging_lock:
+        if _listener is not None:
+            return _listener
+        handlers = []
+        formatter = logging.Formatter(LOG_FORMAT)
+        if filename:
+            handlers.append(logging.FileHandler(filename, encoding='utf-8'))
+        if console:
+            handlers.append(logging.StreamHandler())
+        for handler in handlers:
+            handler.setFormatter(formatter)
+            handler.addFilter(_ExcludeMetrics())
+        # Metrik dosyası yoksa span kayıtları hiç oluşturulmaz
+        _span_logger.setLevel(logging.INFO if metrics_file else logging.WARNING)
+        if metrics_file:
+            metrics_handler = logging.FileHandler(metrics_file, encoding='utf-8')
+            metrics_handler.setFormatter(_JsonFormatter())
+            metrics_handler.addFilter(logging.Filter(_span_logger.name))
+            handlers.append(metrics_handler)
+
+        log_queue = queue.SimpleQueue()
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(logging.handlers.QueueHandler(log_queue))
+        root.setLevel(level)
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+        return _listener
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.startswith('/metrics.json'):
+            body, content_type = _registry.to_json(), 'application/json'
+        elif self.path.startswith('/metrics'):
+            body, content_type = _registry.to_prometheus(), 'text/plain; version=0.0.4'
+        else:
+            self.send_error(404)
+            return
+        data = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+_exporter = None
+
+
+def start_http_exporter(port=None, host='127.0.0.1'):
+    # /metrics (Prometheus) ve /metrics.json uç noktaları; süreç başına tek sunucu
+    global _exporter
+    port = port if port is not None else int(os.getenv('GIB_METRICS_PORT', '0') or 0)
+    with _logging_lock:
+        if _exporter is None and port:
+            _exporter = ThreadingHTTPServer((host, port), _MetricsHandler)
+            _exporter.daemon_threads = True
+            threading.Thread(target=_exporter.serve_forever, name='metrics-exporter', daemon=True).start()
+            logging.info(f"Metrik sunucusu http://{host}:{port}/metrics adresinde başlatıldı")
+        return _exporter
@@ -0,0 +1,321 @@
+import sqlite3
+import math
+import re
+import os
+import sys
+import time
+import heapq
+import logging
+import argparse
+import threading
+from collections import Counter
+
+DEFAULT_INDEX_PATH = os.getenv('MEVZUAT_INDEX_PATH', 'mevzuat_index.db')
+
+# BM25 parametreleri
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+SNIPPET_LENGTH = 500
+
+# Türkçe büyük/küçük harf dönüşümü: Python'un lower() fonksiyonu 'I' -> 'i' ve 'İ' -> 'i̇' üretir
+_TURKISH_LOWER = str.maketrans({
+    'I': 'ı',
+    'İ': 'i',
+    'Â': 'a', 'â': 'a',
+    'Î': 'i', 'î': 'i',
+    'Û': 'u', 'û': 'u',
+})
+
+_TOKEN_RE = re.compile(r"[0-9a-zçğıöşü]+")
+
+STOPWORDS = {
+    've', 'ile', 'bir', 'bu', 'şu', 'o', 'için', 'da', 'de', 'ki', 'mi', 'mı', 'mu', 'mü',
+    'ne', 'nedir', 'nasıl', 'olan', 'olarak', 'gibi', 'veya', 'ya', 'ise', 'her', 'çok',
+    'daha', 'en', 'kadar', 'sonra', 'önce', 'göre', 'ait', 'hangi', 'var', 'yok', 'midir',
+}
+
+# Uzundan kısaya sıralı çekim ekleri; basit ve tutarlı bir kök bulma yeterli
+SUFFIXES = sorted([
+    'lerinden', 'larından', 'lerinin', 'larının', 'lerine', 'larına', 'lerini', 'larını',
+    'lerinde', 'larında', 'leri', 'ları', 'ler', 'lar',
+    'sinin', 'sının', 'sine', 'sına', 'sini', 'sını', 'sinde', 'sında', 'sinden', 'sından',
+    'nin', 'nın', 'nun', 'nün', 'den', 'dan', 'ten', 'tan', 'nde', 'nda',
+    'dir', 'dır', 'dur', 'dür', 'tir', 'tır', 'tur', 'tür',
+    'in', 'ın', 'un', 'ün', 'de', 'da', 'te', 'ta', 'ye', 'ya', 'yi', 'yı', 'yu', 'yü',
+    'si', 'sı', 'su', 'sü', 'e', 'a', 'i', 'ı', 'u', 'ü',
+], key=len, reverse=True)
+
+MIN_STEM_LENGTH = 4
+
+
+def turkish_casefold(text):
+    return text.translate(_TURKISH_LOWER).lower()
+
+
+def stem(token):
+    if token.isdigit():
+        return token
+    for _ in range(2):
+        for suffix in SUFFIXES:
+            if token.endswith(suffix) and len(token) - len(suffix) >= MIN_STEM_LENGTH:
+                token = token[:-len(suffix)]
+                break
+        else:
+            break
+    return token
+
+
+def tokenize(text):
+    tokens = []
+    for token in _TOKEN_RE.findall(turkish_casefold(text or '')):
+        if token in STOPWORDS or (len(token) < 2 and not token.isdigit()):
+            continue
+        tokens.append(stem(token))
+    return tokens
+
+
+class MevzuatIndex:
+    def __init__(self, path=None):
+        self.path = path or DEFAULT_INDEX_PATH
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._stats_cache = None
+        self._meta_cache = None
+        self._create_schema()
+        logging.info(f"Mevzuat indeksi açıldı: {self.path}")
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _create_schema(self):
+        conn = self._connection()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS docs (
+                id INTEGER PRIMARY KEY,
+                link TEXT UNIQUE NOT NULL,
+                title TEXT NOT NULL,
+                content TEXT NOT NULL,
+                date TEXT,
+                source TEXT,
+                length INTEGER NOT NULL,
+                indexed_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL,
+                doc_id INTEGER NOT NULL,
+                tf INTEGER NOT NULL,
+                PRIMARY KEY (term, doc_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id);
+        """)
+        conn.commit()
+
+    def _corpus_stats(self):
+        if self._stats_cache is None:
+            row = self._connection().execute('SELECT COUNT(*), AVG(length) FROM docs').fetchone()
+            self._stats_cache = (row[0], row[1] or 0.0)
+        return self._stats_cache
+
+    def _doc_meta(self):
+        if self._meta_cache is None:
+            self._meta_cache = {
+                doc_id: (length, source)
+                for doc_id, length, source in self._connection().execute('SELECT id, length, source FROM docs')
+            }
+        return self._meta_cache
+
+    def __len__(self):
+        return self._corpus_stats()[0]
+
+    def add_document(self, link, title, content, date='', source='', commit=True):
+        terms = Counter(tokenize(f"{title}\n{content}"))
+        length = sum(terms.values())
+        with self._write_lock:
+            conn = self._connection()
+            row = conn.execute('SELECT id FROM docs WHERE link = ?', (link,)).fetchone()
+            if row:
+                doc_id = row[0]
+                conn.execute('DELETE FROM postings WHERE doc_id = ?', (doc_id,))
+                conn.execute(
+                    'UPDATE docs SET title = ?, content = ?, date = ?, source = ?, length = ?, indexed_at = ? WHERE id = ?',
+                    (title, content, date, source, length, time.time(), doc_id)
+                )
+            else:
+                cursor = conn.execute(
+                    'INSERT INTO docs (link, title, content, date, source, length, indexed_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (link, title, content, date, source, length, time.time())
+                )
+                doc_id = cursor.lastrowid
+            conn.executemany(
+                'INSERT INTO postings (term, doc_id, tf) VALUES (?, ?, ?)',
+                [(term, doc_id, tf) for term, tf in terms.items()]
+            )
+            if commit:
+                conn.commit()
+            self._stats_cache = None
+            self._meta_cache = None
+        return doc_id
+
+    def add_results(self, results):
+        for result in results:
+            if result.get('link') and result.get('title'):
+                self.add_document(
+                    result['link'],
+                    result['title'],
+                    result.get('content', ''),
+                    date=result.get('date', ''),
+                    source=result.get('source', ''),
+                    commit=False
+                )
+        self._connection().commit()
+
+    def get_document(self, link):
+        row = self._connection().execute(
+            'SELECT title, content, date, source FROM docs WHERE link = ?', (link,)
+        ).fetchone()
+        if not row:
+            return None
+        return {'title': row[0], 'link': link, 'content': row[1], 'date': row[2], 'source': row[3]}
+
+    def search(self, query, k=10, sources=None, min_score=0.0, min_coverage=0.0):
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        n_docs, avgdl = self._corpus_stats()
+        if n_docs == 0:
+            return []
+
+        conn = self._connection()
+        meta = self._doc_meta()
+        scores = {}
+        matches = Counter()
+        for term in terms:
+            postings = conn.execute('SELECT doc_id, tf FROM postings WHERE term = ?', (term,)).fetchall()
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings:
+                length, source = meta.get(doc_id, (avgdl, None))
+                if sources and source not in sources:
+                    continue
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * length / avgdl) if avgdl else BM25_K1
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+                matches[doc_id] += 1
+
+        if not scores:
+            return []
+
+        if min_coverage:
+            scores = {doc_id: score for doc_id, score in scores.items() if matches[doc_id] / len(terms) >= min_coverage}
+        ranked = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        results = []
+        for doc_id, score in ranked:
+            if score < min_score:
+                break
+            title, content, date, source, link = conn.execute(
+                'SELECT title, content, date, source, link FROM docs WHERE id = ?', (doc_id,)
+            ).fetchone()
+            results.append({
+                'title': title,
+                'link': link,
+                'content': self._snippet(content, terms),
+                'date': date or '',
+                'source': source or '',
+                'score': round(score, 4)
+            })
+        return results
+
+    def _snippet(self, content, terms):
+        if len(content) <= SNIPPET_LENGTH:
+            return content
+        # İlk eşleşen terimin çevresinden kısa bir kesit döndür
+        folded = turkish_casefold(content)
+        position = min((folded.find(term) for term in terms if folded.find(term) >= 0), default=0)
+        start = max(0, position - SNIPPET_LENGTH // 4)
+        return content[start:start + SNIPPET_LENGTH].strip()
+
+    def links(self):
+        return [row[0] for row in self._connection().execute('SELECT link FROM docs ORDER BY id')]
+
+    def rebuild(self):
+        conn = self._connection()
+        rows = conn.execute('SELECT link, title, content, date, source FROM docs').fetchall()
+        with self._write_lock:
+            conn.execute('DELETE FROM postings')
+            conn.commit()
+        for link, title, content, date, source in rows:
+            self.add_document(link, title, content, date=date, source=source, commit=False)
+        conn.commit()
+        conn.execute('VACUUM')
+        logging.info(f"Mevzuat indeksi yeniden oluşturuldu: {len(rows)} belge")
+        return len(rows)
+
+    def refresh(self, scraper, links=None):
+        updated = 0
+        for link in links or self.links():
+            # _get_content indirilen belgeyi indekse kendisi yazar
+            if scraper._get_content(link):
+                updated += 1
+        logging.info(f"Mevzuat indeksi güncellendi: {updated} belge")
+        return updated
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Yerel mevzuat indeksi yönetimi")
+    parser.add_argument('--index', default=DEFAULT_INDEX_PATH, help="İndeks dosyası")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('rebuild', help="Kayıtlı belgelerden indeksi yeniden oluştur")
+
+    refresh_parser = subparsers.add_parser('refresh', help="Belgeleri kaynaktan tekrar indir ve indeksle")
+    refresh_parser.add_argument('links', nargs='*')
+
+    add_parser = subparsers.add_parser('add', help="Belgeleri indir ve indekse ekle")
+    add_parser.add_argument('links', nargs='+')
+
+    search_parser = subparsers.add_parser('search', help="İndekste arama yap")
+    search_parser.add_argument('query')
+    search_parser.add_argument('-k', type=int, default=5)
+
+    subparsers.add_parser('stats', help="İndeks istatistikleri")
+
+    args = parser.parse_args(argv)
+    index = MevzuatIndex(args.index)
+
+    if args.command == 'rebuild':
+        print(f"{index.rebuild()} belge yeniden indekslendi")
+    elif args.command in ('refresh', 'add'):
+        from mevzuat_scraper import MevzuatScraper
+        scraper = MevzuatScraper(index=index)
+        print(f"{index.refresh(scraper, args.links or None)} belge güncellendi")
+    elif args.command == 'search':
+        start = time.perf_counter()
+        results = index.search(args.query, k=args.k)
+        elapsed = (time.perf_counter() - start) * 1000
+        for result in results:
+            print(f"{result['score']:8.3f}  {result['title']}  ({result['link']})")
+        print(f"{len(results)} sonuç, {elapsed:.2f} ms")
+    elif args.command == 'stats':
+        n_docs, avgdl = index._corpus_stats()
+        print(f"Belge sayısı: {n_docs}, ortalama uzunluk: {avgdl:.1f} terim")
+    return 0
+
+
+if __name__ == '__main__':
+    from metrics import configure_logging
+    configure_logging(filename=None, console=True)
+    sys.exit(main())
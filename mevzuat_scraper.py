@@ -1,18 +1,30 @@
-import requests
-from bs4 import BeautifulSoup
+import os
+import time
+import threading
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import logging
+from mevzuat_index import MevzuatIndex
+from madde_index import get_madde_index
+from http_pool import get_session
+from metrics import span, inc
+from html_parsing import get_parser, DEFAULT_BACKEND
+from answer_cache import normalize_prompt
+from singleflight import get_group
+
+# Tüm scraper örnekleri kaynak aramaları için aynı havuzu paylaşır
+_search_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='mevzuat-search')
+
+
+class SearchResults(list):
+    def __init__(self, results=(), timed_out=None, source='live'):
+        super().__init__(results)
+        self.timed_out = list(timed_out or [])
+        self.source = source
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('scraper.log'),
-        logging.StreamHandler()
-    ]
-)
 
 class MevzuatScraper:
-    def __init__(self):
+    def __init__(self, index=None, use_index=True):
         self.mevzuat_url = "https://www.mevzuat.gov.tr"
         self.resmigazete_url = "https://www.resmigazete.gov.tr"
         self.gib_url = "https://www.gib.gov.tr/mevzuat"
@@ -20,48 +32,169 @@ class MevzuatScraper:
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
+        self.session = get_session()
+        # Yerel indeks sonuç vermezse canlı aramaya düşülür
+        self.index = index if index is not None else (MevzuatIndex() if use_index else None)
+        # Kanun metinleri indirildikçe madde madde ayrılır
+        self.madde_index = get_madde_index(self.index.path) if self.index is not None else None
+        # Aynı sorgu için eşzamanlı aramalar tek bir indeks/canlı aramayı paylaşır
+        self.search_flight = get_group("search")
+        self.index_top_k = 10
+        self.index_min_coverage = 0.5
+        # Kaynak başına zaman bütçesi (saniye) ve tüm arama için genel süre sınırı
+        self.source_timeouts = {
+            'mevzuat.gov.tr': 10,
+            'resmigazete.gov.tr': 10,
+            'gib.gov.tr': 8,
+            'mevbank.com': 8
+        }
+        self.search_deadline = 12
+        self.html_parser = DEFAULT_BACKEND
+        # Resmî Gazete arka planda eşitleniyorsa (mevzuat_sync.py) canlı arama kapatılabilir
+        self.live_resmigazete = os.getenv('GIB_RESMIGAZETE_LIVE', '1') != '0'
         logging.info("Scraper initialized")
 
+    def _fan_out(self, query, sources):
+        start = time.monotonic()
+        futures = {}
+        for source, search_func in sources:
+            budget = min(self.source_timeouts.get(source, self.search_deadline), self.search_deadline)
+            future = _search_executor.submit(search_func, query, timeout=budget)
+            futures[future] = (source, start + budget)
+
+        results_by_source = {}
+        pending = set(futures)
+        while pending:
+            now = time.monotonic()
+            expired = {future for future in pending if futures[future][1] <= now}
+            pending -= expired
+            if not pending:
+                break
+            next_deadline = min(futures[future][1] for future in pending)
+            done, pending = wait(pending, timeout=next_deadline - now, return_when=FIRST_COMPLETED)
+            for future in done:
+                source = futures[future][0]
+                try:
+                    results_by_source[source] = future.result()
+                except Exception as e:
+                    logging.error(f"Error searching {source}: {e}")
+                    results_by_source[source] = []
+
+        timed_out = [source for source, _ in sources if source not in results_by_source]
+        for future, (source, _) in futures.items():
+            if source in timed_out:
+                future.cancel()
+        for source in timed_out:
+            inc("gib_search_timeouts_total", source=source)
+        if timed_out:
+            logging.warning(f"Sources timed out: {', '.join(timed_out)}")
+
+        results = SearchResults(timed_out=timed_out)
+        for source, _ in sources:
+            results.extend(results_by_source.get(source, []))
+        logging.info(f"Fan-out search finished in {time.monotonic() - start:.2f}s")
+        return results
+
+    def _search_index(self, query, sources):
+        if self.index is None or not sources:
+            return []
+        try:
+            with span("search.index"):
+                results = self.index.search(
+                    query,
+                    k=self.index_top_k,
+                    sources=sources,
+                    min_coverage=self.index_min_coverage
+                )
+            inc("gib_index_lookups_total", result="hit" if results else "miss")
+            if results:
+                logging.info(f"Found {len(results)} results in local index")
+            return results
+        except Exception as e:
+            logging.error(f"Index search error: {e}")
+            return []
+
+    def _add_to_index(self, results):
+        if self.index is None or not results:
+            return
+        try:
+            self.index.add_results(results)
+        except Exception as e:
+            logging.error(f"Index update error: {e}")
+
+    def _add_articles(self, url, title, text):
+        if self.madde_index is None:
+            return
+        try:
+            self.madde_index.add_law(url, title, text)
+        except Exception as e:
+            logging.error(f"Madde indeksi güncelleme hatası: {e}")
+
     def search_mevzuat(self, query, search_mevzuat=True, search_resmigazete=True):
-        results = []
+        sources = []
+        if search_mevzuat:
+            sources.append('mevzuat.gov.tr')
+        if search_resmigazete:
+            sources.append('resmigazete.gov.tr')
+        
+        results = self._search_index(query, sources)
+        if results:
+            return SearchResults(results, source='index')
         
         try:
+            live_sources = []
             if search_mevzuat:
-                logging.info("Searching mevzuat.gov.tr")
-                mevzuat_results = self._search_mevzuat_gov(query)
-                results.extend(mevzuat_results)
+                live_sources.append(('mevzuat.gov.tr', self._search_mevzuat_gov))
+            if search_resmigazete and self.live_resmigazete:
+                live_sources.append(('resmigazete.gov.tr', self._search_resmigazete_gov))
+            if not live_sources:
+                return SearchResults()
             
-            if search_resmigazete:
-                logging.info("Searching resmigazete.gov.tr")
-                resmigazete_results = self._search_resmigazete_gov(query)
-                results.extend(resmigazete_results)
+            logging.info(f"Searching {', '.join(source for source, _ in live_sources)}")
+            with span("search.fan_out"):
+                results = self._fan_out(query, live_sources)
             
             logging.info(f"Found {len(results)} total results")
+            self._add_to_index(results)
             return results
             
         except Exception as e:
             logging.error(f"Error during search: {e}")
-            return []
+            return SearchResults()
 
     def search(self, query, search_gib=False, search_mevbank=False):
-        results = []
+        key = (normalize_prompt(query), bool(search_gib), bool(search_mevbank), self.gib_url, self.mevbank_url)
+        return self.search_flight.do(key, self._search, query, search_gib, search_mevbank)
+
+    def _search(self, query, search_gib=False, search_mevbank=False):
+        sources = []
+        if search_gib:
+            sources.append('gib.gov.tr')
+        if search_mevbank:
+            sources.append('mevbank.com')
+        
+        results = self._search_index(query, sources)
+        if results:
+            return SearchResults(results, source='index')
         
         try:
+            live_sources = []
             if search_gib:
-                gib_results = self._search_gib(query)
-                results.extend(gib_results)
-            
+                live_sources.append(('gib.gov.tr', self._search_gib))
             if search_mevbank:
-                mevbank_results = self._search_mevbank(query)
-                results.extend(mevbank_results)
+                live_sources.append(('mevbank.com', self._search_mevbank))
             
+            with span("search.fan_out"):
+                results = self._fan_out(query, live_sources)
+            
+            self._add_to_index(results)
             return results
             
         except Exception as e:
             logging.error(f"Mevzuat arama hatası: {str(e)}")
-            return []
+            return SearchResults()
     
-    def _search_gib(self, query):
+    def _search_gib(self, query, timeout=None):
         try:
             results = []
             return results
@@ -69,7 +202,7 @@ class MevzuatScraper:
             logging.error(f"GİB arama hatası: {str(e)}")
             return []
     
-    def _search_mevbank(self, query):
+    def _search_mevbank(self, query, timeout=None):
         try:
             results = []
             return results
@@ -77,31 +210,26 @@ class MevzuatScraper:
             logging.error(f"Mevbank arama hatası: {str(e)}")
             return []
 
-    def _search_mevzuat_gov(self, query):
+    def _search_mevzuat_gov(self, query, timeout=None):
         try:
             search_url = f"{self.mevzuat_url}/arama.aspx"
             params = {'q': query}
             
-            response = requests.get(search_url, params=params, headers=self.headers)
-            response.raise_for_status()
+            with span("search.fetch", source='mevzuat.gov.tr'):
+                response = self.session.get(search_url, params=params, headers=self.headers, timeout=timeout)
+                response.raise_for_status()
             
-            soup = BeautifulSoup(response.text, 'html.parser')
-            results = []
-            
-            for result in soup.select('.search-result'):
-                title = result.select_one('.title')
-                link = result.select_one('a')
-                content = result.select_one('.content')
-                date = result.select_one('.date')
-                
-                if title and link:
-                    results.append({
-                        'title': title.text.strip(),
-                        'link': self.mevzuat_url + link['href'] if link['href'].startswith('/') else link['href'],
-                        'content': content.text.strip() if content else '',
-                        'date': date.text.strip() if date else '',
+            with span("search.parse", source='mevzuat.gov.tr', parser=self.html_parser):
+                results = [
+                    {
+                        'title': result['title'],
+                        'link': self.mevzuat_url + result['href'] if result['href'].startswith('/') else result['href'],
+                        'content': result['content'],
+                        'date': result['date'],
                         'source': 'mevzuat.gov.tr'
-                    })
+                    }
+                    for result in get_parser(self.html_parser).search_results(response.text, 'search-result')
+                ]
             
             logging.info(f"Found {len(results)} results from mevzuat.gov.tr")
             return results
@@ -110,31 +238,26 @@ class MevzuatScraper:
             logging.error(f"Error searching mevzuat.gov.tr: {e}")
             return []
 
-    def _search_resmigazete_gov(self, query):
+    def _search_resmigazete_gov(self, query, timeout=None):
         try:
             search_url = f"{self.resmigazete_url}/arama"
             params = {'q': query}
             
-            response = requests.get(search_url, params=params, headers=self.headers)
-            response.raise_for_status()
+            with span("search.fetch", source='resmigazete.gov.tr'):
+                response = self.session.get(search_url, params=params, headers=self.headers, timeout=timeout)
+                response.raise_for_status()
             
-            soup = BeautifulSoup(response.text, 'html.parser')
-            results = []
-            
-            for result in soup.select('.gazette-result'):
-                title = result.select_one('.title')
-                link = result.select_one('a')
-                content = result.select_one('.content')
-                date = result.select_one('.date')
-                
-                if title and link:
-                    results.append({
-                        'title': title.text.strip(),
-                        'link': self.resmigazete_url + link['href'] if link['href'].startswith('/') else link['href'],
-                        'content': content.text.strip() if content else '',
-                        'date': date.text.strip() if date else '',
+            with span("search.parse", source='resmigazete.gov.tr', parser=self.html_parser):
+                results = [
+                    {
+                        'title': result['title'],
+                        'link': self.resmigazete_url + result['href'] if result['href'].startswith('/') else result['href'],
+                        'content': result['content'],
+                        'date': result['date'],
                         'source': 'resmigazete.gov.tr'
-                    })
+                    }
+                    for result in get_parser(self.html_parser).search_results(response.text, 'gazette-result')
+                ]
             
             logging.info(f"Found {len(results)} results from resmigazete.gov.tr")
             return results
@@ -143,16 +266,43 @@ class MevzuatScraper:
             logging.error(f"Error searching resmigazete.gov.tr: {e}")
             return []
 
-    def _get_content(self, url):
+    def _get_content(self, url, timeout=None):
         try:
-            response = requests.get(url, headers=self.headers)
-            response.raise_for_status()
+            with span("content.fetch"):
+                response = self.session.get(url, headers=self.headers, timeout=timeout or self.search_deadline)
+                response.raise_for_status()
+            
+            with span("content.parse", parser=self.html_parser):
+                page_title, text = get_parser(self.html_parser).page_content(response.text)
             
-            soup = BeautifulSoup(response.text, 'html.parser')
-            content = soup.select_one('.content')
+            if text and self.index is not None:
+                doc = self.index.get_document(url)
+                title = doc['title'] if doc else (page_title or url)
+                self.index.add_document(
+                    url,
+                    title,
+                    text,
+                    date=doc['date'] if doc else '',
+                    source=doc['source'] if doc else urlparse(url).netloc.replace('www.', '')
+                )
+                self._add_articles(url, title, text)
             
-            return content.text.strip() if content else ""
+            return text
             
         except Exception as e:
             logging.error(f"Error getting content from {url}: {e}")
             return ""
+
+
+_default_scraper = None
+_default_scraper_lock = threading.Lock()
+
+
+def get_scraper():
+    # Varsayılan indeksi kullanan tek scraper; asistanlar her oluşturulduğunda yeniden kurulmaz
+    global _default_scraper
+    if _default_scraper is None:
+        with _default_scraper_lock:
+            if _default_scraper is None:
+                _default_scraper = MevzuatScraper()
+    return _default_scraper
@@ -0,0 +1,358 @@
+import os
+import sys
+import time
+import sqlite3
+import hashlib
+import logging
+import argparse
+import threading
+from collections import Counter
+from datetime import date, datetime, timedelta
+from urllib.parse import urljoin, urlparse
+from concurrent.futures import ThreadPoolExecutor
+from mevzuat_scraper import MevzuatScraper
+from mevzuat_index import MevzuatIndex
+from html_parsing import get_parser
+from rate_limit import parse_retry_after, retry_delay
+from metrics import span, inc
+
+# Aynı hosta ardışık iki isteğin başlangıcı arasındaki en kısa süre (saniye)
+SYNC_MIN_INTERVAL = float(os.getenv('GIB_SYNC_MIN_INTERVAL', '1.0'))
+SYNC_WORKERS = int(os.getenv('GIB_SYNC_WORKERS', '4'))
+# Bilinen belgeler bu süreden sonra koşullu istekle yeniden kontrol edilir
+SYNC_RECHECK_DAYS = float(os.getenv('GIB_SYNC_RECHECK_DAYS', '7'))
+# İlk çalıştırmada geriye doğru taranacak gün sayısı
+SYNC_INITIAL_DAYS = int(os.getenv('GIB_SYNC_INITIAL_DAYS', '30'))
+
+ISSUE_URL_TEMPLATE = "{base}/eskiler/{day:%Y}/{day:%m}/{day:%Y%m%d}.htm"
+DOCUMENT_EXTENSIONS = ('.htm', '.html')
+
+
+def content_hash(text):
+    return hashlib.sha256(' '.join(text.split()).encode('utf-8')).hexdigest()
+
+
+class HostThrottle:
+    def __init__(self, min_interval=SYNC_MIN_INTERVAL):
+        self.min_interval = min_interval
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host):
+        # Her istek bir sonraki boş zaman dilimini ayırır; eşzamanlı işçiler sıraya girer
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next.get(host, 0.0))
+            self._next[host] = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+
+    def defer(self, host, seconds):
+        with self._lock:
+            self._next[host] = max(self._next.get(host, 0.0), time.monotonic() + seconds)
+
+
+class SyncState:
+    # Kontrol noktası indeks ile aynı SQLite dosyasında tutulur; her belge ve gün ayrı ayrı işlenir
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        conn = self._connection()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sync_documents (
+                link TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT,
+                checked_at REAL NOT NULL,
+                changed_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS sync_documents_checked ON sync_documents (checked_at);
+            CREATE TABLE IF NOT EXISTS sync_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+        conn.commit()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def document(self, link):
+        row = self._connection().execute(
+            'SELECT etag, last_modified, content_hash FROM sync_documents WHERE link = ?', (link,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {'etag': row[0], 'last_modified': row[1], 'content_hash': row[2]}
+
+    def save_document(self, link, etag=None, last_modified=None, content_hash=None, changed=False):
+        now = time.time()
+        with self._write_lock:
+            conn = self._connection()
+            conn.execute(
+                """INSERT INTO sync_documents (link, etag, last_modified, content_hash, checked_at, changed_at)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(link) DO UPDATE SET
+                       etag = COALESCE(excluded.etag, etag),
+                       last_modified = COALESCE(excluded.last_modified, last_modified),
+                       content_hash = COALESCE(excluded.content_hash, content_hash),
+                       checked_at = excluded.checked_at,
+                       changed_at = COALESCE(excluded.changed_at, changed_at)""",
+                (link, etag, last_modified, content_hash, now, now if changed else None)
+            )
+            conn.commit()
+
+    def due_links(self, checked_before, limit=None):
+        # Hiç kontrol edilmemiş indeks belgeleri de dahil, en eski kontrol edilenler önce
+        query = """SELECT docs.link FROM docs
+                   LEFT JOIN sync_documents s ON s.link = docs.link
+                   WHERE s.checked_at IS NULL OR s.checked_at < ?
+                   ORDER BY COALESCE(s.checked_at, 0)"""
+        params = [checked_before]
+        if limit:
+            query += ' LIMIT ?'
+            params.append(limit)
+        return [row[0] for row in self._connection().execute(query, params)]
+
+    def get(self, key, default=None):
+        row = self._connection().execute('SELECT value FROM sync_meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else default
+
+    def set(self, key, value):
+        with self._write_lock:
+            conn = self._connection()
+            conn.execute('INSERT OR REPLACE INTO sync_meta (key, value) VALUES (?, ?)', (key, value))
+            conn.commit()
+
+    def stats(self):
+        conn = self._connection()
+        documents, changed = conn.execute(
+            'SELECT COUNT(*), COUNT(changed_at) FROM sync_documents'
+        ).fetchone()
+        return {
+            'documents': documents,
+            'changed': changed,
+            'last_issue_date': self.get('last_issue_date'),
+            'last_run': self.get('last_run'),
+        }
+
+
+class MevzuatSync:
+    def __init__(self, scraper=None, index=None, workers=SYNC_WORKERS, min_interval=SYNC_MIN_INTERVAL,
+                 recheck_days=SYNC_RECHECK_DAYS):
+        self.scraper = scraper if scraper is not None else MevzuatScraper(index=index)
+        # Boş indeks len() == 0 olduğundan doğruluk değeriyle değil None ile karşılaştırılır
+        if index is None:
+            index = self.scraper.index if self.scraper.index is not None else MevzuatIndex()
+        self.index = index
+        self.state = SyncState(self.index.path)
+        self.throttle = HostThrottle(min_interval)
+        self.workers = workers
+        self.recheck_seconds = recheck_days * 24 * 3600
+        self.timeout = 20
+        self.max_retries = 3
+
+    def _get(self, url, validators=None):
+        headers = dict(self.scraper.headers)
+        if validators:
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+        host = urlparse(url).netloc
+        for attempt in range(self.max_retries):
+            self.throttle.wait(host)
+            response = self.scraper.session.get(url, headers=headers, timeout=self.timeout)
+            if response.status_code not in (429, 503) or attempt == self.max_retries - 1:
+                return response
+            # Sunucu yavaşlamamızı istiyor: bu host için tüm işçiler bekler
+            delay = parse_retry_after(response)
+            self.throttle.defer(host, delay if delay is not None else retry_delay(attempt))
+            inc("gib_sync_backoffs_total", host=host)
+        return response
+
+    def sync_document(self, url, title=None, date='', source=None):
+        validators = self.state.document(url)
+        response = self._get(url, validators)
+        if response.status_code == 304:
+            self.state.save_document(url)
+            return 'not_modified'
+        if response.status_code == 404:
+            self.state.save_document(url)
+            return 'missing'
+        response.raise_for_status()
+
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        page_title, text = get_parser(self.scraper.html_parser).page_text(response.text)
+        digest = content_hash(text)
+        if validators and validators.get('content_hash') == digest:
+            # Sunucu doğrulayıcı göndermese de içerik değişmediyse indeks yeniden yazılmaz
+            self.state.save_document(url, etag, last_modified, digest)
+            return 'unchanged'
+
+        if text:
+            doc = self.index.get_document(url)
+            title = title or (doc['title'] if doc else '') or page_title or url
+            self.index.add_document(
+                url,
+                title,
+                text,
+                date=date or (doc['date'] if doc else ''),
+                source=source or (doc['source'] if doc else urlparse(url).netloc.replace('www.', ''))
+            )
+            self.scraper._add_articles(url, title, text)
+        self.state.save_document(url, etag, last_modified, digest, changed=True)
+        return 'updated' if validators else 'new'
+
+    def _sync_safe(self, url, title=None, date='', source=None):
+        try:
+            outcome = self.sync_document(url, title, date, source)
+        except Exception as e:
+            logging.error(f"Senkronizasyon hatası ({url}): {e}")
+            outcome = 'failed'
+        inc("gib_sync_documents_total", result=outcome)
+        return outcome
+
+    def issue_url(self, day):
+        return ISSUE_URL_TEMPLATE.format(base=self.scraper.resmigazete_url, day=day)
+
+    def issue_links(self, day):
+        # Günün fihrist sayfasındaki metin bağlantıları; sayı yayımlanmamışsa None
+        url = self.issue_url(day)
+        response = self._get(url)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+
+        host = urlparse(url).netloc
+        links = {}
+        for href, text in get_parser(self.scraper.html_parser).page_links(response.text):
+            link = urljoin(url, href).split('#')[0]
+            parsed = urlparse(link)
+            if parsed.netloc != host or link == url or not parsed.path.lower().endswith(DOCUMENT_EXTENSIONS):
+                continue
+            if text and link not in links:
+                links[link] = text
+        return links
+
+    def sync_issues(self, since=None, until=None):
+        today = date.today()
+        until = until or today
+        last = self.state.get('last_issue_date')
+        if since is None:
+            since = (datetime.strptime(last, '%Y-%m-%d').date() + timedelta(days=1)) if last \
+                else today - timedelta(days=SYNC_INITIAL_DAYS)
+
+        totals = Counter()
+        day = since
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='mevzuat-sync') as executor:
+            while day <= until:
+                with span("sync.issue"):
+                    links = self.issue_links(day)
+                if links is None:
+                    if day >= today:
+                        break  # bugünün sayısı henüz yayımlanmamış
+                    logging.info(f"{day:%d.%m.%Y} için Resmî Gazete sayısı bulunamadı")
+                else:
+                    date_text = f"{day:%d.%m.%Y}"
+                    outcomes = list(executor.map(
+                        lambda item: self._sync_safe(item[0], item[1], date_text, 'resmigazete.gov.tr'),
+                        links.items()
+                    ))
+                    totals.update(outcomes)
+                    logging.info(f"{date_text} Resmî Gazete: {len(links)} belge, {dict(Counter(outcomes))}")
+                    if 'failed' in outcomes:
+                        # Kontrol noktası ilerletilmez; sonraki çalıştırma bu günden devam eder
+                        break
+                self.state.set('last_issue_date', day.isoformat())
+                totals['issues'] += 1
+                day += timedelta(days=1)
+        return dict(totals)
+
+    def sync_documents(self, limit=None):
+        links = self.state.due_links(time.time() - self.recheck_seconds, limit)
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='mevzuat-sync') as executor:
+            totals = Counter(executor.map(self._sync_safe, links))
+        logging.info(f"{len(links)} belge yeniden kontrol edildi: {dict(totals)}")
+        return dict(totals)
+
+    def run_once(self):
+        start = time.perf_counter()
+        with span("sync.run"):
+            issues = self.sync_issues()
+            documents = self.sync_documents()
+        self.state.set('last_run', datetime.now().isoformat(timespec='seconds'))
+        return {'issues': issues, 'documents': documents, 'elapsed_seconds': round(time.perf_counter() - start, 2)}
+
+    def run_forever(self, interval=3600, stop_event=None):
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            try:
+                logging.info(f"Senkronizasyon tamamlandı: {self.run_once()}")
+            except Exception as e:
+                logging.error(f"Senkronizasyon turu başarısız: {e}")
+            stop_event.wait(interval)
+
+
+def start_background_sync(interval=3600, **kwargs):
+    stop_event = threading.Event()
+    sync = MevzuatSync(**kwargs)
+    threading.Thread(target=sync.run_forever, args=(interval, stop_event), name='mevzuat-sync', daemon=True).start()
+    return sync, stop_event
+
+
+def _parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resmî Gazete ve mevzuat belgelerini yerel indeksle artımlı eşitle")
+    parser.add_argument('--index', default=None, help="İndeks dosyası")
+    parser.add_argument('--workers', type=int, default=SYNC_WORKERS)
+    parser.add_argument('--min-interval', type=float, default=SYNC_MIN_INTERVAL, help="Host başına istekler arası saniye")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    issues_parser = subparsers.add_parser('issues', help="Yeni Resmî Gazete sayılarını indir")
+    issues_parser.add_argument('--since', type=_parse_date, help="YYYY-AA-GG (varsayılan: kontrol noktasından devam)")
+    issues_parser.add_argument('--until', type=_parse_date)
+
+    documents_parser = subparsers.add_parser('documents', help="Süresi gelen belgeleri koşullu istekle kontrol et")
+    documents_parser.add_argument('--limit', type=int)
+
+    run_parser = subparsers.add_parser('run', help="Sayıları ve belgeleri periyodik olarak eşitle")
+    run_parser.add_argument('--interval', type=float, default=3600)
+    run_parser.add_argument('--once', action='store_true')
+
+    subparsers.add_parser('status', help="Kontrol noktası bilgileri")
+
+    args = parser.parse_args(argv)
+    index = MevzuatIndex(args.index)
+    sync = MevzuatSync(index=index, workers=args.workers, min_interval=args.min_interval)
+
+    if args.command == 'issues':
+        print(sync.sync_issues(args.since, args.until))
+    elif args.command == 'documents':
+        print(sync.sync_documents(args.limit))
+    elif args.command == 'run':
+        if args.once:
+            print(sync.run_once())
+        else:
+            sync.run_forever(args.interval)
+    elif args.command == 'status':
+        print(sync.state.stats())
+    return 0
+
+
+if __name__ == '__main__':
+    from metrics import configure_logging
+    configure_logging(filename=None, console=True)
+    sys.exit(main())
@@ -0,0 +1,146 @@
+import io
+import os
+import time
+import logging
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_MAX_PAGES = int(os.getenv('GIB_PDF_MAX_PAGES', '1000'))
+DEFAULT_MAX_BYTES = int(os.getenv('GIB_PDF_MAX_BYTES', str(20 * 1024 * 1024)))
+DEFAULT_WORKERS = int(os.getenv('GIB_PDF_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+# Bu sayfa sayısının altındaki belgelerde süreç havuzu kurmak çıkarmadan daha pahalıdır
+PARALLEL_PAGE_THRESHOLD = 64
+PARALLEL_MIN_BYTES = 1024 * 1024
+PAGES_PER_TASK = 16
+EXECUTOR_TASKS = 8
+
+PdfPage = namedtuple('PdfPage', ['number', 'text', 'elapsed'])
+
+_worker_reader = None
+
+
+def _init_worker(file_content):
+    # Dosya her işçiye bir kez aktarılır, görevler yalnızca sayfa aralığı taşır
+    global _worker_reader
+    import PyPDF2
+    _worker_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
+
+
+def _extract_page(reader, index):
+    start = time.perf_counter()
+    text = reader.pages[index].extract_text() or ""
+    return PdfPage(index + 1, text, time.perf_counter() - start)
+
+
+def _extract_range(start, stop):
+    return [_extract_page(_worker_reader, index) for index in range(start, stop)]
+
+
+def _extract_pages(file_content, start, stop):
+    # Paylaşılan süreç havuzu için: dosya her görevle gelir, okuyucu görevde kurulur
+    import PyPDF2
+    reader = PyPDF2.PdfReader(io.BytesIO(file_content))
+    return [_extract_page(reader, index) for index in range(start, stop)]
+
+
+class PdfExtractor:
+    def __init__(self, max_pages=DEFAULT_MAX_PAGES, max_bytes=DEFAULT_MAX_BYTES, workers=DEFAULT_WORKERS, executor=None):
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        self.workers = workers
+        # Verilirse tüm sayfalar bu süreç havuzunda çıkarılır (ör. jobs.py); dosya boyutu eşiği uygulanmaz
+        self.executor = executor
+        self.timings = []
+        self.truncated = False
+
+    def iter_pages(self, file_content):
+        self.timings = []
+        self.truncated = False
+        # PyPDF2 yalnızca ilk PDF geldiğinde yüklenir; soru-cevap oturumları bu maliyeti ödemez
+        import PyPDF2
+        reader = PyPDF2.PdfReader(io.BytesIO(file_content))
+        page_count = len(reader.pages)
+        total = min(page_count, self.max_pages) if self.max_pages else page_count
+        if total < page_count:
+            self.truncated = True
+            logging.warning(f"PDF {page_count} sayfa, ilk {total} sayfa işlenecek")
+
+        if self.executor is not None:
+            pages = self._iter_executor(file_content, total)
+        elif self.workers > 1 and total >= PARALLEL_PAGE_THRESHOLD and len(file_content) >= PARALLEL_MIN_BYTES:
+            pages = self._iter_parallel(file_content, total)
+        else:
+            pages = (_extract_page(reader, index) for index in range(total))
+
+        used_bytes = 0
+        try:
+            for page in pages:
+                size = len(page.text.encode('utf-8'))
+                if self.max_bytes and used_bytes + size > self.max_bytes:
+                    remaining = self.max_bytes - used_bytes
+                    text = page.text.encode('utf-8')[:remaining].decode('utf-8', errors='ignore')
+                    self.timings.append(page.elapsed)
+                    self.truncated = True
+                    logging.warning(f"PDF metin bütçesi ({self.max_bytes} bayt) {page.number}. sayfada doldu")
+                    if text:
+                        yield page._replace(text=text)
+                    return
+                used_bytes += size
+                self.timings.append(page.elapsed)
+                yield page
+        finally:
+            pages.close()
+
+    def _iter_parallel(self, file_content, total):
+        workers = min(self.workers, (total + PAGES_PER_TASK - 1) // PAGES_PER_TASK)
+        logging.info(f"PDF {total} sayfa, {workers} süreçte çıkarılıyor")
+        # Streamlit çok iş parçacıklı çalıştığı için fork yerine spawn kullanılır
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(file_content,)
+        )
+        try:
+            futures = [
+                executor.submit(_extract_range, start, min(start + PAGES_PER_TASK, total))
+                for start in range(0, total, PAGES_PER_TASK)
+            ]
+            # Sayfa sırası korunur; her aralık hazır olduğunda hemen aktarılır
+            for future in futures:
+                yield from future.result()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _iter_executor(self, file_content, total):
+        # Dosya her görevle kopyalandığı için görev sayısı EXECUTOR_TASKS ile sınırlanır
+        step = max(PAGES_PER_TASK, -(-total // EXECUTOR_TASKS))
+        futures = [
+            self.executor.submit(_extract_pages, file_content, start, min(start + step, total))
+            for start in range(0, total, step)
+        ]
+        try:
+            for future in futures:
+                yield from future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def extract_text(self, file_content):
+        start = time.perf_counter()
+        text = "\n".join(page.text for page in self.iter_pages(file_content)).strip()
+        logging.info(self.timing_summary(time.perf_counter() - start))
+        return text
+
+    def timing_summary(self, elapsed=None):
+        if not self.timings:
+            return "PDF: sayfa çıkarılmadı"
+        slowest = max(range(len(self.timings)), key=self.timings.__getitem__)
+        summary = (f"PDF: {len(self.timings)} sayfa, sayfa başına ort. "
+                   f"{sum(self.timings) / len(self.timings) * 1000:.1f} ms, en yavaş {slowest + 1}. sayfa "
+                   f"({self.timings[slowest] * 1000:.1f} ms)")
+        if elapsed is not None:
+            summary += f", toplam {elapsed:.2f} sn"
+        return summary
@@ -0,0 +1,275 @@
+import os
+import time
+import queue
+import logging
+import threading
+from collections import deque
+from ai_assistant import get_assistant, StreamingResponse
+from metrics import span, inc
+from singleflight import CANCEL_POLL
+
+ROUTER_PROVIDERS = [p.strip() for p in os.getenv('GIB_ROUTER_PROVIDERS', 'huggingface,anthropic,openai').split(',') if p.strip()]
+# İstatistik yokken birincil sağlayıcının ilk token için beklenme süresi (saniye); p95 bu değerle sınırlanır
+HEDGE_DELAY = float(os.getenv('GIB_HEDGE_DELAY', '3'))
+HEDGE_MIN_DELAY = float(os.getenv('GIB_HEDGE_MIN_DELAY', '0.5'))
+MAX_ERROR_RATE = float(os.getenv('GIB_ROUTER_MAX_ERROR_RATE', '0.5'))
+STATS_WINDOW = 100
+MIN_SAMPLES = 10
+
+
+class ProviderStats:
+    # Son STATS_WINDOW isteğin ilk token süresi ve başarı durumu
+    def __init__(self, provider, window=STATS_WINDOW):
+        self.provider = provider
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency, ok=True):
+        with self._lock:
+            self._samples.append((latency, ok))
+
+    def p95(self):
+        with self._lock:
+            latencies = sorted(latency for latency, ok in self._samples if ok)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+
+    def error_rate(self):
+        with self._lock:
+            if not self._samples:
+                return 0.0
+            return sum(1 for _, ok in self._samples if not ok) / len(self._samples)
+
+    def count(self):
+        with self._lock:
+            return len(self._samples)
+
+    def snapshot(self):
+        p95 = self.p95()
+        return {
+            'samples': self.count(),
+            'p95_ms': round(p95 * 1000, 1) if p95 is not None else None,
+            'error_rate': round(self.error_rate(), 3),
+        }
+
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def get_provider_stats(provider):
+    with _stats_lock:
+        if provider not in _stats:
+            _stats[provider] = ProviderStats(provider)
+        return _stats[provider]
+
+
+class _Attempt:
+    # Tek sağlayıcıya yapılan akışlı istek; token'lar ortak olay kuyruğuna yazılır
+    def __init__(self, provider, assistant, prompt, events, on_complete):
+        self.provider = provider
+        self.assistant = assistant
+        self.prompt = prompt
+        self.events = events
+        self.on_complete = on_complete
+        self.completed = False
+        self.cancelled = threading.Event()
+        self.stats = get_provider_stats(provider)
+        self.started = time.perf_counter()
+        threading.Thread(target=self._run, name=f"hedge-{provider}", daemon=True).start()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def _complete(self, text):
+        # _stream_api_request bunu yalnızca akış sonuna kadar okunduğunda çağırır; yarıda kalan yanıt önbelleğe yazılmaz
+        self.completed = True
+        if self.on_complete is not None:
+            self.on_complete(text)
+
+    def _run(self):
+        first = None
+        try:
+            for token in self.assistant._stream_api_request(self.prompt, on_complete=self._complete, cancel_event=self.cancelled):
+                if first is None:
+                    first = time.perf_counter() - self.started
+                    self.stats.record(first)
+                self.events.put(('token', self, token))
+        except Exception as e:
+            logging.error(f"{self.provider} yönlendirme isteği başarısız: {str(e)}")
+        elapsed = time.perf_counter() - self.started
+        if first is not None:
+            # İlk token'dan sonra kopan akış 'done' sayılmaz; aksi halde yanıt sessizce kesik kalır
+            self.events.put(('done' if self.completed or self.cancelled.is_set() else 'error', self, None))
+        elif self.cancelled.is_set():
+            # Kaybeden istek yanıt vermeden iptal edildi; süre gerçek gecikmenin alt sınırıdır
+            self.stats.record(elapsed)
+        else:
+            self.stats.record(elapsed, ok=False)
+            self.events.put(('failed', self, None))
+
+
+class ProviderRouter:
+    # AIAssistant arayüzüyle birden çok sağlayıcıya yönlendirme: birincil yavaşsa ikincile yedek istek gönderilir
+    def __init__(self, tokens, providers=None, hedge_delay=HEDGE_DELAY, max_error_rate=MAX_ERROR_RATE, assistants=None):
+        providers = providers or ROUTER_PROVIDERS
+        self.assistants = assistants or {
+            provider: get_assistant(provider, tokens[provider])
+            for provider in providers if tokens.get(provider)
+        }
+        if not self.assistants:
+            raise ValueError("Yönlendirme için en az bir sağlayıcı token'ı gerekli")
+        self.providers = [provider for provider in providers if provider in self.assistants]
+        self.model_provider = "router"
+        self.max_hedge_delay = hedge_delay
+        self.max_error_rate = max_error_rate
+
+    @property
+    def primary(self):
+        return self.assistants[self.providers[0]]
+
+    def hedge_delay(self, provider):
+        # Sağlayıcının kendi p95'i aşılınca yedek istek gönderilir
+        stats = get_provider_stats(provider)
+        p95 = stats.p95() if stats.count() >= MIN_SAMPLES else None
+        if p95 is None:
+            return self.max_hedge_delay
+        return min(self.max_hedge_delay, max(HEDGE_MIN_DELAY, p95))
+
+    def _healthy(self, provider):
+        stats = get_provider_stats(provider)
+        breaker = self.assistants[provider].circuit_breaker
+        if breaker.state == breaker.OPEN:
+            return False
+        return stats.count() < MIN_SAMPLES or stats.error_rate() <= self.max_error_rate
+
+    def candidates(self):
+        # Sağlıklı sağlayıcılar yapılandırma sırasıyla, hata oranı yüksek olanlar en sonda
+        healthy = [provider for provider in self.providers if self._healthy(provider)]
+        return healthy + [provider for provider in self.providers if provider not in healthy]
+
+    def stats(self):
+        return {provider: get_provider_stats(provider).snapshot() for provider in self.providers}
+
+    def _race(self, question, mevzuat_bilgileri, cancel_event=None):
+        # Önbellekte yanıt varsa yarış başlatılmaz
+        prepared = {}
+        for provider in self.candidates():
+            assistant = self.assistants[provider]
+            prompt, mevzuat_metni, _ = assistant._prepare_answer(question, mevzuat_bilgileri=mevzuat_bilgileri)
+            key = assistant._cache_key(prompt, mevzuat_metni)
+            if assistant.answer_cache is not None:
+                cached = assistant._cache_get(key)
+                if cached is not None:
+                    logging.info(f"Yanıt önbellekten döndürüldü ({provider})")
+                    yield provider, cached[0].get('generated_text', '')
+                    return
+            prepared[provider] = (assistant, prompt, key)
+
+        events = queue.Queue()
+        pending = list(prepared)
+        attempts = []
+
+        def launch():
+            provider = pending.pop(0)
+            assistant, prompt, key = prepared[provider]
+            on_complete = (lambda text: assistant._cache_put(key, [{"generated_text": text}])) if assistant.answer_cache is not None else None
+            attempts.append(_Attempt(provider, assistant, prompt, events, on_complete))
+            if len(attempts) > 1:
+                inc("gib_hedged_requests_total", provider=provider)
+                logging.info(f"{attempts[-2].provider} {self.hedge_delay(attempts[-2].provider):.1f} sn içinde yanıt vermedi, "
+                             f"{provider} ile yedek istek gönderildi")
+
+        def next_event(timeout):
+            # İptal edilirse None; süre dolarsa queue.Empty
+            if cancel_event is None:
+                return events.get(timeout=timeout)
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while not cancel_event.is_set():
+                wait = CANCEL_POLL if deadline is None else min(CANCEL_POLL, deadline - time.monotonic())
+                if wait <= 0:
+                    raise queue.Empty
+                try:
+                    return events.get(timeout=wait)
+                except queue.Empty:
+                    continue
+            return None
+
+        launch()
+        winner = None
+        failed = 0
+        try:
+            while winner is None:
+                timeout = self.hedge_delay(attempts[-1].provider) if pending else None
+                try:
+                    event = next_event(timeout)
+                except queue.Empty:
+                    launch()
+                    continue
+                if event is None:
+                    return
+                kind, attempt, token = event
+                if kind == 'token':
+                    winner = attempt
+                elif kind == 'failed':
+                    failed += 1
+                    if pending:
+                        launch()
+                    elif failed == len(attempts):
+                        raise RuntimeError("Hiçbir sağlayıcı yanıt vermedi")
+        finally:
+            # Kazanan belli olunca (veya hata/iptalde) diğer istekler kapatılır
+            for attempt in attempts:
+                if attempt is not winner:
+                    attempt.cancel()
+
+        inc("gib_router_wins_total", provider=winner.provider)
+        yield winner.provider, token
+        try:
+            while True:
+                event = next_event(None)
+                if event is None:
+                    return
+                kind, attempt, token = event
+                if attempt is not winner:
+                    continue
+                if kind == 'error':
+                    raise RuntimeError(f"{winner.provider} yanıtı yarıda kesildi")
+                if kind != 'token':
+                    break
+                yield winner.provider, token
+        finally:
+            winner.cancel()
+
+    def get_answer(self, question, search_gib=False, search_mevbank=False):
+        try:
+            with span("answer.total", provider=self.model_provider):
+                mevzuat_bilgileri = self.primary._search_mevzuat(question, search_gib, search_mevbank)
+                parts = []
+                provider = None
+                for provider, token in self._race(question, mevzuat_bilgileri):
+                    parts.append(token)
+            return [{
+                'generated_text': "".join(parts),
+                'provider': provider,
+                'mevzuat': mevzuat_bilgileri,
+                'timed_out_sources': getattr(mevzuat_bilgileri, 'timed_out', [])
+            }]
+        except Exception as e:
+            logging.error(f"Yönlendirmeli get_answer hatası: {str(e)}")
+            raise
+
+    def stream_answer(self, question, search_gib=False, search_mevbank=False, cancel_event=None):
+        mevzuat_bilgileri = self.primary._search_mevzuat(question, search_gib, search_mevbank)
+        return StreamingResponse(
+            (token for _, token in self._race(question, mevzuat_bilgileri, cancel_event)),
+            mevzuat=mevzuat_bilgileri,
+            timed_out_sources=getattr(mevzuat_bilgileri, 'timed_out', [])
+        )
+
+    def analyze_file(self, *args, **kwargs):
+        return self.primary.analyze_file(*args, **kwargs)
+
+    def stream_analysis(self, *args, **kwargs):
+        return self.primary.stream_analysis(*args, **kwargs)
@@ -0,0 +1,204 @@
+import sys
+import time
+import hashlib
+import random
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+import requests
+
+# Yalnızca tekrar denemeyle düzelebilecek durumlar; 400/401/403/404 gibi hatalar hemen döner
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504, 529}
+
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 30.0
+MAX_RETRY_AFTER = 60.0
+
+
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount):
+        # Gerekli bekleme süresini döndürür; kova borçlanarak sıradaki isteklere adil pay bırakır
+        amount = float(amount)
+        if amount > self.capacity:
+            # Kırpılmaz: istek kovanın tamamından büyükse borç gerçek bekleme süresini yansıtır
+            logging.warning(f"İstek ({amount:.0f}) dakikalık kotayı ({self.capacity:.0f}) aşıyor")
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= amount
+            wait = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+            return max(wait, self.paused_until - now)
+
+    def refund(self, amount):
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+    def pause(self, seconds):
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class RateLimiter:
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.waited = 0.0
+
+    def reserve(self, tokens=0):
+        # Kotayı ayırır ve beklenmesi gereken süreyi döndürür; beklemeyi çağıran yapar (async istemciler için)
+        wait = 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens is not None and tokens:
+            wait = max(wait, self.tokens.reserve(tokens))
+        if wait > 0:
+            self.waited += wait
+        return wait
+
+    def acquire(self, tokens=0):
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def refund(self, tokens):
+        # Tahminen ayrılıp kullanılmayan token'lar (ör. yanıt için ayrılan pay) geri verilir
+        if self.tokens is not None and tokens > 0:
+            self.tokens.refund(tokens)
+
+    def pause(self, seconds):
+        # 429 sonrası sağlayıcının istediği süre boyunca tüm iş parçacıkları bekler
+        for bucket in (self.requests, self.tokens):
+            if bucket is not None:
+                bucket.pause(seconds)
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                # Yarı açık durumda tek bir deneme isteğine izin verilir
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logging.info(f"{self.name} devre kesici kapandı")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logging.warning(f"{self.name} devre kesici açıldı ({self.failures} ardışık hata)")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+
+def _error_types():
+    # httpx yalnızca async istemci kullanıldığında yüklenir; yüklenmediyse hatası da oluşamaz
+    httpx = sys.modules.get('httpx')
+    if httpx is None:
+        return requests.HTTPError, (requests.ConnectionError, requests.Timeout)
+    return (requests.HTTPError, httpx.HTTPStatusError), (requests.ConnectionError, requests.Timeout, httpx.TransportError)
+
+
+def is_retryable(error):
+    status_errors, transport_errors = _error_types()
+    if isinstance(error, status_errors) and error.response is not None:
+        return error.response.status_code in RETRYABLE_STATUSES
+    return isinstance(error, transport_errors)
+
+
+def parse_retry_after(response):
+    if response is None:
+        return None
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+
+def retry_delay(attempt, error=None):
+    response = getattr(error, "response", None)
+    retry_after = parse_retry_after(response)
+    if retry_after is not None:
+        return retry_after
+    # Full jitter: aynı anda hata alan istemciler aynı anda tekrar denemez
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+_limiters = {}
+_breakers = {}
+_registry_lock = threading.Lock()
+
+
+def _registry_key(provider, api_token):
+    # Kota ve hata durumu API anahtarına aittir: farklı anahtarlar birbirinin kotasını tüketmez,
+    # geçersiz bir anahtar diğer kullanıcıların devre kesicisini açmaz. Anahtarın kendisi saklanmaz.
+    token_hash = hashlib.sha256((api_token or '').encode('utf-8')).hexdigest()[:12]
+    return provider, token_hash
+
+
+def get_rate_limiter(provider, requests_per_minute=None, tokens_per_minute=None, api_token=None):
+    key = _registry_key(provider, api_token)
+    with _registry_lock:
+        if key not in _limiters:
+            _limiters[key] = RateLimiter(requests_per_minute, tokens_per_minute)
+        return _limiters[key]
+
+
+def get_circuit_breaker(provider, failure_threshold=5, reset_timeout=30.0, api_token=None):
+    key = _registry_key(provider, api_token)
+    with _registry_lock:
+        if key not in _breakers:
+            _breakers[key] = CircuitBreaker(provider, failure_threshold, reset_timeout)
+        return _breakers[key]
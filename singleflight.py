@@ -0,0 +1,171 @@
+import logging
+import threading
+from metrics import inc
+
+# Okuyucu iptal olayını bu aralıkla yoklar
+CANCEL_POLL = 0.1
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class _StreamCall:
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.tokens = []
+        self.done = False
+        self.error = None
+        self.waiters = 0
+        self.readers = 0
+        # Son okuyucu ayrılınca kurulur; sürücü ve sağlayıcı akışı durur
+        self.cancelled = threading.Event()
+
+    def read(self, cancel_event=None):
+        # Her okuyucu arabelleği baştan okur, yeni token gelene kadar bekler
+        index = 0
+        try:
+            while True:
+                with self.cond:
+                    while index >= len(self.tokens) and not self.done:
+                        if cancel_event is not None and cancel_event.is_set():
+                            return
+                        self.cond.wait(None if cancel_event is None else CANCEL_POLL)
+                    if cancel_event is not None and cancel_event.is_set():
+                        return
+                    if index >= len(self.tokens):
+                        if self.error is not None:
+                            # Kopan akış tüm okuyuculara hata olarak iletilir
+                            raise self.error
+                        return
+                    token = self.tokens[index]
+                index += 1
+                yield token
+        finally:
+            with self.cond:
+                self.readers -= 1
+                if self.readers == 0 and not self.done:
+                    self.cancelled.set()
+
+
+class SingleFlight:
+    # Aynı anahtarla eşzamanlı gelen çağrılar tek bir yürütmeyi paylaşır; sonuç önbelleğe alınmaz
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._streams = {}
+        self.executions = 0
+        self.collapsed = 0
+
+    def _collapse(self):
+        self.collapsed += 1
+        inc("gib_singleflight_collapsed_total", group=self.name)
+
+    def do(self, key, func, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+            else:
+                call.waiters += 1
+                self._collapse()
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+            if call.waiters:
+                logging.info(f"{self.name}: {call.waiters} eş istek tek çağrıda birleştirildi")
+
+    def stream(self, key, func, *args, cancel_event=None, **kwargs):
+        # Akış arka planda bir kez tüketilir; aynı anda gelen tüm okuyucular aynı token'ları alır.
+        # func cancel_event anahtar argümanını alır: okuyan kalmayınca kurulur, sağlayıcı isteği kapatılmalı.
+        # Buradaki cancel_event yalnızca bu okuyucuyu sonlandırır
+        with self._lock:
+            call = self._streams.get(key)
+            joined = False
+            if call is not None:
+                with call.cond:
+                    if not call.cancelled.is_set():
+                        call.readers += 1
+                        joined = True
+            if joined:
+                call.waiters += 1
+                self._collapse()
+            else:
+                call = self._streams[key] = _StreamCall()
+                call.readers = 1
+                self.executions += 1
+                threading.Thread(
+                    target=self._drive, args=(key, call, func, args, kwargs),
+                    name=f"singleflight-{self.name}", daemon=True
+                ).start()
+        return call.read(cancel_event)
+
+    def _drive(self, key, call, func, args, kwargs):
+        try:
+            for token in func(*args, cancel_event=call.cancelled, **kwargs):
+                with call.cond:
+                    call.tokens.append(token)
+                    call.cond.notify_all()
+                if call.cancelled.is_set():
+                    logging.info(f"{self.name}: okuyan kalmadığı için akış durduruldu")
+                    break
+        except Exception as e:
+            logging.error(f"{self.name} akışı başarısız: {str(e)}")
+            call.error = e
+        finally:
+            with self._lock:
+                # İptal edilen çağrının yerine aynı anahtarla yenisi başlamış olabilir
+                if self._streams.get(key) is call:
+                    del self._streams[key]
+            with call.cond:
+                call.done = True
+                call.cond.notify_all()
+            if call.waiters:
+                logging.info(f"{self.name}: {call.waiters} eş akış tek çağrıda birleştirildi")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'executions': self.executions,
+                'collapsed': self.collapsed,
+                'in_flight': len(self._calls) + len(self._streams),
+            }
+
+
+_groups = {}
+_groups_lock = threading.Lock()
+
+
+def get_group(name):
+    # Gruplar süreç genelinde paylaşılır; ayrı AIAssistant örnekleri de aynı uçuşu görür
+    with _groups_lock:
+        if name not in _groups:
+            _groups[name] = SingleFlight(name)
+        return _groups[name]
+
+
+def stats():
+    with _groups_lock:
+        groups = list(_groups.values())
+    return {group.name: group.stats() for group in groups}
@@ -0,0 +1,368 @@
+import io
+import logging
+
+MAX_GENERIC_FIELDS = 200
+MAX_NOTES = 5
+MAX_ACCOUNTS = 25
+
+# Bu alt ağaçlar imza, XSLT ve gömülü dosyalar taşır; analiz için anlamı yoktur
+SKIPPED_SUBTREES = {'UBLExtensions', 'Signature', 'AdditionalDocumentReference'}
+
+HEADER_FIELDS = {
+    'ID': 'id',
+    'UUID': 'uuid',
+    'IssueDate': 'issue_date',
+    'IssueTime': 'issue_time',
+    'InvoiceTypeCode': 'type_code',
+    'ProfileID': 'profile',
+    'DocumentCurrencyCode': 'currency',
+    'LineCountNumeric': 'line_count',
+}
+
+TOTAL_FIELDS = {
+    'LineExtensionAmount': 'line_extension',
+    'TaxExclusiveAmount': 'tax_exclusive',
+    'TaxInclusiveAmount': 'tax_inclusive',
+    'AllowanceTotalAmount': 'allowance_total',
+    'ChargeTotalAmount': 'charge_total',
+    'PayableRoundingAmount': 'rounding',
+    'PayableAmount': 'payable',
+}
+
+
+def _local(tag):
+    # '{namespace}Ad' -> 'Ad'; yorum/işlem talimatı düğümlerinde etiket str değildir
+    return tag.rpartition('}')[2] if isinstance(tag, str) else ''
+
+
+def _number(text):
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return None
+
+
+def _source(file_content):
+    if isinstance(file_content, (bytes, bytearray)):
+        return io.BytesIO(file_content)
+    return file_content
+
+
+class _SummaryBuilder:
+    def __init__(self):
+        self.kind = None
+        self.root = None
+        self.header = {}
+        self.notes = []
+        self.parties = {}
+        self.lines = []
+        self.tax_subtotals = []
+        self.withholding = []
+        self.tax_total = None
+        self.totals = {}
+        self.ledger = None
+        self.generic = []
+        self.element_count = 0
+        self._current = None
+
+    def start(self, path, elem):
+        name = path[-1]
+        if len(path) == 1:
+            self.root = name
+            self.kind = 'invoice' if name in ('Invoice', 'CreditNote') else None
+            return
+        if self.kind == 'invoice' and len(path) >= 2:
+            section = path[1]
+            if len(path) == 2 and section in ('InvoiceLine', 'CreditNoteLine'):
+                self._current = {'id': '', 'name': '', 'quantity': None, 'unit': '', 'price': None,
+                                 'amount': None, 'tax_percent': None, 'tax_amount': None,
+                                 'withholding_percent': None, 'withholding_amount': None}
+                self.lines.append(self._current)
+            elif name == 'TaxSubtotal' and len(path) == 3 and section in ('TaxTotal', 'WithholdingTaxTotal'):
+                self._current = {'taxable': None, 'amount': None, 'percent': None, 'name': '', 'code': ''}
+                (self.tax_subtotals if section == 'TaxTotal' else self.withholding).append(self._current)
+        elif name == 'entryDetail':
+            if self.ledger is None:
+                self.ledger = {'entries': 0, 'details': 0, 'debit': 0.0, 'credit': 0.0,
+                               'accounts': {}, 'period': {}, 'company': {}}
+            self._current = {'account': '', 'description': '', 'amount': None, 'side': ''}
+        elif name == 'entryHeader':
+            if self.ledger is None:
+                self.ledger = {'entries': 0, 'details': 0, 'debit': 0.0, 'credit': 0.0,
+                               'accounts': {}, 'period': {}, 'company': {}}
+            self.ledger['entries'] += 1
+
+    def end(self, path, elem):
+        self.element_count += 1
+        name = path[-1]
+        if self.kind == 'invoice':
+            self._end_invoice(path, elem, name)
+        elif self.ledger is not None or name in ('periodCoveredStart', 'periodCoveredEnd'):
+            self._end_ledger(path, elem, name)
+        if self.kind is None and self.ledger is None and len(elem) == 0 and len(self.generic) < MAX_GENERIC_FIELDS:
+            text = (elem.text or '').strip()
+            if text:
+                self.generic.append(('/'.join(path[1:]), text[:200]))
+
+    def _end_invoice(self, path, elem, name):
+        if len(elem):
+            return
+        text = (elem.text or '').strip()
+        depth = len(path)
+        section = path[1] if depth > 1 else ''
+
+        if depth == 2:
+            if name in HEADER_FIELDS:
+                self.header[HEADER_FIELDS[name]] = text
+            elif name == 'Note' and len(self.notes) < MAX_NOTES:
+                self.notes.append(text[:300])
+        elif section in ('AccountingSupplierParty', 'AccountingCustomerParty'):
+            party = self.parties.setdefault('supplier' if section == 'AccountingSupplierParty' else 'customer', {})
+            if name == 'Name' and 'PartyName' in path:
+                party['name'] = text
+            elif name == 'ID' and 'PartyIdentification' in path:
+                party.setdefault('ids', {})[elem.get('schemeID', 'ID')] = text
+            elif name == 'CityName':
+                party['city'] = text
+            elif name == 'CitySubdivisionName':
+                party['district'] = text
+            elif name == 'Name' and 'PartyTaxScheme' in path:
+                party['tax_office'] = text
+            elif name in ('FirstName', 'FamilyName') and 'Person' in path:
+                party[name] = text
+        elif section in ('InvoiceLine', 'CreditNoteLine') and self._current is not None:
+            line = self._current
+            rest = path[2:]
+            if rest == ['ID']:
+                line['id'] = text
+            elif rest in (['InvoicedQuantity'], ['CreditedQuantity']):
+                line['quantity'] = _number(text)
+                line['unit'] = elem.get('unitCode', '')
+            elif rest == ['LineExtensionAmount']:
+                line['amount'] = _number(text)
+            elif rest == ['Item', 'Name']:
+                line['name'] = text
+            elif rest == ['Price', 'PriceAmount']:
+                line['price'] = _number(text)
+            elif rest == ['TaxTotal', 'TaxAmount']:
+                line['tax_amount'] = _number(text)
+            elif rest == ['TaxTotal', 'TaxSubtotal', 'Percent']:
+                line['tax_percent'] = _number(text)
+            elif rest == ['WithholdingTaxTotal', 'TaxAmount']:
+                line['withholding_amount'] = _number(text)
+            elif rest == ['WithholdingTaxTotal', 'TaxSubtotal', 'Percent']:
+                line['withholding_percent'] = _number(text)
+        elif section in ('TaxTotal', 'WithholdingTaxTotal'):
+            if depth == 3 and name == 'TaxAmount' and section == 'TaxTotal':
+                self.tax_total = _number(text)
+            elif 'TaxSubtotal' in path and self._current is not None:
+                subtotal = self._current
+                if name == 'TaxableAmount':
+                    subtotal['taxable'] = _number(text)
+                elif name == 'TaxAmount' and path[-2] == 'TaxSubtotal':
+                    subtotal['amount'] = _number(text)
+                elif name == 'Percent':
+                    subtotal['percent'] = _number(text)
+                elif name == 'Name' and 'TaxScheme' in path:
+                    subtotal['name'] = text
+                elif name == 'TaxTypeCode':
+                    subtotal['code'] = text
+        elif section == 'LegalMonetaryTotal' and name in TOTAL_FIELDS:
+            self.totals[TOTAL_FIELDS[name]] = _number(text)
+
+    def _end_ledger(self, path, elem, name):
+        if self.ledger is None:
+            self.ledger = {'entries': 0, 'details': 0, 'debit': 0.0, 'credit': 0.0,
+                           'accounts': {}, 'period': {}, 'company': {}}
+        ledger = self.ledger
+        text = (elem.text or '').strip() if not len(elem) else ''
+        if name in ('periodCoveredStart', 'periodCoveredEnd'):
+            ledger['period'][name] = text
+        elif name in ('organizationIdentifier', 'organizationDescription') and 'entityInformation' in path:
+            ledger['company'].setdefault(name, text)
+        elif name == 'entryDetail' and self._current is not None:
+            detail = self._current
+            ledger['details'] += 1
+            amount = detail['amount'] or 0.0
+            side = detail['side'].lower()
+            if side in ('d', 'debit'):
+                ledger['debit'] += amount
+            elif side in ('c', 'credit'):
+                ledger['credit'] += amount
+            if detail['account']:
+                account = ledger['accounts'].setdefault(detail['account'], {
+                    'description': detail['description'], 'debit': 0.0, 'credit': 0.0})
+                if side in ('d', 'debit'):
+                    account['debit'] += amount
+                elif side in ('c', 'credit'):
+                    account['credit'] += amount
+            self._current = None
+        elif self._current is not None and 'entryDetail' in path:
+            if name == 'accountMainID':
+                self._current['account'] = text
+            elif name == 'accountMainDescription':
+                self._current['description'] = text
+            elif name == 'amount':
+                self._current['amount'] = _number(text)
+            elif name == 'debitCreditCode':
+                self._current['side'] = text
+
+    def result(self):
+        if self.kind == 'invoice':
+            return {
+                'type': 'invoice',
+                'root': self.root,
+                'header': self.header,
+                'notes': self.notes,
+                'supplier': self.parties.get('supplier', {}),
+                'customer': self.parties.get('customer', {}),
+                'lines': self.lines,
+                'tax_total': self.tax_total,
+                'tax_subtotals': self.tax_subtotals,
+                'withholding': self.withholding,
+                'totals': self.totals,
+            }
+        if self.ledger is not None:
+            return dict(self.ledger, type='ledger', root=self.root)
+        return {'type': 'generic', 'root': self.root, 'fields': self.generic, 'element_count': self.element_count}
+
+
+def extract_xml_summary(file_content):
+    from lxml import etree
+    builder = _SummaryBuilder()
+    path = []
+    skip_depth = None
+    context = etree.iterparse(
+        _source(file_content),
+        events=('start', 'end'),
+        huge_tree=True,
+        remove_comments=True,
+        remove_pis=True
+    )
+    for event, elem in context:
+        if event == 'start':
+            path.append(_local(elem.tag))
+            if skip_depth is None and path[-1] in SKIPPED_SUBTREES:
+                skip_depth = len(path)
+            if skip_depth is None:
+                builder.start(path, elem)
+            continue
+
+        if skip_depth is None:
+            builder.end(path, elem)
+        elif len(path) == skip_depth:
+            skip_depth = None
+        path.pop()
+
+        # İşlenen düğümleri bırak; önceki kardeşler de silinerek bellek sınırlı tutulur
+        elem.clear(keep_tail=True)
+        parent = elem.getparent()
+        if parent is not None:
+            while elem.getprevious() is not None:
+                del parent[0]
+    del context
+    return builder.result()
+
+
+def _amount(value, currency=''):
+    if value is None:
+        return '-'
+    formatted = f"{value:,.2f}".replace(',', '_').replace('.', ',').replace('_', '.')
+    return f"{formatted} {currency}".strip()
+
+
+def _party_line(label, party):
+    if not party:
+        return None
+    name = party.get('name') or " ".join(filter(None, [party.get('FirstName'), party.get('FamilyName')]))
+    ids = ", ".join(f"{scheme}: {value}" for scheme, value in party.get('ids', {}).items())
+    details = ", ".join(filter(None, [ids, party.get('tax_office') and f"VD: {party['tax_office']}",
+                                      party.get('city')]))
+    return f"{label}: {name}" + (f" ({details})" if details else "")
+
+
+def format_invoice_summary(summary, max_lines=50):
+    header = summary['header']
+    currency = header.get('currency', '')
+    out = [f"Belge: {summary['root']} {header.get('id', '')}".strip()]
+    meta = ", ".join(f"{label}: {header[key]}" for key, label in (
+        ('issue_date', 'Tarih'), ('type_code', 'Tip'), ('profile', 'Senaryo'), ('uuid', 'ETTN')
+    ) if header.get(key))
+    if meta:
+        out.append(meta)
+    for label, key in (('Satıcı', 'supplier'), ('Alıcı', 'customer')):
+        line = _party_line(label, summary[key])
+        if line:
+            out.append(line)
+    for note in summary['notes']:
+        out.append(f"Not: {note}")
+
+    lines = summary['lines']
+    out.append(f"Kalemler ({len(lines)}):")
+    for line in lines[:max_lines]:
+        parts = [f"{line['id']}. {line['name']}".strip()]
+        if line['quantity'] is not None:
+            parts.append(f"{line['quantity']:g} {line['unit']}".strip())
+        if line['price'] is not None:
+            parts.append(f"birim {_amount(line['price'], currency)}")
+        parts.append(f"tutar {_amount(line['amount'], currency)}")
+        if line['tax_percent'] is not None:
+            parts.append(f"KDV %{line['tax_percent']:g} = {_amount(line['tax_amount'], currency)}")
+        if line['withholding_percent'] is not None:
+            parts.append(f"tevkifat %{line['withholding_percent']:g} = {_amount(line['withholding_amount'], currency)}")
+        out.append("- " + " | ".join(parts))
+    if len(lines) > max_lines:
+        out.append(f"- ... {len(lines) - max_lines} kalem daha")
+
+    if summary['tax_subtotals'] or summary['tax_total'] is not None:
+        out.append(f"Vergiler (toplam {_amount(summary['tax_total'], currency)}):")
+        for subtotal in summary['tax_subtotals']:
+            percent = f" %{subtotal['percent']:g}" if subtotal['percent'] is not None else ""
+            out.append(f"- {subtotal['name'] or subtotal['code']}{percent}: matrah "
+                       f"{_amount(subtotal['taxable'], currency)}, vergi {_amount(subtotal['amount'], currency)}")
+    for subtotal in summary['withholding']:
+        percent = f" %{subtotal['percent']:g}" if subtotal['percent'] is not None else ""
+        out.append(f"- Tevkifat {subtotal['name'] or subtotal['code']}{percent}: "
+                   f"matrah {_amount(subtotal['taxable'], currency)}, vergi {_amount(subtotal['amount'], currency)}")
+
+    if summary['totals']:
+        labels = {'line_extension': 'Mal/hizmet toplamı', 'tax_exclusive': 'Vergiler hariç',
+                  'tax_inclusive': 'Vergiler dahil', 'allowance_total': 'İskonto', 'charge_total': 'Artırım',
+                  'rounding': 'Yuvarlama', 'payable': 'Ödenecek'}
+        out.append("Toplamlar: " + ", ".join(
+            f"{labels[key]} {_amount(value, currency)}" for key, value in summary['totals'].items()))
+    return "\n".join(out)
+
+
+def format_ledger_summary(summary):
+    out = [f"Belge: e-Defter ({summary['root']})"]
+    if summary['company']:
+        out.append("Firma: " + ", ".join(summary['company'].values()))
+    if summary['period']:
+        out.append(f"Dönem: {summary['period'].get('periodCoveredStart', '?')} - "
+                   f"{summary['period'].get('periodCoveredEnd', '?')}")
+    out.append(f"Yevmiye kaydı: {summary['entries']}, satır: {summary['details']}")
+    out.append(f"Toplam borç: {_amount(summary['debit'])}, toplam alacak: {_amount(summary['credit'])}")
+    accounts = sorted(summary['accounts'].items(), key=lambda item: -(item[1]['debit'] + item[1]['credit']))
+    if accounts:
+        out.append(f"Hesaplar (en yüksek hareketli {min(len(accounts), MAX_ACCOUNTS)}/{len(accounts)}):")
+        for account, totals in accounts[:MAX_ACCOUNTS]:
+            out.append(f"- {account} {totals['description']}: borç {_amount(totals['debit'])}, "
+                       f"alacak {_amount(totals['credit'])}")
+    return "\n".join(out)
+
+
+def format_summary(summary):
+    if summary['type'] == 'invoice':
+        return format_invoice_summary(summary)
+    if summary['type'] == 'ledger':
+        return format_ledger_summary(summary)
+    lines = [f"Belge: {summary['root']} ({summary['element_count']} öğe)"]
+    lines.extend(f"{path}: {text}" for path, text in summary['fields'])
+    return "\n".join(lines)
+
+
+def extract_xml_text(file_content):
+    summary = extract_xml_summary(file_content)
+    logging.info(f"XML özeti çıkarıldı: {summary['type']} ({summary['root']})")
+    return format_summary(summary)